@@ -0,0 +1,128 @@
+"""Velocità di invio a molti iscritti: ciclo sequenziale con sleep(0.2) vs Broadcaster.
+
+Un bot finto con latenza di rete simulata registra l'istante di ogni messaggio, per
+verificare che il Broadcaster resti entro i limiti (globale, per chat, per gruppo):
+il massimo di messaggi in un secondo non deve superare il limite di Telegram.
+Il secondo scenario simula un flood control più severo (RetryAfter) e dei timeout,
+e riporta consegnati, ritentati e scartati.
+
+Uso: python -m benchmarks.bench_broadcast [--subscribers 600] [--groups 20] [--latency 0.08]
+     [--flood-limit 20] [--timeout-rate 0.02]
+"""
+import argparse
+import asyncio
+import bisect
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from telegram.error import RetryAfter, TimedOut
+
+from utils.broadcaster import Broadcaster, TELEGRAM_GLOBAL_LIMIT
+
+
+class FakeBot:
+    def __init__(self, latency: float, flood_limit: Optional[int] = None, timeout_rate: float = 0.0):
+        self.latency = latency
+        self.flood_limit = flood_limit  # messaggi al secondo oltre i quali si risponde RetryAfter
+        self.timeout_rate = timeout_rate
+        self.random = random.Random(1)
+        self.sent: List[float] = []
+        self.by_chat: Dict[int, List[float]] = {}
+        self._window: deque = deque()
+        self.flood_errors = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> None:
+        # Istante di partenza della richiesta: è quello governato dai token bucket
+        now = time.monotonic()
+        await asyncio.sleep(self.latency)
+        if self.flood_limit:
+            while self._window and self._window[0] < now - 1:
+                self._window.popleft()
+            if len(self._window) >= self.flood_limit:
+                self.flood_errors += 1
+                raise RetryAfter(1)
+            self._window.append(now)
+        if self.random.random() < self.timeout_rate:
+            raise TimedOut()
+        self.sent.append(now)
+        self.by_chat.setdefault(chat_id, []).append(now)
+
+
+def max_in_window(timestamps: List[float], window: float) -> int:
+    ordered = sorted(timestamps)
+    return max((bisect.bisect_right(ordered, start + window) - i for i, start in enumerate(ordered)), default=0)
+
+
+async def sequential(bot: FakeBot, chat_ids: List[int]) -> float:
+    """Il ciclo originale di send_news_to_subscribers"""
+    started = time.perf_counter()
+    for chat_id in chat_ids:
+        await bot.send_message(chat_id=chat_id, text='news')
+        await asyncio.sleep(0.2)
+    return time.perf_counter() - started
+
+
+async def main(subscribers: int, groups: int, latency: float, sample: int,
+               flood_limit: int, timeout_rate: float) -> None:
+    chat_ids = [1000 + i for i in range(subscribers - groups)] + [-1000 - i for i in range(groups)]
+
+    bot = FakeBot(latency)
+    elapsed = await sequential(bot, chat_ids[:sample])
+    old_rate = sample / elapsed
+    print(f"  sequenziale: {old_rate:6.1f} msg/s (su {sample} invii), 20k iscritti in {20000 / old_rate / 60:.0f} min")
+
+    bot = FakeBot(latency)
+    broadcaster = Broadcaster(progress_interval=5)
+
+    async def send(chat_id):
+        await bot.send_message(chat_id=chat_id, text='news')
+
+    # Due categorie in parallelo con gli stessi iscritti: i limiti per chat e di gruppo entrano in gioco
+    started = time.perf_counter()
+    results = await asyncio.gather(broadcaster.broadcast('news_generale', chat_ids, send),
+                                   broadcaster.broadcast('news_tech', chat_ids, send))
+    elapsed = time.perf_counter() - started
+    sent = sum(progress.delivered for progress in results)
+    rate = sent / elapsed
+    print(f"  broadcaster: {rate:6.1f} msg/s ({sent} invii in {elapsed:.1f}s), "
+          f"20k iscritti in {20000 / rate / 60:.0f} min")
+
+    private = [times for chat_id, times in bot.by_chat.items() if chat_id > 0]
+    group = [times for chat_id, times in bot.by_chat.items() if chat_id < 0]
+    # Un mittente svegliato in ritardo dall'event loop può avvicinarsi al successivo: ±1 messaggio
+    peak = max_in_window(bot.sent, 0.999)
+    print(f"  massimo in 1 s: {peak} messaggi (rate {broadcaster.global_rate:g}, limite Telegram "
+          f"{TELEGRAM_GLOBAL_LIMIT}), in 5 s: {max_in_window(bot.sent, 4.999)}")
+    assert peak <= TELEGRAM_GLOBAL_LIMIT, f"{peak} messaggi in 1 s oltre il limite di {TELEGRAM_GLOBAL_LIMIT}"
+    print(f"  massimo per chat privata in 1 s: {max(max_in_window(times, 0.999) for times in private)}")
+    if group:
+        print(f"  massimo per gruppo in 60 s: {max(max_in_window(times, 59.9) for times in group)}")
+
+    # Flood control: il bot finto accetta meno messaggi al secondo del Broadcaster
+    bot = FakeBot(latency, flood_limit=flood_limit, timeout_rate=timeout_rate)
+    broadcaster = Broadcaster(progress_interval=5, base_backoff=0.5, max_backoff=4)
+
+    async def send(chat_id):
+        await bot.send_message(chat_id=chat_id, text='news')
+
+    started = time.perf_counter()
+    progress = await broadcaster.broadcast('news_flood', chat_ids, send)
+    elapsed = time.perf_counter() - started
+    print(f"  flood control ({flood_limit} msg/s, {timeout_rate:.0%} timeout): {progress.delivered}/{progress.total} "
+          f"consegnati, {progress.retried} ritentati, {progress.dropped} scartati in {elapsed:.1f}s "
+          f"({bot.flood_errors} RetryAfter, {broadcaster.pauses} pause)")
+    print(f"  il ciclo originale avrebbe perso i {bot.flood_errors} destinatari colpiti da RetryAfter e i timeout")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=600)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.08, help='latenza simulata di sendMessage (s)')
+    parser.add_argument('--sample', type=int, default=25, help='invii misurati con il ciclo sequenziale')
+    parser.add_argument('--flood-limit', type=int, default=20, help='msg/s accettati dal bot finto prima di RetryAfter')
+    parser.add_argument('--timeout-rate', type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.groups, args.latency, args.sample, args.flood_limit, args.timeout_rate))
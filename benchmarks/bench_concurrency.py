@@ -0,0 +1,66 @@
+"""Throughput dei comandi concorrenti: lock globale vs single-flight per URL.
+
+Uso: python -m benchmarks.bench_concurrency [--rounds 5] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.feed_server import FeedServer, scratch_database
+from utils.news_fetcher import NewsFetcher
+
+
+class GlobalLockFetcher(NewsFetcher):
+    """Riproduce il comportamento precedente: ogni aggiornamento dei feed serializzato da un unico lock"""
+
+    def __init__(self):
+        super().__init__()
+        self._global_lock = asyncio.Lock()
+
+    async def _refresh_urls(self, urls):
+        async with self._global_lock:
+            return await super()._refresh_urls(urls)
+
+
+async def command_burst(fetcher: NewsFetcher) -> int:
+    """Un comando per categoria più una /cerca, tutti nello stesso istante"""
+    tasks = [fetcher.get_news(category) for category in fetcher.RSS_FEEDS]
+    tasks.append(fetcher.search_news('gioco'))
+    await asyncio.gather(*tasks)
+    return len(tasks)
+
+
+async def run(fetcher: NewsFetcher, server: FeedServer, rounds: int) -> float:
+    fetcher.RSS_FEEDS = server.localize(fetcher.RSS_FEEDS)
+    with scratch_database() as db:
+        await fetcher.initialize(db, load_snapshot=False)
+        commands = 0
+        started = time.perf_counter()
+        try:
+            for _ in range(rounds):
+                # Cache vuota a ogni round: misura il caso peggiore (tutti i feed da scaricare)
+                fetcher.cache.clear()
+                commands += await command_burst(fetcher)
+            elapsed = time.perf_counter() - started
+        finally:
+            await fetcher.close()
+    return commands / elapsed
+
+
+async def main(rounds: int, latency: float) -> None:
+    server = FeedServer(latency=latency)
+    await server.start()
+    try:
+        for label, fetcher in (('global lock', GlobalLockFetcher()), ('single-flight', NewsFetcher())):
+            throughput = await run(fetcher, server, rounds)
+            print(f"{label:>14}: {throughput:8.1f} comandi/s")
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help='latenza simulata per feed (s)')
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.latency))
@@ -0,0 +1,74 @@
+"""Micro-benchmark della selezione delle ultime notizie su tutte le 11 categorie.
+
+Confronta il vecchio approccio (limit*2 voci per feed, ordinamento completo sulla
+data formattata, dedupe) con il merge k-way su heap di merge_latest.
+
+Uso: python -m benchmarks.bench_merge [--articles 50] [--limit 5] [--repeat 200]
+"""
+import argparse
+import random
+import time
+import timeit
+from datetime import datetime
+
+from utils.feed_cache import Article
+from utils.news_fetcher import NewsFetcher, merge_latest
+
+
+def build_feeds(fetcher: NewsFetcher, articles_per_feed: int):
+    """Articoli sintetici per ogni URL di RSS_FEEDS, dal più recente al più vecchio"""
+    now = time.time()
+    feeds = {}
+    for number, url in enumerate(fetcher._all_urls()):
+        articles = []
+        for i in range(articles_per_feed):
+            ts = now - i * 600 - random.uniform(0, 600)
+            # Alcuni link condivisi tra feed per esercitare il dedupe
+            link = f"https://example.com/shared/{i}" if i % 10 == 0 else f"https://example.com/{number}/{i}"
+            date_str = datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+            articles.append(Article(f"Articolo {number}-{i}", link, 'Example', 'it', ts, date_str))
+        feeds[url] = articles
+    return feeds
+
+
+def sort_latest(feeds, limit):
+    """Algoritmo precedente: raccolta di limit*2 voci per feed, sort completo, dedupe"""
+    entries = []
+    for articles in feeds:
+        for article in articles[:limit * 2]:
+            entries.append(article.as_tuple())
+    entries.sort(key=lambda x: x[3], reverse=True)
+    seen = set()
+    unique = []
+    for entry in entries:
+        if entry[1] not in seen:
+            seen.add(entry[1])
+            unique.append(entry)
+            if len(unique) >= limit:
+                break
+    return unique
+
+
+def main(articles_per_feed: int, limit: int, repeat: int) -> None:
+    fetcher = NewsFetcher()
+    feeds_by_url = build_feeds(fetcher, articles_per_feed)
+    # 'generale' più le categorie di RSS_FEEDS: le stesse richieste da search_news e /news
+    categories = ['generale'] + list(fetcher.RSS_FEEDS)
+    per_category = [
+        [feeds_by_url[url] for url in fetcher._category_urls(category)]
+        for category in categories
+    ]
+    print(f"{len(per_category)} categorie, {len(feeds_by_url)} feed da {articles_per_feed} articoli, limit={limit}")
+
+    for label, select in (('sort completo', sort_latest), ('heap merge', merge_latest)):
+        elapsed = timeit.timeit(lambda: [select(feeds, limit) for feeds in per_category], number=repeat)
+        print(f"{label:>14}: {elapsed / repeat * 1e6:8.1f} µs per giro di {len(categories)} categorie")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    main(args.articles, args.limit, args.repeat)
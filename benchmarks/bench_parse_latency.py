@@ -0,0 +1,60 @@
+"""Stallo dell'event loop durante il parsing dei feed: inline vs thread vs process.
+
+Un heartbeat da 1 ms misura il ritardo con cui l'event loop riesce a servirlo
+mentre vengono parsati in parallelo diversi feed di grandi dimensioni (come il
+mashup di GameSpot o Polygon).
+
+Uso: python -m benchmarks.bench_parse_latency [--feeds 20] [--entries 100]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from benchmarks.feed_server import synthetic_rss
+from utils.feed_parser import FeedParser, PARSE_MODES
+
+
+async def heartbeat(stop: asyncio.Event, lags: List[float], interval: float = 0.001) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def measure(mode: str, bodies: List[bytes]) -> None:
+    parser = FeedParser(mode)
+    # Warm-up: avvio dei worker escluso dalla misura
+    await parser.parse(bodies[0])
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(parser.parse(body) for body in bodies))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    parser.shutdown()
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(f"{mode:>8}: totale {elapsed * 1000:7.1f} ms | stallo max {max(lags, default=0) * 1000:7.1f} ms"
+          f" | p99 {p99 * 1000:6.1f} ms | medio {statistics.fmean(lags or [0]) * 1000:5.2f} ms")
+
+
+async def main(feeds: int, entries: int, description_size: int) -> None:
+    bodies = [synthetic_rss(f"feed{i}", entries, description_size) for i in range(feeds)]
+    print(f"{feeds} feed da {len(bodies[0]) / 1024:.0f} KiB")
+    for mode in PARSE_MODES[::-1]:
+        await measure(mode, bodies)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--feeds', type=int, default=20)
+    parser.add_argument('--entries', type=int, default=100)
+    parser.add_argument('--description-size', type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.feeds, args.entries, args.description_size))
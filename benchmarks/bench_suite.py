@@ -0,0 +1,144 @@
+"""Suite di benchmark di NewsFetcher contro i feed registrati, riprodotti in locale.
+
+Scenari:
+- refresh: un ciclo del poller su tutti i feed (force), con 304 ed errori del ReplayServer
+- get_news_cold: /news per categoria a cache vuota (download e parsing inclusi)
+- get_news: /news per categoria con i feed in cache
+- search_news: /cerca sull'indice in memoria e sull'archivio (query con filtri)
+
+Per ogni scenario: operazioni, throughput e latenza p50/p95/p99. Senza --recording
+usa una registrazione sintetica di tutti gli URL di RSS_FEEDS.
+
+Uso: python -m benchmarks.bench_suite [--recording benchmarks/recordings] [--rounds 5]
+     [--latency 0.05 | --latency-scale 1.0] [--jitter 0.2] [--error-rate 0.02] [--not-modified-rate 0.8]
+"""
+import argparse
+import asyncio
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.feed_recorder import load_recording, synthetic_recording
+from benchmarks.feed_server import ReplayServer, scratch_database
+from database.db import Database
+from utils.fetch_limiter import PRIORITY_BACKGROUND
+from utils.news_fetcher import NewsFetcher
+
+SEARCH_QUERIES = ('gioco', 'nintendo switch', 'playstation', 'xbox game pass', 'recensione',
+                  'gioco cat:pc', 'uscita since:2020-01-01')
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Percentile nearest-rank"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Scenario:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.elapsed = 0.0
+
+    async def run(self, operations: List[Callable[[], Awaitable]], concurrency: int = 1) -> None:
+        """Esegue le operazioni con al più `concurrency` in parallelo, misurandole una per una"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(operation):
+            async with semaphore:
+                started = time.perf_counter()
+                await operation()
+                self.latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(timed(operation) for operation in operations))
+        self.elapsed += time.perf_counter() - started
+
+    def report(self) -> str:
+        if not self.latencies:
+            return f"{self.name:>14}: nessuna operazione"
+        ms = [latency * 1000 for latency in self.latencies]
+        return (f"{self.name:>14}: {len(ms):5d} op  {len(ms) / self.elapsed:9.1f} op/s  "
+                f"p50 {percentile(ms, 0.50):8.2f} ms  p95 {percentile(ms, 0.95):8.2f} ms  "
+                f"p99 {percentile(ms, 0.99):8.2f} ms")
+
+
+async def run_suite(server: ReplayServer, rounds: int, concurrency: int) -> List[Scenario]:
+    with scratch_database() as db:
+        return await _run_suite(server, db, rounds, concurrency)
+
+
+async def _run_suite(server: ReplayServer, db: Database, rounds: int, concurrency: int) -> List[Scenario]:
+    fetcher = NewsFetcher()
+    fetcher.RSS_FEEDS = server.localize(fetcher.RSS_FEEDS)
+    categories = [category for category, urls in fetcher.RSS_FEEDS.items() if urls]
+    # Stato pulito e isolato: articoli e validatori sintetici in un database usa e getta, niente snapshot
+    await fetcher.initialize(db, load_snapshot=False)
+
+    refresh = Scenario('refresh')
+    cold = Scenario('get_news_cold')
+    warm = Scenario('get_news')
+    search = Scenario('search_news')
+    try:
+        for _ in range(rounds):
+            fetcher.cache.clear()
+            await cold.run([lambda category=category: fetcher.get_news(category) for category in categories],
+                           concurrency)
+
+        urls = fetcher._all_urls()
+        for _ in range(rounds):
+            # Un ciclo del poller: tutti i feed in parallelo, priorità di background
+            await refresh.run([lambda: asyncio.gather(
+                *(fetcher.fetch_feed(url, force=True, priority=PRIORITY_BACKGROUND) for url in urls),
+                return_exceptions=True
+            )])
+
+        await warm.run([lambda category=category: fetcher.get_news(category)
+                        for _ in range(rounds * 20) for category in categories], concurrency)
+        await search.run([lambda query=query: fetcher.search_news(query)
+                          for _ in range(rounds * 20) for query in SEARCH_QUERIES], concurrency)
+    finally:
+        await fetcher.close()
+    return [refresh, cold, warm, search]
+
+
+async def main(recording_dir: Optional[str], rounds: int, concurrency: int, latency: float,
+               latency_scale: Optional[float], jitter: float, error_rate: float,
+               not_modified_rate: float, seed: int) -> None:
+    if recording_dir:
+        recording = load_recording(recording_dir)
+        source = recording_dir
+    else:
+        recording = synthetic_recording(url for urls in NewsFetcher().RSS_FEEDS.values() for url in urls)
+        source = 'registrazione sintetica'
+
+    server = ReplayServer(recording, latency=latency, latency_scale=latency_scale, jitter=jitter,
+                          error_rate=error_rate, not_modified_rate=not_modified_rate, seed=seed)
+    await server.start()
+    try:
+        scenarios = await run_suite(server, rounds, concurrency)
+    finally:
+        await server.stop()
+
+    print(f"{len(recording)} feed da {source}, {rounds} round, concorrenza {concurrency}")
+    for scenario in scenarios:
+        print(scenario.report())
+    responses: Dict[int, int] = dict(sorted(server.responses.items()))
+    print(f"Risposte del server: {server.requests} richieste, per stato {responses}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recording', help='directory creata da benchmarks.feed_recorder')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=8, help='comandi contemporanei')
+    parser.add_argument('--latency', type=float, default=0.05, help='latenza fissa per risposta (s)')
+    parser.add_argument('--latency-scale', type=float, help='usa la latenza registrata moltiplicata per il fattore')
+    parser.add_argument('--jitter', type=float, default=0.2, help='variazione casuale della latenza (frazione)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--not-modified-rate', type=float, default=1.0,
+                        help='frazione delle richieste condizionali a cui rispondere 304')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.recording, args.rounds, args.concurrency, args.latency, args.latency_scale,
+                     args.jitter, args.error_rate, args.not_modified_rate, args.seed))
@@ -0,0 +1,139 @@
+"""Registra le risposte reali di tutti i feed di RSS_FEEDS per riprodurle offline.
+
+Ogni risposta (stato, header e corpo) viene salvata in una directory: il corpo in un
+file per feed, il resto in recording.json. ReplayServer (benchmarks/feed_server.py)
+la riproduce in locale per i benchmark di NewsFetcher.
+
+Uso: python -m benchmarks.feed_recorder [--out benchmarks/recordings] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import ssl
+import time
+from datetime import datetime
+from email.utils import formatdate
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+from multidict import CIMultiDict
+
+from benchmarks.feed_server import synthetic_rss
+from utils.news_fetcher import NewsFetcher
+
+MANIFEST = 'recording.json'
+
+# Header che descrivono il trasporto e non il contenuto: non vanno riprodotti
+_TRANSPORT_HEADERS = {'content-length', 'content-encoding', 'transfer-encoding', 'connection',
+                      'keep-alive', 'set-cookie', 'alt-svc', 'date'}
+
+
+class RecordedResponse:
+    """Risposta registrata di un feed; `error` indica un tentativo fallito senza risposta"""
+    __slots__ = ('url', 'status', 'headers', 'body', 'latency', 'error')
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: bytes,
+                 latency: float = 0.0, error: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.latency = latency
+        self.error = error
+
+    def replay_headers(self) -> CIMultiDict:
+        return CIMultiDict((name, value) for name, value in self.headers.items()
+                           if name.lower() not in _TRANSPORT_HEADERS)
+
+
+def _body_file(url: str) -> str:
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.xml'
+
+
+async def _record_one(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str) -> RecordedResponse:
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                body = await response.read()
+                latency = time.perf_counter() - started
+                print(f"[DEBUG] {response.status} {url} ({len(body)} byte, {latency * 1000:.0f} ms)")
+                return RecordedResponse(url, response.status, dict(response.headers), body, latency)
+        except Exception as e:
+            print(f"[ERROR] {url}: {e}")
+            return RecordedResponse(url, 0, {}, b'', time.perf_counter() - started, error=str(e) or type(e).__name__)
+
+
+async def record(urls: Iterable[str], concurrency: int = 8, timeout: float = 20) -> Dict[str, RecordedResponse]:
+    """Scarica ogni URL una volta, senza header condizionali, e restituisce le risposte"""
+    # Stesse impostazioni TLS di NewsFetcher: alcuni feed hanno certificati non validi
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=ssl_context),
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        responses = await asyncio.gather(*(_record_one(session, semaphore, url) for url in dict.fromkeys(urls)))
+    return {response.url: response for response in responses}
+
+
+def save_recording(recording: Dict[str, RecordedResponse], directory: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    feeds = {}
+    for url, response in recording.items():
+        entry = {'status': response.status, 'headers': response.headers,
+                 'latency': round(response.latency, 4), 'error': response.error, 'file': None}
+        if response.body:
+            entry['file'] = _body_file(url)
+            with open(os.path.join(directory, entry['file']), 'wb') as f:
+                f.write(response.body)
+        feeds[url] = entry
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump({'recorded_at': datetime.now().isoformat(), 'feeds': feeds}, f, ensure_ascii=False, indent=1)
+
+
+def load_recording(directory: str) -> Dict[str, RecordedResponse]:
+    with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    recording = {}
+    for url, entry in manifest['feeds'].items():
+        body = b''
+        if entry.get('file'):
+            with open(os.path.join(directory, entry['file']), 'rb') as f:
+                body = f.read()
+        recording[url] = RecordedResponse(url, entry['status'], entry.get('headers') or {}, body,
+                                          entry.get('latency') or 0.0, entry.get('error'))
+    return recording
+
+
+def synthetic_recording(urls: Iterable[str], entries: int = 30, latency: float = 0.05) -> Dict[str, RecordedResponse]:
+    """Registrazione finta (feed sintetici con ETag e Last-Modified) quando non se ne ha una reale"""
+    recording = {}
+    for number, url in enumerate(dict.fromkeys(urls)):
+        body = synthetic_rss(f"feed{number}", entries, description_size=400)
+        headers = {
+            'Content-Type': 'application/rss+xml; charset=utf-8',
+            'ETag': '"' + hashlib.sha1(body).hexdigest()[:16] + '"',
+            'Last-Modified': formatdate(time.time() - 600, usegmt=True),
+        }
+        recording[url] = RecordedResponse(url, 200, headers, body, latency)
+    return recording
+
+
+async def main(out: str, concurrency: int) -> None:
+    urls = [url for urls in NewsFetcher().RSS_FEEDS.values() for url in urls]
+    recording = await record(urls, concurrency)
+    save_recording(recording, out)
+    failed = sum(1 for response in recording.values() if response.error or response.status >= 400)
+    size = sum(len(response.body) for response in recording.values())
+    print(f"Registrati {len(recording)} feed ({size / 1024:.0f} KiB, {failed} falliti) in {out}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--out', default='benchmarks/recordings')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.out, args.concurrency))
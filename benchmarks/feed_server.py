@@ -0,0 +1,174 @@
+"""Server RSS locale per i benchmark di NewsFetcher (nessun accesso a internet)"""
+import asyncio
+import contextlib
+import os
+import random
+import tempfile
+import time
+from email.utils import formatdate
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+from database.db import Database
+
+
+@contextlib.contextmanager
+def scratch_database() -> Iterator[Database]:
+    """Database usa e getta per i benchmark: articoli, validatori e sottoscrizioni
+    dei feed locali non finiscono in database/bot.db"""
+    with tempfile.TemporaryDirectory(prefix='bench-') as directory:
+        yield Database(os.path.join(directory, 'bench.db'))
+
+
+def synthetic_rss(name: str, entries: int = 30, description_size: int = 0,
+                  hub: Optional[str] = None, self_url: Optional[str] = None, first: int = 0) -> bytes:
+    """Genera un feed RSS 2.0 con `entries` articoli, dal più recente al più vecchio.
+
+    `description_size` aggiunge testo HTML alle descrizioni per simulare feed pesanti;
+    `hub`/`self_url` pubblicizzano un hub WebSub; `first` è il numero del primo articolo.
+    """
+    now = time.time()
+    padding = ("&lt;p&gt;Lorem ipsum dolor sit amet&lt;/p&gt; " * (description_size // 40 + 1))[:description_size]
+    items = []
+    for i in range(first, first + entries):
+        items.append(
+            f"<item><title>{name} articolo {i}: nuovo gioco in uscita</title>"
+            f"<link>https://example.com/{name}/{i}</link>"
+            f"<description>Notizia {i} del feed {name} {padding}</description>"
+            f"<pubDate>{formatdate(now - i * 900, usegmt=True)}</pubDate></item>"
+        )
+    links = ''
+    if hub:
+        links += f"<atom:link rel='hub' href='{hub}'/>"
+    if self_url:
+        links += f"<atom:link rel='self' href='{self_url}'/>"
+    return (
+        "<?xml version='1.0' encoding='utf-8'?>"
+        "<rss version='2.0' xmlns:atom='http://www.w3.org/2005/Atom'><channel>"
+        f"<title>{name}</title><link>https://example.com/{name}</link>{links}"
+        + "".join(items) + "</channel></rss>"
+    ).encode('utf-8')
+
+
+class FeedServer:
+    """Serve feed sintetici con una latenza configurabile.
+
+    Ascolta su `hosts` indirizzi di loopback (127.0.0.1, 127.0.0.2, ...) così gli host
+    distinti di RSS_FEEDS restano distinti e i limiti per host si comportano come in produzione.
+    """
+
+    def __init__(self, latency: float = 0.05, entries: int = 30, port: int = 0, hosts: int = 32):
+        self.latency = latency
+        self.entries = entries
+        self.port = port
+        self.hosts = max(1, hosts)
+        self.requests = 0
+        self._bodies: Dict[str, bytes] = {}
+        self.origins: Dict[str, str] = {}  # nome locale -> URL originale (vedi localize)
+        self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        name = request.match_info['name']
+        if name not in self._bodies:
+            self._bodies[name] = synthetic_rss(name, self.entries)
+        await asyncio.sleep(self.latency)
+        return web.Response(body=self._bodies[name], content_type='application/rss+xml')
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/feeds/{name}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        for host in range(2, self.hosts + 1):
+            await web.TCPSite(self._runner, f'127.0.0.{host}', self.port).start()
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def url_for(self, name: str, host: int = 1) -> str:
+        return f"http://127.0.0.{host}:{self.port}/feeds/{name}"
+
+    def localize(self, rss_feeds: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Riscrive RSS_FEEDS verso il server locale mantenendo categorie, URL condivisi e host comuni"""
+        names: Dict[str, str] = {}
+        hosts: Dict[str, int] = {}
+        local = {}
+        for category, urls in rss_feeds.items():
+            local[category] = []
+            for url in urls:
+                if url not in names:
+                    names[url] = f"feed{len(names)}"
+                    self.origins[names[url]] = url
+                host = hosts.setdefault(urlparse(url).hostname, len(hosts) % self.hosts + 1)
+                local[category].append(self.url_for(names[url], host))
+        return local
+
+
+class ReplayServer(FeedServer):
+    """Riproduce una registrazione di benchmarks/feed_recorder con latenza, errori e 304 configurabili.
+
+    - `latency`: ritardo fisso; con `latency_scale` si usa invece la latenza registrata
+      moltiplicata per il fattore, più un `jitter` casuale (in proporzione)
+    - `error_rate`: frazione di richieste che rispondono `error_status`
+    - i 304 seguono ETag/Last-Modified registrati; `not_modified_rate` è la frazione di
+      richieste condizionali a cui si risponde 304 (le altre ricevono di nuovo il corpo)
+    """
+
+    def __init__(self, recording: Dict, latency: float = 0.05, latency_scale: Optional[float] = None,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 not_modified_rate: float = 1.0, seed: Optional[int] = None, port: int = 0, hosts: int = 32):
+        super().__init__(latency=latency, port=port, hosts=hosts)
+        self.recording = recording
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.not_modified_rate = not_modified_rate
+        self.random = random.Random(seed)
+        self.responses: Dict[int, int] = {}  # stato HTTP -> conteggio
+
+    def localize(self, rss_feeds: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Come FeedServer.localize, limitato agli URL presenti nella registrazione"""
+        recorded = {category: [url for url in urls if url in self.recording] for category, urls in rss_feeds.items()}
+        return super().localize(recorded)
+
+    def _delay(self, recorded_latency: float) -> float:
+        delay = recorded_latency * self.latency_scale if self.latency_scale is not None else self.latency
+        if self.jitter:
+            delay *= 1 + self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
+
+    def _is_not_modified(self, request: web.Request, headers) -> bool:
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        matches = ((etag and request.headers.get('If-None-Match') == etag)
+                   or (not etag and last_modified and request.headers.get('If-Modified-Since') == last_modified))
+        return bool(matches) and self.random.random() < self.not_modified_rate
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        recorded = self.recording.get(self.origins.get(request.match_info['name']))
+        if recorded is None:
+            return self._count(web.Response(status=404))
+        await asyncio.sleep(self._delay(recorded.latency))
+
+        if recorded.error or self.random.random() < self.error_rate:
+            # Anche i feed falliti durante la registrazione rispondono con un errore
+            return self._count(web.Response(status=self.error_status if not recorded.error else 502))
+        headers = recorded.replay_headers()
+        if recorded.status == 200 and self._is_not_modified(request, headers):
+            return self._count(web.Response(status=304, headers={name: value for name, value in headers.items()
+                                                                 if name.lower() in ('etag', 'last-modified')}))
+        return self._count(web.Response(status=recorded.status, body=recorded.body, headers=headers))
+
+    def _count(self, response: web.Response) -> web.Response:
+        self.responses[response.status] = self.responses.get(response.status, 0) + 1
+        return response
@@ -0,0 +1,153 @@
+"""Hub WebSub locale per provare la ricezione push di NewsFetcher senza internet.
+
+LocalHub accetta le sottoscrizioni, verifica l'intento con una GET sulla callback
+e distribuisce i contenuti firmati (X-Hub-Signature: sha256=...). Eseguito come
+script misura il tempo tra la pubblicazione sull'hub e l'evento di nuovo articolo.
+
+Uso: python -m benchmarks.websub_hub [--pushes 20]
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import secrets
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.feed_server import FeedServer, scratch_database, synthetic_rss
+from utils.news_fetcher import NewsFetcher
+
+
+class LocalHub:
+    """Hub minimale: sottoscrizione, verifica dell'intento e distribuzione firmata"""
+
+    def __init__(self):
+        self.port = 0
+        self.subscribers: Dict[str, List[Dict[str, str]]] = {}  # topic -> callback e segreto
+        self.verified = asyncio.Event()
+        self._runner = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post('/', self._handle_subscribe)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._session = aiohttp.ClientSession()
+
+    async def stop(self) -> None:
+        if self._session:
+            await self._session.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _handle_subscribe(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get('hub.mode') != 'subscribe' or not form.get('hub.callback'):
+            return web.Response(status=400)
+        # Verifica asincrona, come un hub reale
+        asyncio.create_task(self._verify(dict(form)))
+        return web.Response(status=202)
+
+    async def _verify(self, form: Dict[str, str]) -> None:
+        challenge = secrets.token_hex(8)
+        params = {'hub.mode': 'subscribe', 'hub.topic': form['hub.topic'], 'hub.challenge': challenge,
+                  'hub.lease_seconds': form.get('hub.lease_seconds', '86400')}
+        async with self._session.get(form['hub.callback'], params=params) as response:
+            if response.status == 200 and await response.text() == challenge:
+                self.subscribers.setdefault(form['hub.topic'], []).append(
+                    {'callback': form['hub.callback'], 'secret': form.get('hub.secret', '')})
+                self.verified.set()
+
+    async def publish(self, topic: str, body: bytes, secret: Optional[str] = None) -> List[int]:
+        """Invia `body` a tutti i sottoscrittori del topic; `secret` forza una firma diversa"""
+        statuses = []
+        for subscriber in self.subscribers.get(topic, []):
+            key = (secret if secret is not None else subscriber['secret']).encode('utf-8')
+            signature = hmac.new(key, body, hashlib.sha256).hexdigest()
+            headers = {'Content-Type': 'application/rss+xml', 'X-Hub-Signature': f"sha256={signature}"}
+            async with self._session.post(subscriber['callback'], data=body, headers=headers) as response:
+                statuses.append(response.status)
+        return statuses
+
+
+async def start_callback_app(fetcher: NewsFetcher) -> web.AppRunner:
+    """Stessi endpoint /websub/{sub_id} di main.py, serviti con aiohttp"""
+    async def verify(request: web.Request) -> web.Response:
+        challenge = fetcher.verify_websub(request.match_info['sub_id'], dict(request.query))
+        return web.Response(status=404) if challenge is None else web.Response(text=challenge)
+
+    async def push(request: web.Request) -> web.Response:
+        status = await fetcher.receive_push(request.match_info['sub_id'], await request.read(),
+                                            request.headers.get('X-Hub-Signature'))
+        return web.Response(status=status)
+
+    app = web.Application()
+    app.router.add_get('/websub/{sub_id}', verify)
+    app.router.add_post('/websub/{sub_id}', push)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner
+
+
+async def main(pushes: int) -> None:
+    hub = LocalHub()
+    await hub.start()
+    server = FeedServer(hosts=1)
+    await server.start()
+    fetcher = NewsFetcher()
+    callback = await start_callback_app(fetcher)
+    with scratch_database() as db:
+        try:
+            callback_port = callback.addresses[0][1]
+            fetcher.websub.callback_base = f"http://127.0.0.1:{callback_port}"
+            url = server.url_for('pushed')
+            fetcher.RSS_FEEDS = {'generale_it': [url]}
+            server._bodies['pushed'] = synthetic_rss('pushed', 10, hub=hub.url, self_url=url)
+            # La sottoscrizione all'hub locale non deve finire nel database del bot
+            await fetcher.initialize(db, load_snapshot=False)
+
+            # Primo polling: scopre l'hub e si iscrive
+            await fetcher.fetch_feed(url, force=True)
+            await asyncio.wait_for(hub.verified.wait(), 5)
+            print(f"Sottoscrizione: {fetcher.websub.stats()['subscriptions'][url]['state']}, "
+                  f"intervallo di polling di riserva {fetcher.poller.interval(url):.0f}s")
+
+            subscription = fetcher.stream.subscribe('bench')
+            latencies = []
+            for n in range(pushes):
+                body = synthetic_rss('pushed', 1, first=-(n + 1))
+                started = time.perf_counter()
+                await hub.publish(url, body)
+                event = await asyncio.wait_for(subscription.__anext__(), 5)
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert event.articles[0].link.endswith(f"/{-(n + 1)}")
+
+            statuses = await hub.publish(url, synthetic_rss('pushed', 1, first=-1000), secret='sbagliato')
+            print(f"Push con firma errata: HTTP {statuses}, rifiutati {fetcher.websub.rejected}")
+            print(f"Pubblicazione -> evento: p50 {statistics.median(latencies):.1f} ms, "
+                  f"max {max(latencies):.1f} ms su {pushes} push")
+        finally:
+            await fetcher.close()
+            await callback.cleanup()
+            await server.stop()
+            await hub.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pushes', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.pushes))
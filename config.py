@@ -14,6 +14,94 @@ class Config:
     NEWS_UPDATE_INTERVAL = int(os.getenv('NEWS_UPDATE_INTERVAL', 60))  # minuti
     TECH_UPDATE_INTERVAL = int(os.getenv('TECH_UPDATE_INTERVAL', 120))
 
+    # Parsing dei feed: 'process' (default), 'thread' o 'inline'
+    FEED_PARSE_EXECUTOR = os.getenv('FEED_PARSE_EXECUTOR', 'process')
+    FEED_PARSE_WORKERS = int(os.getenv('FEED_PARSE_WORKERS', 2))
+
+    # Archivio full-text (FTS5) per /cerca: conservazione e pagine unite a ogni merge incrementale
+    ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', 365))
+    ARCHIVE_MERGE_PAGES = int(os.getenv('ARCHIVE_MERGE_PAGES', 500))
+
+    # Cache dei feed (secondi): oltre il TTL la copia è servita subito e aggiornata in background,
+    # oltre la staleness massima l'aggiornamento avviene prima di rispondere
+    FEED_CACHE_TTL_SECONDS = int(os.getenv('FEED_CACHE_TTL_SECONDS', 600))
+    FEED_MAX_STALENESS_SECONDS = int(os.getenv('FEED_MAX_STALENESS_SECONDS', 10800))
+    FEED_CACHE_MAX_ENTRIES = int(os.getenv('FEED_CACHE_MAX_ENTRIES', 200))
+    FEED_CACHE_MAX_BYTES = int(os.getenv('FEED_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+    # Notizie quasi duplicate tra fonti diverse: similarità minima dei titoli (Jaccard)
+    # e distanza massima tra le date di pubblicazione (ore)
+    NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', 0.75))
+    NEAR_DUP_WINDOW_HOURS = int(os.getenv('NEAR_DUP_WINDOW_HOURS', 48))
+    # Link alle altre fonti mostrati al massimo per ogni notizia ("🔁 Anche su")
+    NEAR_DUP_MAX_ALTERNATES = int(os.getenv('NEAR_DUP_MAX_ALTERNATES', 3))
+
+    # Snapshot su disco della cache dei feed, per ripartire a caldo dopo un deploy
+    FEED_SNAPSHOT_PATH = os.getenv('FEED_SNAPSHOT_PATH', 'database/feed_cache.json')
+    FEED_SNAPSHOT_INTERVAL = int(os.getenv('FEED_SNAPSHOT_INTERVAL', 10))  # minuti
+
+    # Download dei feed in streaming: byte massimi per feed ed entry oltre le quali si smette di leggere
+    # (0 = nessun limite: le entry servono anche a ricerca, archivio e cluster e nei feed dal più vecchio
+    # al più recente si perderebbero le ultime notizie; il limite di byte resta la protezione)
+    FEED_MAX_BYTES = int(os.getenv('FEED_MAX_BYTES', 2 * 1024 * 1024))
+    FEED_MAX_ENTRIES = int(os.getenv('FEED_MAX_ENTRIES', 0))
+
+    # Download contemporanei dei feed (totali e per host) e pool di connessioni
+    FEED_MAX_CONCURRENT_FETCHES = int(os.getenv('FEED_MAX_CONCURRENT_FETCHES', 16))
+    FEED_MAX_FETCHES_PER_HOST = int(os.getenv('FEED_MAX_FETCHES_PER_HOST', 2))
+    FEED_KEEPALIVE_SECONDS = int(os.getenv('FEED_KEEPALIVE_SECONDS', 30))
+    FEED_DNS_CACHE_SECONDS = int(os.getenv('FEED_DNS_CACHE_SECONDS', 300))
+
+    # Flusso dei nuovi articoli: eventi in coda per consumatore, attesa massima del fetcher
+    # su un consumatore lento (secondi) e link ricordati per riconoscere gli articoli nuovi
+    ARTICLE_STREAM_QUEUE_SIZE = int(os.getenv('ARTICLE_STREAM_QUEUE_SIZE', 100))
+    ARTICLE_STREAM_PUT_TIMEOUT = float(os.getenv('ARTICLE_STREAM_PUT_TIMEOUT', 2))
+    ARTICLE_STREAM_SEEN_MAX = int(os.getenv('ARTICLE_STREAM_SEEN_MAX', 20000))
+
+    # WebSub: URL pubblico di base per le callback degli hub (disattivato se assente),
+    # durata richiesta delle sottoscrizioni, anticipo del rinnovo e attesa dopo un rifiuto dell'hub (secondi)
+    WEBSUB_CALLBACK_BASE = os.getenv('WEBSUB_CALLBACK_BASE') or (
+        f"https://{os.getenv('RENDER_EXTERNAL_HOSTNAME')}" if os.getenv('RENDER_EXTERNAL_HOSTNAME') else None
+    )
+    WEBSUB_LEASE_SECONDS = int(os.getenv('WEBSUB_LEASE_SECONDS', 10 * 86400))
+    WEBSUB_RENEW_MARGIN = int(os.getenv('WEBSUB_RENEW_MARGIN', 86400))
+    WEBSUB_DENIED_RETRY_SECONDS = int(os.getenv('WEBSUB_DENIED_RETRY_SECONDS', 86400))
+
+    # Invii automatici: messaggi al secondo per tutto il bot, secondi tra due messaggi alla stessa
+    # chat privata, messaggi al minuto per gruppo, mittenti in parallelo e intervallo dei log di avanzamento.
+    # Il limite di Telegram è 30 msg/s: il margine assorbe il messaggio in più del token bucket e il jitter
+    BROADCAST_GLOBAL_RATE = float(os.getenv('BROADCAST_GLOBAL_RATE', 25))
+    BROADCAST_CHAT_INTERVAL = float(os.getenv('BROADCAST_CHAT_INTERVAL', 1))
+    BROADCAST_GROUP_PER_MINUTE = float(os.getenv('BROADCAST_GROUP_PER_MINUTE', 20))
+    BROADCAST_WORKERS = int(os.getenv('BROADCAST_WORKERS', 16))
+    BROADCAST_PROGRESS_SECONDS = float(os.getenv('BROADCAST_PROGRESS_SECONDS', 10))
+    # Tentativi per chat (flood control, timeout, errori di rete) e backoff dei ritentativi (secondi)
+    BROADCAST_MAX_ATTEMPTS = int(os.getenv('BROADCAST_MAX_ATTEMPTS', 5))
+    BROADCAST_BASE_BACKOFF = float(os.getenv('BROADCAST_BASE_BACKOFF', 1))
+    BROADCAST_MAX_BACKOFF = float(os.getenv('BROADCAST_MAX_BACKOFF', 30))
+
+    # Coda di consegna persistente: esiti salvati ogni N invii, ripresa delle edizioni interrotte
+    # (minuti), età massima di un'edizione da riprendere (ore) e conservazione delle edizioni (giorni)
+    DELIVERY_FLUSH_SIZE = int(os.getenv('DELIVERY_FLUSH_SIZE', 50))
+    DELIVERY_RESUME_MINUTES = int(os.getenv('DELIVERY_RESUME_MINUTES', 5))
+    DELIVERY_RESUME_MAX_AGE_HOURS = int(os.getenv('DELIVERY_RESUME_MAX_AGE_HOURS', 12))
+    DELIVERY_RETENTION_DAYS = int(os.getenv('DELIVERY_RETENTION_DAYS', 7))
+    # Giorni per cui si ricorda quali articoli ha già ricevuto ogni chat
+    SENT_LEDGER_DAYS = int(os.getenv('SENT_LEDGER_DAYS', 7))
+
+    # Messaggi di notizie già formattati (per categoria, articoli, lingua e formato)
+    RENDER_CACHE_MAX_ENTRIES = int(os.getenv('RENDER_CACHE_MAX_ENTRIES', 256))
+
+    # Polling adattivo dei feed (secondi)
+    FEED_MIN_POLL_SECONDS = int(os.getenv('FEED_MIN_POLL_SECONDS', 120))
+    FEED_MAX_POLL_SECONDS = int(os.getenv('FEED_MAX_POLL_SECONDS', 7200))
+    FEED_DEFAULT_POLL_SECONDS = int(os.getenv('FEED_DEFAULT_POLL_SECONDS', 600))
+
+    # Circuit breaker dei feed: errori consecutivi prima dell'apertura e backoff (secondi)
+    FEED_BREAKER_THRESHOLD = int(os.getenv('FEED_BREAKER_THRESHOLD', 3))
+    FEED_BREAKER_BASE_BACKOFF = int(os.getenv('FEED_BREAKER_BASE_BACKOFF', 60))
+    FEED_BREAKER_MAX_BACKOFF = int(os.getenv('FEED_BREAKER_MAX_BACKOFF', 3600))
+
 # Inserisci il tuo token qui
 TOKEN = os.getenv("TELEGRAM_TOKEN")
 
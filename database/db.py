@@ -1,5 +1,5 @@
 import sqlite3
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set, Tuple
 from utils.logger import logger
 from datetime import datetime, timedelta
 import os
@@ -85,6 +85,130 @@ class Database:
                 )
                 ''')
 
+                # Validatori HTTP dei feed (ETag / Last-Modified) per le richieste condizionali
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    updated_at TEXT
+                )
+                ''')
+
+                # La vecchia tabella `articles` duplicava l'archivio: l'ultima versione nota
+                # di ogni categoria si legge ora da article_archive
+                cursor.execute("DROP TABLE IF EXISTS articles")
+
+                # Archivio storico: un articolo per link, indicizzato full-text (FTS5, ranking BM25)
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS article_archive (
+                    id INTEGER PRIMARY KEY,
+                    link TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    summary TEXT DEFAULT '',
+                    source TEXT,
+                    lang TEXT,
+                    categories TEXT DEFAULT ',',
+                    published_ts REAL,
+                    date_str TEXT
+                )
+                ''')
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_archive_published ON article_archive (published_ts)"
+                )
+                cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS article_archive_fts USING fts5(
+                    title, summary,
+                    content='article_archive', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+                ''')
+                # Trigger che mantengono l'indice FTS allineato (solo se cambiano titolo o sommario)
+                cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS article_archive_ai AFTER INSERT ON article_archive BEGIN
+                    INSERT INTO article_archive_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END
+                ''')
+                cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS article_archive_ad AFTER DELETE ON article_archive BEGIN
+                    INSERT INTO article_archive_fts (article_archive_fts, rowid, title, summary)
+                    VALUES ('delete', old.id, old.title, old.summary);
+                END
+                ''')
+                cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS article_archive_au AFTER UPDATE OF title, summary ON article_archive BEGIN
+                    INSERT INTO article_archive_fts (article_archive_fts, rowid, title, summary)
+                    VALUES ('delete', old.id, old.title, old.summary);
+                    INSERT INTO article_archive_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END
+                ''')
+
+                # Sottoscrizioni WebSub: il segreto HMAC deve sopravvivere ai riavvii
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS websub_subscriptions (
+                    url TEXT PRIMARY KEY,
+                    sub_id TEXT NOT NULL UNIQUE,
+                    hub TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    secret TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    lease_expires REAL,
+                    updated_at TEXT
+                )
+                ''')
+
+                # Coda di consegna persistente: un'edizione per invio, una riga per (edizione, chat).
+                # Sopravvive ai riavvii: le righe 'pending' vengono riprese, le 'sent' mai reinviate
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS editions (
+                    edition_id TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    article_ids TEXT NOT NULL DEFAULT '[]',
+                    created_at REAL NOT NULL
+                )
+                ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS deliveries (
+                    edition_id TEXT NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (edition_id, chat_id)
+                ) WITHOUT ROWID
+                ''')
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_deliveries_pending ON deliveries(edition_id) WHERE state = 'pending'"
+                )
+
+                # Articoli già consegnati a ogni chat (ID = hash a 64 bit del link), con scadenza.
+                # La chiave parte dall'articolo: un'unica query trova tutte le chat che lo hanno già ricevuto
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sent_articles (
+                    article_id INTEGER NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    sent_at REAL NOT NULL,
+                    PRIMARY KEY (article_id, chat_id)
+                ) WITHOUT ROWID
+                ''')
+
+                # Nuovi articoli in attesa del prossimo invio automatico, per categoria di invio:
+                # sopravvivono ai riavvii (le categorie giornaliere accumulano fino a 24 ore di notizie)
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pending_news (
+                    category TEXT NOT NULL,
+                    link TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    source TEXT,
+                    lang TEXT,
+                    published_ts REAL,
+                    date_str TEXT,
+                    PRIMARY KEY (category, link)
+                ) WITHOUT ROWID
+                ''')
+
                 conn.commit()
                 self.logger.info("Database initialized successfully")
 
@@ -433,4 +557,415 @@ class Database:
 
     def get_user_count(self) -> int:
         """Compatibilità: restituisce il numero totale di utenti unici iscritti."""
-        return self.get_total_subscribers()
\ No newline at end of file
+        return self.get_total_subscribers()
+
+    def get_feed_validators(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """Restituisce ETag e Last-Modified salvati per ogni feed"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT url, etag, last_modified FROM feed_validators")
+                return {
+                    row['url']: {'etag': row['etag'], 'last_modified': row['last_modified']}
+                    for row in cursor.fetchall()
+                }
+        except Exception as e:
+            self.logger.error(f"Error getting feed validators: {e}")
+            return {}
+
+    def save_feed_validators(self, url: str, etag: Optional[str], last_modified: Optional[str]) -> bool:
+        """Salva (o aggiorna) i validatori HTTP di un feed"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO feed_validators (url, etag, last_modified, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (url, etag, last_modified, datetime.now().isoformat())
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error saving feed validators for {url}: {e}")
+            return False
+
+    def get_articles(self, categories: List[str], limit: int = 5) -> List[Tuple[str, str, str, str, str]]:
+        """Restituisce gli articoli archiviati più recenti delle categorie indicate.
+
+        Returns (title, link, source, date, language)
+        """
+        if not categories:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute(
+                    "SELECT title, link, source, date_str, lang FROM article_archive "
+                    "WHERE " + " OR ".join("instr(categories, ?) > 0" for _ in categories) + " "
+                    "ORDER BY published_ts DESC LIMIT ?",
+                    [f",{category}," for category in categories] + [limit]
+                )
+                return [
+                    (row['title'], row['link'], row['source'], row['date_str'], row['lang'])
+                    for row in cursor.fetchall()
+                ]
+        except Exception as e:
+            self.logger.error(f"Error getting articles for {categories}: {e}")
+            return []
+
+    def archive_articles(self, articles: List[Tuple]) -> bool:
+        """Aggiunge gli articoli all'archivio full-text; le righe invariate non vengono riscritte.
+
+        Ogni tupla: (link, title, summary, source, lang, categories, published_ts, date_str)
+        con categories nel formato ',cat1,cat2,'
+        """
+        if not articles:
+            return True
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    "INSERT INTO article_archive "
+                    "(link, title, summary, source, lang, categories, published_ts, date_str) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(link) DO UPDATE SET "
+                    "title = excluded.title, summary = excluded.summary, "
+                    "categories = CASE WHEN instr(article_archive.categories, excluded.categories) > 0 "
+                    "THEN article_archive.categories "
+                    "ELSE article_archive.categories || substr(excluded.categories, 2) END "
+                    "WHERE article_archive.title != excluded.title "
+                    "OR article_archive.summary != excluded.summary "
+                    "OR instr(article_archive.categories, excluded.categories) = 0",
+                    articles
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error archiving {len(articles)} articles: {e}")
+            return False
+
+    def search_archive(self, match: str, limit: int = 5, since: Optional[float] = None,
+                       until: Optional[float] = None,
+                       categories: Optional[List[str]] = None) -> List[Tuple[str, str, str, str, str]]:
+        """Ricerca full-text nell'archivio, ordinata per rilevanza BM25 (titolo pesato più del sommario).
+
+        `match` è un'espressione FTS5 già validata; since/until sono timestamp epoch.
+        Returns (title, link, source, date, language)
+        """
+        try:
+            query = (
+                "SELECT a.title, a.link, a.source, a.date_str, a.lang "
+                "FROM article_archive_fts f JOIN article_archive a ON a.id = f.rowid "
+                "WHERE article_archive_fts MATCH ?"
+            )
+            params: List[Any] = [match]
+            if since is not None:
+                query += " AND a.published_ts >= ?"
+                params.append(since)
+            if until is not None:
+                query += " AND a.published_ts < ?"
+                params.append(until)
+            if categories:
+                query += " AND (" + " OR ".join("instr(a.categories, ?) > 0" for _ in categories) + ")"
+                params.extend(f",{category}," for category in categories)
+            query += " ORDER BY bm25(article_archive_fts, 10.0, 1.0), a.published_ts DESC LIMIT ?"
+            params.append(limit)
+
+            with self.get_connection() as conn:
+                cursor = conn.execute(query, params)
+                return [
+                    (row['title'], row['link'], row['source'], row['date_str'], row['lang'])
+                    for row in cursor.fetchall()
+                ]
+        except Exception as e:
+            self.logger.error(f"Error searching archive for {match!r}: {e}")
+            return []
+
+    def prune_archive(self, days: int = 365) -> int:
+        """Elimina dall'archivio gli articoli più vecchi di `days` giorni"""
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+            with self.get_connection() as conn:
+                cursor = conn.execute("DELETE FROM article_archive WHERE published_ts < ?", (cutoff,))
+                return cursor.rowcount
+        except Exception as e:
+            self.logger.error(f"Error pruning archive: {e}")
+            return 0
+
+    def optimize_archive(self, pages: int = 500) -> bool:
+        """Merge incrementale dei segmenti FTS5: lavoro limitato a `pages` pagine per esecuzione"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute(
+                    "INSERT INTO article_archive_fts (article_archive_fts, rank) VALUES ('merge', ?)",
+                    (pages,)
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error optimizing archive index: {e}")
+            return False
+
+    def get_websub_subscriptions(self) -> List[Dict[str, Any]]:
+        """Restituisce tutte le sottoscrizioni WebSub salvate"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT url, sub_id, hub, topic, secret, state, lease_expires, updated_at FROM websub_subscriptions"
+                )
+                return cursor.fetchall()
+        except Exception as e:
+            self.logger.error(f"Error getting WebSub subscriptions: {e}")
+            return []
+
+    def save_websub_subscription(self, url: str, sub_id: str, hub: str, topic: str, secret: str,
+                                 state: str, lease_expires: Optional[float]) -> bool:
+        """Salva (o aggiorna) la sottoscrizione WebSub di un feed"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO websub_subscriptions "
+                    "(url, sub_id, hub, topic, secret, state, lease_expires, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, sub_id, hub, topic, secret, state, lease_expires, datetime.now().isoformat())
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error saving WebSub subscription for {url}: {e}")
+            return False
+
+    def enqueue_edition(self, edition_id: str, category: str, message: str, chat_ids: List[int],
+                        article_ids: Optional[List[int]] = None) -> int:
+        """Salva un'edizione e una consegna 'pending' per chat, in un'unica transazione.
+
+        Idempotente: un'edizione già in coda non viene duplicata. Restituisce le consegne aggiunte.
+        """
+        try:
+            now = datetime.now().timestamp()
+            with self.get_connection() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO editions (edition_id, category, message, article_ids, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (edition_id, category, message, json.dumps(article_ids or []), now)
+                )
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO deliveries (edition_id, chat_id, updated_at) VALUES (?, ?, ?)",
+                    [(edition_id, chat_id, now) for chat_id in chat_ids]
+                )
+                return max(cursor.rowcount, 0)
+        except Exception as e:
+            self.logger.error(f"Error enqueueing edition {edition_id}: {e}")
+            return 0
+
+    def get_unfinished_editions(self) -> List[Dict[str, Any]]:
+        """Edizioni con consegne ancora 'pending', dalla più vecchia"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT e.edition_id, e.category, e.message, e.article_ids, e.created_at, COUNT(*) AS pending
+                    FROM deliveries d
+                    JOIN editions e ON e.edition_id = d.edition_id
+                    WHERE d.state = 'pending'
+                    GROUP BY e.edition_id
+                    ORDER BY e.created_at
+                """)
+                editions = cursor.fetchall()
+                for edition in editions:
+                    edition['article_ids'] = json.loads(edition['article_ids'] or '[]')
+                return editions
+        except Exception as e:
+            self.logger.error(f"Error getting unfinished editions: {e}")
+            return []
+
+    def get_pending_deliveries(self, edition_id: str) -> List[int]:
+        """Chat che non hanno ancora ricevuto l'edizione"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT chat_id FROM deliveries WHERE edition_id = ? AND state = 'pending'",
+                    (edition_id,)
+                )
+                return [row['chat_id'] for row in cursor.fetchall()]
+        except Exception as e:
+            self.logger.error(f"Error getting pending deliveries for {edition_id}: {e}")
+            return []
+
+    def mark_deliveries(self, edition_id: str, results: List[Tuple[int, str, Optional[str]]]) -> bool:
+        """Aggiorna in blocco lo stato delle consegne: (chat_id, 'sent'/'failed', errore)"""
+        if not results:
+            return True
+        try:
+            now = datetime.now().timestamp()
+            with self.get_connection() as conn:
+                conn.executemany(
+                    "UPDATE deliveries SET state = ?, error = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE edition_id = ? AND chat_id = ? AND state = 'pending'",
+                    [(state, error, now, edition_id, chat_id) for chat_id, state, error in results]
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error marking deliveries for {edition_id}: {e}")
+            return False
+
+    def fail_pending_deliveries(self, edition_id: str, error: str) -> int:
+        """Rinuncia alle consegne rimaste 'pending' di un'edizione (es. troppo vecchia)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute(
+                    "UPDATE deliveries SET state = 'failed', error = ?, updated_at = ? "
+                    "WHERE edition_id = ? AND state = 'pending'",
+                    (error, datetime.now().timestamp(), edition_id)
+                )
+                return cursor.rowcount
+        except Exception as e:
+            self.logger.error(f"Error failing deliveries for {edition_id}: {e}")
+            return 0
+
+    def get_delivery_stats(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Consegne per stato delle ultime `limit` edizioni"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT e.edition_id, e.category, e.created_at,
+                           SUM(d.state = 'pending') AS pending,
+                           SUM(d.state = 'sent') AS sent,
+                           SUM(d.state = 'failed') AS failed
+                    FROM editions e
+                    JOIN deliveries d ON d.edition_id = e.edition_id
+                    GROUP BY e.edition_id
+                    ORDER BY e.created_at DESC
+                    LIMIT ?
+                """, (limit,))
+                return cursor.fetchall()
+        except Exception as e:
+            self.logger.error(f"Error getting delivery stats: {e}")
+            return []
+
+    def prune_deliveries(self, days: int = 7) -> int:
+        """Rimuove le edizioni più vecchie di `days` giorni con le loro consegne"""
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+            with self.get_connection() as conn:
+                conn.execute(
+                    "DELETE FROM deliveries WHERE edition_id IN (SELECT edition_id FROM editions WHERE created_at < ?)",
+                    (cutoff,)
+                )
+                cursor = conn.execute("DELETE FROM editions WHERE created_at < ?", (cutoff,))
+                return cursor.rowcount
+        except Exception as e:
+            self.logger.error(f"Error pruning deliveries: {e}")
+            return 0
+
+    def get_seen_articles(self, article_ids: List[int], days: int = 7) -> Dict[int, Set[int]]:
+        """chat_id -> articoli (tra `article_ids`) già consegnati negli ultimi `days` giorni.
+
+        Una sola query per tutte le chat, pensata per i pochi articoli di un invio.
+        """
+        if not article_ids:
+            return {}
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+            placeholders = ','.join('?' * len(article_ids))
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT chat_id, article_id FROM sent_articles "
+                    f"WHERE article_id IN ({placeholders}) AND sent_at >= ?",
+                    (*article_ids, cutoff)
+                )
+                seen: Dict[int, Set[int]] = {}
+                for row in cursor.fetchall():
+                    seen.setdefault(row['chat_id'], set()).add(row['article_id'])
+                return seen
+        except Exception as e:
+            self.logger.error(f"Error getting seen articles: {e}")
+            return {}
+
+    def record_sent_articles(self, rows: List[Tuple[int, int]]) -> bool:
+        """Registra in blocco gli articoli consegnati: (article_id, chat_id)"""
+        if not rows:
+            return True
+        try:
+            now = datetime.now().timestamp()
+            with self.get_connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sent_articles (article_id, chat_id, sent_at) VALUES (?, ?, ?)",
+                    [(article_id, chat_id, now) for article_id, chat_id in rows]
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error recording sent articles: {e}")
+            return False
+
+    def prune_sent_articles(self, days: int = 7) -> int:
+        """Dimentica gli articoli consegnati più di `days` giorni fa"""
+        try:
+            cutoff = (datetime.now() - timedelta(days=days)).timestamp()
+            with self.get_connection() as conn:
+                cursor = conn.execute("DELETE FROM sent_articles WHERE sent_at < ?", (cutoff,))
+                return cursor.rowcount
+        except Exception as e:
+            self.logger.error(f"Error pruning sent articles: {e}")
+            return 0
+
+    def queue_pending_news(self, category: str, articles: List[Tuple], limit: int = 50) -> bool:
+        """Accoda i nuovi articoli di una categoria, tenendo solo i `limit` più recenti.
+
+        Ogni tupla: (link, title, source, lang, published_ts, date_str)
+        """
+        if not articles:
+            return True
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO pending_news "
+                    "(category, link, title, source, lang, published_ts, date_str) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(category, *article) for article in articles]
+                )
+                conn.execute(
+                    "DELETE FROM pending_news WHERE category = ? AND link NOT IN ("
+                    "SELECT link FROM pending_news WHERE category = ? "
+                    "ORDER BY published_ts DESC LIMIT ?)",
+                    (category, category, limit)
+                )
+                return True
+        except Exception as e:
+            self.logger.error(f"Error queueing pending news for {category}: {e}")
+            return False
+
+    def take_pending_news(self, category: str) -> List[Tuple]:
+        """Svuota la coda di una categoria restituendo gli articoli dal più recente.
+
+        Returns (link, title, source, lang, published_ts, date_str)
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute(
+                    "SELECT link, title, source, lang, published_ts, date_str FROM pending_news "
+                    "WHERE category = ? ORDER BY published_ts DESC",
+                    (category,)
+                )
+                rows = [(row['link'], row['title'], row['source'], row['lang'], row['published_ts'], row['date_str'])
+                        for row in cursor.fetchall()]
+                conn.execute("DELETE FROM pending_news WHERE category = ?", (category,))
+                return rows
+        except Exception as e:
+            self.logger.error(f"Error taking pending news for {category}: {e}")
+            return []
+
+    def get_pending_news_counts(self) -> Dict[str, int]:
+        """Articoli in attesa di invio per categoria"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.execute("SELECT category, COUNT(*) AS count FROM pending_news GROUP BY category")
+                return {row['category']: row['count'] for row in cursor.fetchall()}
+        except Exception as e:
+            self.logger.error(f"Error counting pending news: {e}")
+            return {}
+
+    def clear_pending_news(self) -> int:
+        """Scarta tutti gli articoli in attesa di invio"""
+        try:
+            with self.get_connection() as conn:
+                return conn.execute("DELETE FROM pending_news").rowcount
+        except Exception as e:
+            self.logger.error(f"Error clearing pending news: {e}")
+            return 0
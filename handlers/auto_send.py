@@ -1,23 +1,73 @@
 import asyncio
+import hashlib
 
 from apscheduler.schedulers import SchedulerAlreadyRunningError
 from telegram import Update
 from telegram.error import BadRequest, Forbidden
 from telegram.ext import ContextTypes
 
-from utils.news_fetcher import news_fetcher
-from utils.helpers import format_news
+from utils.broadcaster import Broadcaster, BroadcastProgress, DELIVERED, INVALID
+from utils.news_fetcher import news_fetcher, merge_latest
+from utils.feed_cache import Article
+from utils.helpers import format_news, message_length, MAX_MESSAGE_LENGTH
+from utils.render_cache import render_cache, RenderedEdition, FORMAT_BROADCAST, FORMAT_DIGEST
+from utils.sent_ledger import article_id, group_by_unseen
 from database.db import Database
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import List, Tuple, Optional
 from datetime import datetime, timedelta
 from config import Config
 
 logger = logging.getLogger(__name__)
 db = Database()
-
-# Cache per le notizie inviate
-last_sent_news: Dict[str, List[Tuple[str, str, str]]] = {}
+# Limiti di invio condivisi da tutti i job di categoria
+broadcaster = Broadcaster(
+    global_rate=Config.BROADCAST_GLOBAL_RATE,
+    chat_interval=Config.BROADCAST_CHAT_INTERVAL,
+    group_per_minute=Config.BROADCAST_GROUP_PER_MINUTE,
+    workers=Config.BROADCAST_WORKERS,
+    progress_interval=Config.BROADCAST_PROGRESS_SECONDS,
+    max_attempts=Config.BROADCAST_MAX_ATTEMPTS,
+    base_backoff=Config.BROADCAST_BASE_BACKOFF,
+    max_backoff=Config.BROADCAST_MAX_BACKOFF
+)
+
+# Articoli nuovi non ancora inviati per categoria di invio (alimentati dal flusso del fetcher),
+# conservati nel database: un riavvio non perde le notizie raccolte dall'ultimo invio
+PENDING_MAX_PER_CATEGORY = 50
+_listener_task: Optional[asyncio.Task] = None
+# Edizioni in corso di invio in questo processo (la ripresa periodica non le duplica)
+_delivering = set()
+
+
+def _broadcast_category(feed_category: str) -> str:
+    """Categoria di invio di una categoria di RSS_FEEDS ('generale_it'/'generale_en' -> 'generale')"""
+    return 'generale' if feed_category.startswith('generale') else feed_category
+
+
+async def collect_new_articles(subscription) -> None:
+    """Accoda nel database i nuovi articoli pubblicati dal fetcher, per categoria di invio"""
+    async for event in subscription:
+        rows = [(article.link, article.title, article.source, article.lang, article.published_ts, article.date_str)
+                for article in event.articles]
+        for category in {_broadcast_category(feed_category) for feed_category in event.categories}:
+            db.queue_pending_news(category, rows, PENDING_MAX_PER_CATEGORY)
+
+
+def start_news_listener() -> None:
+    """Sottoscrive gli invii automatici al flusso dei nuovi articoli (una sola volta)"""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        subscription = news_fetcher.stream.subscribe('auto_send')
+        _listener_task = asyncio.create_task(collect_new_articles(subscription))
+
+
+def take_pending_news(category: str, limit: int) -> List[Tuple[str, str, str, str, str]]:
+    """Le `limit` notizie nuove più recenti di una categoria (una per storia); svuota la coda"""
+    pending = [Article(title, link, source, lang, published_ts, date_str)
+               for link, title, source, lang, published_ts, date_str in db.take_pending_news(category)]
+    latest = merge_latest([pending], limit, key=news_fetcher.clusters.cluster_of)
+    return [article.as_tuple() for article in latest]
 
 
 async def send_news_to_subscribers(bot, category: str, force_update: bool = False) -> int:
@@ -50,73 +100,50 @@ async def send_news_to_subscribers(bot, category: str, force_update: bool = Fals
         preview_ids = subscriber_ids[:5]
         logger.info(f"Subscriber IDs: {preview_ids}{'... e altri' if len(subscriber_ids) > 5 else ''}")
 
-        # Recupera le notizie
+        # Recupera le notizie: solo quelle nuove dall'ultimo invio, tutte le ultime se forzato
         try:
-            news = await news_fetcher.get_news(category, limit=5)
+            if force_update:
+                news = await news_fetcher.get_news(category, limit=5)
+            else:
+                news = take_pending_news(category, limit=5)
             if not news:
-                logger.info(f"Nessuna notizia trovata per {category}")
+                logger.info(f"Nessuna notizia nuova per {category} dall'ultimo invio, salto")
                 return 0
         except Exception as e:
             logger.error(f"Errore nel recupero notizie per {category}: {e}")
             return 0
 
-        # Verifica se le notizie sono già state inviate recentemente (cache)
-        if not force_update and category in last_sent_news:
-            # Confronta titoli per evitare duplicati
-            old_titles = set(item[0] for item in last_sent_news[category])
-            new_titles = set(item[0] for item in news)
-
-            if old_titles == new_titles:
-                logger.info(f"Le stesse notizie per {category} sono già state inviate di recente, salto")
-                return 0
-
-        # Aggiorna la cache
-        last_sent_news[category] = news
-
-        # Formatta il messaggio
-        try:
-            message = f"📰 *Ultime notizie {category.upper()}*\n\n{format_news(news)}"
-        except Exception as e:
-            logger.error(f"Errore nella formattazione del messaggio per {category}: {e}")
-            message = f"📰 *Ultime notizie {category.upper()}*\n\n"
-            for i, (title, url, source) in enumerate(news, 1):
-                message += f"{i}. {title} ({source})\n{url}\n\n"
-
-        # Invia a tutti gli iscritti
-        success_count = 0
-        error_count = 0
-        for user_id in subscriber_ids:  # Usa la lista di ID invece del dizionario direttamente
-            try:
-                # Log dettagliato prima dell'invio
-                logger.debug(f"Invio notizie {category} a utente {user_id}")
-
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode="Markdown",
-                    disable_web_page_preview=True
-                )
-                success_count += 1
-                await asyncio.sleep(0.2)  # Rate limiting più rilassato
-
-            except (BadRequest, Forbidden) as e:
-                logger.warning(f"Impossibile inviare a {user_id}: {e}")
-                db.unsubscribe(user_id, category)  # Rimuovi iscritti non validi
-                error_count += 1
-
-            except Exception as e:
-                logger.error(f"Errore invio a {user_id}: {e}")
-                error_count += 1
-                # Continua con gli altri utenti
-                await asyncio.sleep(1)  # Pausa più lunga in caso di errore
-
-        # Aggiorna le statistiche nel database
-        try:
-            db.increment_news_sent(success_count)
-        except Exception as e:
-            logger.error(f"Errore nell'aggiornamento delle statistiche: {e}")
+        # Ogni iscritto riceve solo le notizie che non ha già ricevuto: una query per tutti gli iscritti.
+        # L'invio forzato (test) le manda comunque a tutti
+        article_ids = [article_id(item[1]) for item in news]
+        seen = {} if force_update else db.get_seen_articles(article_ids, Config.SENT_LEDGER_DAYS)
+        groups = group_by_unseen(subscriber_ids, article_ids, seen)
+        if not groups:
+            logger.info(f"Tutti gli iscritti a {category} hanno già ricevuto queste notizie, salto")
+            return 0
 
-        logger.info(f"Inviate notizie {category} a {success_count}/{len(subscriber_ids)} utenti (errori: {error_count})")
+        # Un'edizione persistente per gruppo di iscritti con le stesse notizie da ricevere:
+        # una consegna 'pending' per chat, ripresa dopo un riavvio. La stessa edizione non
+        # viene mai accodata (né inviata) due volte alla stessa chat
+        deliveries = []
+        for indices, chat_ids in groups.items():
+            subset = [news[i] for i in indices]
+            subset_ids = [article_ids[i] for i in indices]
+            message = _render_broadcast(category, subset)
+            edition_id = edition_key(category, subset, unique=force_update)
+            if not db.enqueue_edition(edition_id, category, message, chat_ids, subset_ids):
+                logger.info(f"Edizione {edition_id} già in coda o inviata, salto")
+                continue
+            deliveries.append(deliver_edition(bot, edition_id, category, message, subset_ids))
+
+        results = [progress for progress in await asyncio.gather(*deliveries) if progress is not None]
+        success_count = sum(progress.delivered for progress in results)
+
+        logger.info(f"Inviate notizie {category} a {success_count}/{len(subscriber_ids)} utenti in "
+                    f"{len(results)} edizioni (già ricevute da {len(subscriber_ids) - sum(map(len, groups.values()))}, "
+                    f"ritentati: {sum(progress.retried for progress in results)}, "
+                    f"scartati: {sum(progress.dropped for progress in results)}, "
+                    f"non validi: {sum(progress.invalid for progress in results)})")
         return success_count
 
     except Exception as e:
@@ -124,6 +151,106 @@ async def send_news_to_subscribers(bot, category: str, force_update: bool = Fals
         return 0
 
 
+def _render_broadcast(category: str, news: List[Tuple]) -> str:
+    """Messaggio di un invio automatico (formattato una sola volta per insieme di articoli)"""
+    try:
+        alternates = news_fetcher.alternate_sources(news)
+        header = f"📰 *Ultime notizie {category.upper()}*\n\n"
+        max_length = MAX_MESSAGE_LENGTH - message_length(header)
+        return render_cache.render(category, news, FORMAT_BROADCAST, lambda: RenderedEdition(
+            header + format_news(news, alternates=alternates, max_length=max_length)
+        ), alternates=alternates, max_length=max_length).text
+    except Exception as e:
+        logger.error(f"Errore nella formattazione del messaggio per {category}: {e}")
+        message = f"📰 *Ultime notizie {category.upper()}*\n\n"
+        for i, item in enumerate(news, 1):
+            title, url, source = item[:3]
+            message += f"{i}. {title} ({source})\n{url}\n\n"
+        return message
+
+
+def edition_key(category: str, news: List[Tuple], unique: bool = False) -> str:
+    """Identificativo di un'edizione: categoria e link inviati (unique: nuova edizione anche se uguale)"""
+    digest = hashlib.sha1("\n".join(item[1] for item in news).encode('utf-8')).hexdigest()[:16]
+    key = f"{category}:{digest}"
+    return f"{key}:{int(datetime.now().timestamp())}" if unique else key
+
+
+async def deliver_edition(bot, edition_id: str, category: str, message: str,
+                          article_ids: Optional[List[int]] = None) -> Optional[BroadcastProgress]:
+    """Invia un'edizione alle chat ancora 'pending' e ne salva gli esiti a blocchi.
+
+    Gli esiti (e gli articoli consegnati, nel registro per chat) vengono scritti ogni
+    DELIVERY_FLUSH_SIZE invii: dopo un crash solo le consegne dell'ultimo blocco non
+    salvato possono arrivare due volte.
+    """
+    if edition_id in _delivering:
+        return None
+    _delivering.add(edition_id)
+    results: List[Tuple[int, str, Optional[str]]] = []
+
+    def flush():
+        if results:
+            db.mark_deliveries(edition_id, results)
+            db.record_sent_articles([(aid, chat_id) for chat_id, state, _ in results if state == 'sent'
+                                     for aid in article_ids or ()])
+            results.clear()
+
+    def record(chat_id, outcome, error):
+        if outcome == INVALID:
+            db.unsubscribe(chat_id, category)  # Rimuovi iscritti non validi
+        results.append((chat_id, 'sent' if outcome == DELIVERED else 'failed', str(error) if error else None))
+        if len(results) >= Config.DELIVERY_FLUSH_SIZE:
+            flush()
+
+    # Mittenti in parallelo entro i limiti di Telegram
+    async def send(chat_id):
+        await bot.send_message(
+            chat_id=chat_id,
+            text=message,
+            parse_mode="Markdown",
+            disable_web_page_preview=True
+        )
+
+    try:
+        chat_ids = db.get_pending_deliveries(edition_id)
+        progress = await broadcaster.broadcast(f"news_{category}", chat_ids, send, on_result=record)
+    finally:
+        flush()
+        _delivering.discard(edition_id)
+
+    if progress.aborted:
+        # Messaggio rifiutato da Telegram: riprenderlo fallirebbe di nuovo per tutti
+        failed = db.fail_pending_deliveries(edition_id, f"aborted: {progress.aborted}")
+        logger.error(f"Edizione {edition_id} interrotta ({progress.aborted}), {failed} consegne abbandonate")
+
+    # Aggiorna le statistiche nel database
+    try:
+        db.increment_news_sent(progress.delivered)
+    except Exception as e:
+        logger.error(f"Errore nell'aggiornamento delle statistiche: {e}")
+    return progress
+
+
+async def resume_deliveries(bot) -> int:
+    """Riprende le edizioni rimaste a metà (es. riavvio durante un invio)"""
+    resumed = 0
+    max_age = Config.DELIVERY_RESUME_MAX_AGE_HOURS * 3600
+    for edition in db.get_unfinished_editions():
+        edition_id = edition['edition_id']
+        if edition_id in _delivering:
+            continue
+        if datetime.now().timestamp() - edition['created_at'] > max_age:
+            # Notizie ormai vecchie: meglio non inviarle
+            expired = db.fail_pending_deliveries(edition_id, 'expired')
+            logger.warning(f"Edizione {edition_id} troppo vecchia, {expired} consegne abbandonate")
+            continue
+        logger.info(f"Ripresa edizione {edition_id}: {edition['pending']} consegne in sospeso")
+        await deliver_edition(bot, edition_id, edition['category'], edition['message'], edition['article_ids'])
+        resumed += 1
+    return resumed
+
+
 def setup_periodic_jobs(application, scheduler):
     """Configura i job periodici in modo sicuro"""
     try:
@@ -157,6 +284,15 @@ def setup_periodic_jobs(application, scheduler):
                 next_run_time=datetime.now() + timedelta(minutes=1))
             logger.info(f"Job {category} configurato - Intervallo: {interval}")
 
+        # Edizioni interrotte da un riavvio: ripresa subito dopo l'avvio e poi periodicamente
+        scheduler.add_job(
+            resume_deliveries,
+            'interval',
+            args=[application.bot],
+            minutes=Config.DELIVERY_RESUME_MINUTES,
+            id="delivery_resume",
+            next_run_time=datetime.now() + timedelta(seconds=30))
+
         # Job per la pulizia
         scheduler.add_job(
             reset_news_cache,
@@ -165,6 +301,27 @@ def setup_periodic_jobs(application, scheduler):
             id="reset_cache"
         )
 
+        scheduler.add_job(
+            optimize_news_archive,
+            'interval',
+            hours=1,
+            id="archive_optimize"
+        )
+
+        scheduler.add_job(
+            renew_websub_subscriptions,
+            'interval',
+            hours=1,
+            id="websub_renew"
+        )
+
+        scheduler.add_job(
+            news_fetcher.save_snapshot,
+            'interval',
+            minutes=Config.FEED_SNAPSHOT_INTERVAL,
+            id="feed_cache_snapshot"
+        )
+
         scheduler.add_job(
             cleanup_inactive_users,
             'cron',
@@ -179,19 +336,43 @@ def setup_periodic_jobs(application, scheduler):
 
 
 async def reset_news_cache():
-    """Resetta la cache delle news a mezzanotte"""
+    """Manutenzione notturna: rimuove gli articoli scaduti dall'archivio.
+
+    La cache dei feed non viene più svuotata: è limitata (LRU) e resta calda.
+    """
     try:
         from utils.news_fetcher import news_fetcher
 
-        logger.info("🔄 Resetting news cache...")
-        news_fetcher.cache.clear()
-        news_fetcher.last_fetch.clear()
-        logger.info("✅ News cache reset completato")
+        logger.info("🔄 Pulizia archivio notizie...")
+        archived = db.prune_archive(Config.ARCHIVE_RETENTION_DAYS)
+        editions = db.prune_deliveries(Config.DELIVERY_RETENTION_DAYS)
+        forgotten = db.prune_sent_articles(Config.SENT_LEDGER_DAYS)
+        stats = news_fetcher.cache.stats()
+        logger.info(
+            f"✅ Pulizia completata ({archived} articoli scaduti rimossi dall'archivio, "
+            f"{editions} edizioni inviate, {forgotten} consegne dal registro, "
+            f"cache feed: {stats['entries']} feed, {stats['bytes'] // 1024} KiB)"
+        )
 
     except Exception as e:
         logger.error(f"Errore nel reset della cache: {e}")
 
 
+async def optimize_news_archive():
+    """Merge incrementale dell'indice full-text dell'archivio"""
+    if db.optimize_archive(Config.ARCHIVE_MERGE_PAGES):
+        logger.info("Indice archivio ottimizzato (merge incrementale)")
+
+
+async def renew_websub_subscriptions():
+    """Rinnova le sottoscrizioni WebSub in scadenza"""
+    if not news_fetcher.websub.enabled:
+        return
+    renewed = await news_fetcher.renew_websub()
+    if renewed:
+        logger.info(f"Rinnovate {renewed} sottoscrizioni WebSub")
+
+
 async def test_send(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando di test per verificare l'invio"""
     try:
@@ -212,10 +393,9 @@ async def test_send(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 def reset_cache():
-    """Resetta la cache delle notizie inviate."""
-    global last_sent_news
-    logger.info("Reset cache notizie inviate")
-    last_sent_news = {}
+    """Scarta le notizie nuove in attesa di invio."""
+    logger.info("Reset notizie in attesa di invio")
+    db.clear_pending_news()
 
 
 async def cleanup_inactive_users(bot):
@@ -279,13 +459,23 @@ async def send_digest(bot, user_id: int, categories: Optional[List[str]] = None)
             try:
                 news = await news_fetcher.get_news(category, limit=3)
                 if news:
-                    all_news.append(f"📌 *{category.upper()}*:")
-                    all_news.append(format_news(news, include_source=True))
+                    # Blocco della categoria formattato una volta e riusato per tutti gli utenti
+                    alternates = news_fetcher.alternate_sources(news)
+                    all_news.append(render_cache.render(category, news, FORMAT_DIGEST, lambda: RenderedEdition(
+                        f"📌 *{category.upper()}*:\n\n"
+                        + format_news(news, include_source=True, alternates=alternates)
+                    ), alternates=alternates).text)
             except Exception as e:
                 logger.error(f"Errore recupero notizie per categoria {category}: {e}")
 
         if all_news:
-            message = "📰 *RIEPILOGO GIORNALIERO*\n\n" + "\n\n".join(all_news)
+            message = "📰 *RIEPILOGO GIORNALIERO*"
+            for shown, block in enumerate(all_news):
+                # Le categorie che non entrano nel limite di Telegram restano fuori dal riepilogo
+                if message_length(message) + 2 + message_length(block) > MAX_MESSAGE_LENGTH:
+                    logger.warning(f"Riepilogo per {user_id} troppo lungo: mostrate {shown}/{len(all_news)} categorie")
+                    break
+                message += "\n\n" + block
 
             await bot.send_message(
                 chat_id=user_id,
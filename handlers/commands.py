@@ -1,7 +1,9 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CallbackQueryHandler
-from handlers.auto_send import send_digest
-from utils.helpers import format_news
+from handlers.auto_send import broadcaster, send_digest
+from utils.helpers import format_news, format_news_v2, message_length, MAX_MESSAGE_LENGTH
+from utils.render_cache import (render_cache, RenderedEdition, FORMAT_COMMAND, FORMAT_LATEST,
+                                FORMAT_LIST_V2)
 from utils.news_fetcher import news_fetcher
 import config as c
 from utils.logger import logger
@@ -9,7 +11,6 @@ from database.db import Database
 from datetime import datetime, timedelta
 import logging
 import json
-from telegram.helpers import escape_markdown
 
 command_logger = logger.getChild('commands')
 db = Database()
@@ -74,6 +75,7 @@ async def help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 🔍 *Altro*:
 /cerca <testo> - Cerca notizie
+   filtri: since:AAAA-MM-GG until:AAAA-MM-GG cat:ps5
 /sommario - Anteprima notizie
 /dettaglio N - Leggi una notizia
 """
@@ -131,11 +133,18 @@ async def category_command(update: Update, context: ContextTypes.DEFAULT_TYPE, c
             await update.message.reply_text(f"⚠️ Nessuna notizia trovata per {display_name}. Riprova più tardi.")
             return
 
-        msg = f"📰 *Ultime notizie {display_name}*\n\n{format_news(news_list)}"
+        # Stessi articoli di una richiesta precedente: messaggio già pronto
+        alternates = news_fetcher.alternate_sources(news_list)
+        header = f"📰 *Ultime notizie {display_name}*\n\n"
+        max_length = MAX_MESSAGE_LENGTH - message_length(header)
+        edition = render_cache.render(category, news_list, FORMAT_COMMAND, lambda: RenderedEdition(
+            header + format_news(news_list, alternates=alternates, max_length=max_length)
+        ), alternates=alternates, max_length=max_length)
         await update.message.reply_text(
-            msg,
+            edition.text,
             parse_mode="Markdown",
-            disable_web_page_preview=True
+            disable_web_page_preview=True,
+            reply_markup=edition.reply_markup
         )
 
     except Exception as e:
@@ -218,26 +227,18 @@ async def handle_news_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE
                 await query.edit_message_text("⚠️ Nessuna notizia trovata. Riprova più tardi.")
                 return
 
-            msg = []
-            for i, (title, link, source, date, lang) in enumerate(news_list):
-                try:
-                    msg.append(
-                        f"*{i+1}\\. {escape_markdown(title, version=2)}*\n"
-                        f"[{escape_markdown(source, version=2)}]({escape_markdown(link, version=2)}) \\| "
-                        f"{escape_markdown(date, version=2)} \\| {escape_markdown(lang.upper(), version=2)}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error formatting entry {i}: {e}")
-                    continue
-
-            if not msg:
+            edition = render_cache.render(category, news_list, FORMAT_LIST_V2,
+                                          lambda: RenderedEdition(format_news_v2(news_list)),
+                                          language=prefs['lang'])
+            if not edition.text:
                 await query.edit_message_text("⚠️ Errore nel formattare le notizie.")
                 return
 
             await query.edit_message_text(
-                "\n\n".join(msg),
+                edition.text,
                 parse_mode="MarkdownV2",
-                disable_web_page_preview=True
+                disable_web_page_preview=True,
+                reply_markup=edition.reply_markup
             )
 
         except Exception as e:
@@ -374,11 +375,17 @@ async def news_5(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         news_list = await news_fetcher.get_news('generale', limit=5)
         if news_list:
-            msg = f"📰 *Ultime 5 notizie*\n\n{format_news(news_list)}"
+            alternates = news_fetcher.alternate_sources(news_list)
+            header = "📰 *Ultime 5 notizie*\n\n"
+            max_length = MAX_MESSAGE_LENGTH - message_length(header)
+            edition = render_cache.render('generale', news_list, FORMAT_LATEST, lambda: RenderedEdition(
+                header + format_news(news_list, alternates=alternates, max_length=max_length)
+            ), alternates=alternates, max_length=max_length)
             await update.message.reply_text(
-                msg,
+                edition.text,
                 parse_mode="Markdown",
-                disable_web_page_preview=True
+                disable_web_page_preview=True,
+                reply_markup=edition.reply_markup
             )
             db.update_user_activity(update.effective_user.id)
         else:
@@ -393,13 +400,10 @@ async def news_10(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         news_list = await news_fetcher.get_news('generale', limit=10)
         if news_list:
-            msg = "\n\n".join([
-                f"*{i+1}\\. {escape_markdown(title, version=2)}*\n"
-                f"[{escape_markdown(source, version=2)}]({escape_markdown(link, version=2)}) \\| "
-                f"{escape_markdown(date, version=2)} \\| {escape_markdown(lang.upper(), version=2)}"
-                for i, (title, link, source, date, lang) in enumerate(news_list)
-            ])
-            await update.message.reply_text(msg, parse_mode="MarkdownV2", disable_web_page_preview=True)
+            edition = render_cache.render('generale', news_list, FORMAT_LIST_V2,
+                                          lambda: RenderedEdition(format_news_v2(news_list)))
+            await update.message.reply_text(edition.text, parse_mode="MarkdownV2", disable_web_page_preview=True,
+                                            reply_markup=edition.reply_markup)
         else:
             await update.message.reply_text("Nessuna notizia trovata.")
     except Exception as e:
@@ -465,7 +469,9 @@ async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Versione robusta del comando cerca"""
     try:
         if not context.args:
-            await update.message.reply_text("🔍 Usa: /cerca <termine>")
+            await update.message.reply_text(
+                "🔍 Usa: /cerca <termine> [since:AAAA-MM-GG] [until:AAAA-MM-GG] [cat:categoria]"
+            )
             return
 
         search_term = ' '.join(context.args)
@@ -734,6 +740,122 @@ async def debug_scheduler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
+async def debug_feeds(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mostra lo stato dei circuit breaker dei feed (solo admin)"""
+    try:
+        if update.effective_user.id not in c.Config.ADMIN_IDS:
+            await update.message.reply_text("❌ Accesso negato")
+            return
+
+        breakers = news_fetcher.breaker.snapshot()
+        total_feeds = len({url for urls in news_fetcher.RSS_FEEDS.values() for url in urls})
+        open_count = sum(1 for info in breakers.values() if info['state'] == 'open')
+        cache_stats = news_fetcher.cache.stats()
+
+        message = (
+            "🩺 *Stato Feed*\n\n"
+            f"• Feed totali: {total_feeds}\n"
+            f"• Feed con errori: {len(breakers)}\n"
+            f"• Circuiti aperti: {open_count}\n"
+            f"• Cache: {cache_stats['entries']} feed, {cache_stats['articles']} articoli, "
+            f"{cache_stats['bytes'] // 1024} KiB\n\n"
+        )
+        state_icons = {'open': '🔴', 'half_open': '🟡', 'closed': '🟢'}
+        for url, info in sorted(breakers.items(), key=lambda item: item[1]['state'] != 'open'):
+            line = (
+                f"{state_icons.get(info['state'], '⚪')} `{url}`\n"
+                f"  Errori consecutivi: {info['failures']} | Ultimo: `{(info['last_error'] or '-').replace('`', '')}`\n"
+            )
+            if info['open_until']:
+                line += f"  Riapertura: `{info['open_until']}`\n"
+            if len(message) + len(line) > 4000:
+                message += "…"
+                break
+            message += line
+
+        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True)
+    except Exception as e:
+        logger.error(f"Error in debug_feeds: {e}", exc_info=True)
+        await update.message.reply_text("❌ Errore nel recupero dello stato dei feed")
+
+
+async def feed_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mostra i feed più costosi: latenza, byte, parsing, entry, 304 ed errori (solo admin)"""
+    try:
+        if update.effective_user.id not in c.Config.ADMIN_IDS:
+            await update.message.reply_text("❌ Accesso negato")
+            return
+
+        limit = int(context.args[0]) if context.args and context.args[0].isdigit() else 15
+        metrics = news_fetcher.metrics
+        urls = metrics.most_expensive(limit)
+        if not urls:
+            await update.message.reply_text("Nessuna metrica disponibile: nessun feed scaricato finora.")
+            return
+
+        totals = metrics.totals()
+        pool = news_fetcher.connections.stats()
+        reuse = f"{pool['reuse_ratio']:.0%}" if pool['reuse_ratio'] is not None else "-"
+        message = (
+            f"📊 *Feed più costosi* (top {len(urls)})\n"
+            f"Connessioni: {pool['connections_created']} aperte, {pool['connections_reused']} riusate ({reuse})\n"
+            f"Parsing: {totals['parses']} eseguiti, {totals['parses_saved']} evitati (corpo invariato), "
+            f"{totals['not_modified']} risposte 304\n\n"
+        )
+        for url in urls:
+            info = metrics.summary(url)
+            not_modified = f"{info['not_modified_ratio']:.0%}" if info['not_modified_ratio'] is not None else "-"
+            error_rate = f"{info['error_rate']:.0%}" if info['error_rate'] is not None else "-"
+            parse_ms = f"{info['parse_avg'] * 1000:.0f} ms" if info['parse_avg'] is not None else "-"
+            line = (
+                f"`{url}`\n"
+                f"  Richieste: {info['requests']} | Lat. media: {info['latency_avg']}s | p95: {info['latency_p95']}s\n"
+                f"  Ultimo: {info['bytes_last'] // 1024} KiB, {info['entries_last']} entry | Parsing: {parse_ms}\n"
+                f"  304: {not_modified} | Errori: {info['errors']} ({error_rate}) | "
+                f"Troncati: {sum(info['truncations'].values())}\n"
+            )
+            if len(message) + len(line) > 4000:
+                message += "…"
+                break
+            message += line
+
+        await update.message.reply_text(message, parse_mode="Markdown", disable_web_page_preview=True)
+    except Exception as e:
+        logger.error(f"Error in feed_stats: {e}", exc_info=True)
+        await update.message.reply_text("❌ Errore nel recupero delle metriche dei feed")
+
+
+async def broadcast_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mostra l'avanzamento degli invii automatici in corso e gli ultimi completati (solo admin)"""
+    try:
+        if update.effective_user.id not in c.Config.ADMIN_IDS:
+            await update.message.reply_text("❌ Accesso negato")
+            return
+
+        stats = broadcaster.stats()
+        lines = [f"📤 *Invii automatici* (max {stats['global_rate']:g} msg/s, {stats['workers']} mittenti)\n"]
+        if stats['paused_for']:
+            lines.append(f"⏸ Flood control: invii sospesi per altri {stats['paused_for']}s")
+        for info in stats['active']:
+            eta = f", ~{info['eta_seconds']}s rimanenti" if info['eta_seconds'] is not None else ""
+            lines.append(f"▶️ {info['name']}: {info['delivered'] + info['dropped'] + info['invalid']}/{info['total']} "
+                         f"({info['rate']} msg/s{eta})")
+        if not stats['active']:
+            lines.append("Nessun invio in corso.")
+        for info in stats['recent'][:5]:
+            finished = datetime.fromtimestamp(info['finished_at']).strftime('%d/%m %H:%M')
+            status = "⛔" if info['aborted'] else "✅"
+            aborted = ", interrotto: messaggio rifiutato da Telegram" if info['aborted'] else ""
+            lines.append(f"{status} {info['name']} ({finished}): {info['delivered']}/{info['total']} consegnati, "
+                         f"{info['retried']} ritentati, {info['dropped']} scartati, "
+                         f"{info['invalid']} chat non valide, {info['rate']} msg/s{aborted}")
+
+        await update.message.reply_text("\n".join(lines).replace('_', '\\_'), parse_mode="Markdown")
+    except Exception as e:
+        logger.error(f"Error in broadcast_status: {e}", exc_info=True)
+        await update.message.reply_text("❌ Errore nel recupero dello stato degli invii")
+
+
 async def test_send(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Test invio notizie (solo admin)"""
     try:
@@ -1,7 +1,7 @@
 from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler
 from telegram import Update
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import uvicorn
 from config import TOKEN, Config
 from handlers import commands, auto_send, errors
@@ -11,7 +11,9 @@ import os
 import sys
 import io
 from datetime import datetime
-from utils.news_fetcher import news_fetcher
+from utils.news_fetcher import news_fetcher, start_news_fetcher
+from utils.render_cache import render_cache
+from utils.websub import read_body_capped
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from database import db
 
@@ -55,8 +57,10 @@ class TelegramBot:
         retries = 3
         for attempt in range(retries):
             try:
-                # 1. Inizializza news_fetcher
-                await news_fetcher.initialize()
+                # 1. Inizializza news_fetcher e avvia il polling adattivo dei feed;
+                #    gli invii automatici ricevono i nuovi articoli dal flusso del fetcher
+                auto_send.start_news_listener()
+                await start_news_fetcher()
 
                 # 2. Crea l'applicazione Telegram con post_init
                 self.application = (
@@ -130,6 +134,9 @@ class TelegramBot:
             CommandHandler('debug_scheduler', commands.debug_scheduler),
             CommandHandler('test_send', auto_send.test_send),
             CommandHandler('debug_db', commands.debug_database),
+            CommandHandler('debug_feeds', commands.debug_feeds),
+            CommandHandler('feed_stats', commands.feed_stats),
+            CommandHandler('broadcast_status', commands.broadcast_status),
             CommandHandler('becomeadmin', commands.becomeadmin),  # NEW
             # Callbacks
             CallbackQueryHandler(commands.group_toggle_callback, pattern='^group_toggle:'),
@@ -177,8 +184,9 @@ class TelegramBot:
                 self.logger.info("Arresto scheduler")
                 self.scheduler.shutdown(wait=False)
 
-            # Chiudi news fetcher
-            self.logger.info("Chiusura news fetcher")
+            # Salva la cache dei feed per ripartire a caldo, poi chiudi news fetcher
+            self.logger.info("Salvataggio snapshot cache e chiusura news fetcher")
+            await news_fetcher.save_snapshot()
             await news_fetcher.close()
 
             # Arresta l'applicazione
@@ -319,6 +327,89 @@ async def status(self):
         "subscribers": db.Database.get_subscriber_counts(self)
     }
 
+@app.get("/feed_schedule")
+async def feed_schedule():
+    """Prossimo polling, intervallo e cadenza stimata di ogni feed"""
+    return {
+        "poller": "running" if news_fetcher.poller.running else "stopped",
+        "feeds": news_fetcher.poller.snapshot()
+    }
+
+@app.get("/feed_cache")
+async def feed_cache():
+    """Occupazione della cache dei feed (voci, articoli, byte stimati, eviction)"""
+    return news_fetcher.cache.stats()
+
+
+@app.get("/feed_metrics")
+async def feed_metrics(limit: int = 0):
+    """Metriche per feed, dal più costoso (limit=0: tutti)"""
+    metrics = news_fetcher.metrics
+    return {
+        'totals': metrics.totals(),
+        'feeds': {url: metrics.summary(url) for url in metrics.most_expensive(limit or None)},
+    }
+
+
+@app.get("/fetch_pool")
+async def fetch_pool():
+    """Download in corso e in coda (globali e per host) e riuso delle connessioni"""
+    return {**news_fetcher.limiter.stats(), **news_fetcher.connections.stats()}
+
+
+@app.get("/article_stream")
+async def article_stream():
+    """Eventi di nuovi articoli pubblicati e stato delle code dei consumatori"""
+    return {
+        **news_fetcher.stream.stats(),
+        'pending_broadcast': auto_send.db.get_pending_news_counts(),
+    }
+
+
+@app.get("/broadcasts")
+async def broadcasts():
+    """Invii automatici in corso (avanzamento, velocità, tempo stimato), ultimi completati
+    e consegne per stato delle ultime edizioni nella coda persistente"""
+    return {**auto_send.broadcaster.stats(), 'editions': auto_send.db.get_delivery_stats()}
+
+
+@app.get("/render_cache")
+async def render_cache_stats():
+    """Edizioni già formattate in cache e hit/miss"""
+    return render_cache.stats()
+
+
+@app.get("/websub/{sub_id}")
+async def websub_verify(sub_id: str, request: Request):
+    """Verifica dell'intento da parte dell'hub WebSub: risponde con la challenge"""
+    challenge = news_fetcher.verify_websub(sub_id, dict(request.query_params))
+    if challenge is None:
+        return Response(status_code=404)
+    return PlainTextResponse(challenge)
+
+
+@app.post("/websub/{sub_id}")
+async def websub_push(sub_id: str, request: Request):
+    """Contenuto inviato dall'hub WebSub (firmato con HMAC)"""
+    # Lettura a blocchi: un corpo oltre FEED_MAX_BYTES viene rifiutato senza caricarlo in memoria
+    body = await read_body_capped(request.stream(), Config.FEED_MAX_BYTES)
+    if body is None:
+        return Response(status_code=413)
+    status = await news_fetcher.receive_push(sub_id, body, request.headers.get('X-Hub-Signature'))
+    return Response(status_code=status)
+
+
+@app.get("/websub_status")
+async def websub_status():
+    """Sottoscrizioni WebSub per feed e contenuti ricevuti"""
+    return news_fetcher.websub.stats()
+
+
+@app.get("/story_clusters")
+async def story_clusters():
+    """Cluster di notizie quasi duplicate tra fonti diverse"""
+    return news_fetcher.clusters.stats()
+
 @app.get("/subscriber_counts")
 async def get_subscriber_counts(self):
     return db.Database.get_subscriber_counts(self)
@@ -0,0 +1,56 @@
+"""Feed HTTP locale e NewsFetcher isolato per i test del fetcher"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from database.db import Database
+from utils.news_fetcher import NewsFetcher
+
+
+class LocalFeed:
+    """Un feed RSS su 127.0.0.1 con ETag; annota gli header di ogni richiesta"""
+
+    def __init__(self, body: bytes, etag: Optional[str] = '"v1"', latency: float = 0.0):
+        self.body = body
+        self.etag = etag
+        self.latency = latency
+        self.requests: List[Dict[str, str]] = []
+        self.on_not_modified: Optional[Callable[[], None]] = None  # chiamata prima di rispondere 304
+        self._runner = None
+        self.url = ''
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.headers))
+        await asyncio.sleep(self.latency)
+        headers = {'ETag': self.etag} if self.etag else {}
+        if self.etag and request.headers.get('If-None-Match') == self.etag:
+            if self.on_not_modified:
+                self.on_not_modified()
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=self.body, content_type='application/rss+xml', headers=headers)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/feed', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/feed"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+@asynccontextmanager
+async def local_fetcher(db_path: str, *urls: str):
+    """NewsFetcher con i soli feed indicati e un database di test, senza snapshot"""
+    fetcher = NewsFetcher()
+    fetcher.RSS_FEEDS = {'generale_it': list(urls)}
+    await fetcher.initialize(Database(db_path), load_snapshot=False)
+    try:
+        yield fetcher
+    finally:
+        await fetcher.close()
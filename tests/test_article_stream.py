@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from database.db import Database
+from utils.article_stream import ArticleEvent, ArticleStream
+from utils.feed_cache import Article
+from utils.news_fetcher import NewsFetcher
+
+PS5 = 'https://it.ign.com/feed/ps5'
+GENERAL = 'https://it.ign.com/feed.xml'
+
+
+def articles(*numbers):
+    return [Article(f"Notizia {n}", f"https://it.ign.com/{n}", 'Ign', 'it', 1000.0 + n, '')
+            for n in numbers]
+
+
+def test_shared_article_is_new_for_every_feed(tmp_path):
+    fetcher = NewsFetcher()
+    fetcher.RSS_FEEDS = {'generale_it': [GENERAL], 'ps5': [PS5]}
+    fetcher.db = Database(str(tmp_path / 'test.db'))
+
+    async def scenario():
+        subscription = fetcher.stream.subscribe('test')
+        now = time.time()
+        # Primo caricamento di ogni feed: solo baseline
+        await fetcher._ingest(PS5, articles(1), now)
+        await fetcher._ingest(GENERAL, articles(1), now)
+        # Lo stesso articolo compare prima nel feed PS5, poi in quello generale
+        await fetcher._ingest(PS5, articles(2, 1), now)
+        await fetcher._ingest(GENERAL, articles(2, 1), now)
+        await fetcher._ingest(GENERAL, articles(2, 1), now)
+        fetcher.stream.close()
+        return [(event.categories, [a.link for a in event.articles]) async for event in subscription]
+
+    events = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert events == [(['ps5'], ['https://it.ign.com/2']),
+                      (['generale_it'], ['https://it.ign.com/2'])]
+
+
+def event(n):
+    return ArticleEvent(f'https://example.com/feed/{n}', ['generale_it'], articles(n))
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+def test_slow_subscriber_drops_oldest_events():
+    async def scenario():
+        stream = ArticleStream(maxsize=2, put_timeout=0.05)
+        slow = stream.subscribe('slow')
+        started = time.perf_counter()
+        for n in range(1, 5):
+            await stream.publish(event(n))
+        elapsed = time.perf_counter() - started
+        stream.close()
+        received = [e.url async for e in slow]
+        return slow, elapsed, received
+
+    slow, elapsed, received = run(scenario())
+    # Gli ultimi due publish hanno atteso il timeout (backpressure), poi scartato il più vecchio
+    assert elapsed >= 0.1
+    assert slow.dropped == 2
+    assert slow.stats()['dropped'] == 2
+    assert received == ['https://example.com/feed/4']  # close() sostituisce l'ultimo evento rimasto
+
+
+def test_backpressure_waits_for_a_consumer_without_dropping():
+    async def scenario():
+        stream = ArticleStream(maxsize=1, put_timeout=1.0)
+        subscription = stream.subscribe('consumer')
+        received = []
+
+        async def consume():
+            async for e in subscription:
+                received.append(e.url)
+                await asyncio.sleep(0.02)
+
+        consumer = asyncio.create_task(consume())
+        for n in range(1, 6):
+            await stream.publish(event(n))
+        while subscription.delivered < 5:
+            await asyncio.sleep(0.01)
+        stream.close()
+        await consumer
+        return subscription, received
+
+    subscription, received = run(scenario())
+    assert received == [f'https://example.com/feed/{n}' for n in range(1, 6)]
+    assert subscription.dropped == 0
+
+
+def test_slow_subscriber_does_not_starve_a_fast_one():
+    async def scenario():
+        stream = ArticleStream(maxsize=1, put_timeout=0.02)
+        slow = stream.subscribe('slow')
+        fast = stream.subscribe('fast')
+        received = []
+
+        async def consume():
+            async for e in fast:
+                received.append(e.url)
+
+        consumer = asyncio.create_task(consume())
+        for n in range(1, 4):
+            await stream.publish(event(n))
+        await asyncio.sleep(0.01)
+        stream.close()
+        await consumer
+        return slow, fast, received
+
+    slow, fast, received = run(scenario())
+    assert len(received) == 3 and fast.dropped == 0
+    assert slow.dropped == 2
+
+
+def test_close_ends_iteration():
+    async def scenario():
+        stream = ArticleStream()
+        first = stream.subscribe('first')
+        second = stream.subscribe('second')
+        await stream.publish(event(1))
+
+        async def drain(subscription):
+            return [e.url async for e in subscription]
+
+        tasks = [asyncio.create_task(drain(first)), asyncio.create_task(drain(second))]
+        await asyncio.sleep(0.01)
+        first.close()  # un solo consumatore
+        done = await tasks[0]
+        assert not tasks[1].done()
+        await stream.publish(event(2))
+        stream.close()
+        return done, await tasks[1], stream.stats()
+
+    first, second, stats = run(scenario())
+    assert first == ['https://example.com/feed/1']
+    assert second == ['https://example.com/feed/1', 'https://example.com/feed/2']
+    assert stats['subscribers'] == {} and stats['published'] == 2
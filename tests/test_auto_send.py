@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from database.db import Database
+from utils.article_stream import ArticleEvent, ArticleStream
+from utils.broadcaster import Broadcaster
+from utils.feed_cache import Article
+from utils.render_cache import render_cache
+
+
+@pytest.fixture
+def auto_send(tmp_path, monkeypatch):
+    # L'import crea database/bot.db nella directory corrente: mai quella del bot
+    monkeypatch.chdir(tmp_path)
+    from handlers import auto_send
+
+    monkeypatch.setattr(auto_send, 'db', Database(str(tmp_path / 'database' / 'test.db')))
+    monkeypatch.setattr(auto_send, 'broadcaster', Broadcaster(global_rate=1000, chat_interval=0.001,
+                                                              progress_interval=60))
+    render_cache.clear()
+    yield auto_send
+    render_cache.clear()
+
+
+def news(*numbers):
+    return [Article(f"Notizia {n}", f"https://example.com/{n}", 'Example', 'it', time.time() - n, '2026-10-16 10:00')
+            for n in numbers]
+
+
+def test_broadcast_fallback_formats_five_field_news(auto_send, monkeypatch):
+    def broken_format(*args, **kwargs):
+        raise ValueError('formattazione non riuscita')
+
+    monkeypatch.setattr(auto_send, 'format_news', broken_format)
+    message = auto_send._render_broadcast('tech', [article.as_tuple() for article in news(1, 2)])
+
+    assert message.startswith('📰 *Ultime notizie TECH*')
+    assert '1. Notizia 1 (Example)\nhttps://example.com/1' in message
+    assert '2. Notizia 2 (Example)\nhttps://example.com/2' in message
+
+
+class RecordingBot:
+    def __init__(self):
+        self.received = {}  # chat_id -> [insieme di link per messaggio]
+
+    async def get_me(self):
+        return type('Me', (), {'username': 'test_bot'})()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        links = {f"https://example.com/{n}" for n in range(1, 10) if f"https://example.com/{n})" in text}
+        self.received.setdefault(chat_id, []).append(links)
+
+
+def queue(auto_send, articles, category='tech'):
+    auto_send.db.queue_pending_news(category, [
+        (article.link, article.title, article.source, article.lang, article.published_ts, article.date_str)
+        for article in articles
+    ])
+
+
+def subscribe(auto_send, chat_ids, category='tech'):
+    for chat_id in chat_ids:
+        auto_send.db.add_user(chat_id)
+        auto_send.db.add_subscriber(chat_id, category)
+
+
+def links(*numbers):
+    return {f"https://example.com/{n}" for n in numbers}
+
+
+def test_subscribers_receive_only_unseen_articles(auto_send):
+    bot = RecordingBot()
+    subscribe(auto_send, [1, 2, 3])
+
+    queue(auto_send, news(1, 2))  # A, B
+    assert asyncio.run(auto_send.send_news_to_subscribers(bot, 'tech')) == 3
+    assert {chat_id: messages for chat_id, messages in bot.received.items()} == {
+        chat_id: [links(1, 2)] for chat_id in (1, 2, 3)}
+
+    # A ricompare insieme a C; la chat 4 si è appena iscritta
+    subscribe(auto_send, [4])
+    queue(auto_send, news(1, 3))
+    assert asyncio.run(auto_send.send_news_to_subscribers(bot, 'tech')) == 4
+    for chat_id in (1, 2, 3):
+        assert bot.received[chat_id] == [links(1, 2), links(3)]
+    assert bot.received[4] == [links(1, 3)]
+
+    # Tutti hanno già ricevuto tutto: nessun messaggio
+    queue(auto_send, news(1, 3))
+    assert asyncio.run(auto_send.send_news_to_subscribers(bot, 'tech')) == 0
+    assert sum(len(messages) for messages in bot.received.values()) == 7
+
+
+def test_forced_send_ignores_the_ledger(auto_send, monkeypatch):
+    bot = RecordingBot()
+    subscribe(auto_send, [1])
+    queue(auto_send, news(1))
+    asyncio.run(auto_send.send_news_to_subscribers(bot, 'tech'))
+
+    async def get_news(category, limit=5):
+        return [article.as_tuple() for article in news(1)]
+
+    monkeypatch.setattr(auto_send.news_fetcher, 'get_news', get_news)
+    assert asyncio.run(auto_send.send_news_to_subscribers(bot, 'tech', force_update=True)) == 1
+    assert bot.received[1] == [links(1), links(1)]
+
+
+def test_resume_delivers_pending_chats_and_records_them(auto_send):
+    bot = RecordingBot()
+    subscribe(auto_send, [1, 2, 3])
+    articles = news(1, 2)
+    ids = [auto_send.article_id(article.link) for article in articles]
+    message = auto_send._render_broadcast('tech', [article.as_tuple() for article in articles])
+
+    # Riavvio a metà invio: la chat 1 ha ricevuto l'edizione, 2 e 3 sono ancora in sospeso
+    auto_send.db.enqueue_edition('tech:test', 'tech', message, [1, 2, 3], ids)
+    auto_send.db.mark_deliveries('tech:test', [(1, 'sent', None)])
+    auto_send.db.record_sent_articles([(article, 1) for article in ids])
+
+    assert asyncio.run(auto_send.resume_deliveries(bot)) == 1
+    assert sorted(bot.received) == [2, 3]
+    assert auto_send.db.get_unfinished_editions() == []
+    assert asyncio.run(auto_send.resume_deliveries(bot)) == 0
+
+    # Le consegne riprese entrano nel registro: le stesse notizie non vengono più inviate
+    queue(auto_send, articles)
+    assert asyncio.run(auto_send.send_news_to_subscribers(bot, 'tech')) == 0
+    assert sum(len(messages) for messages in bot.received.values()) == 2
+
+
+def test_resume_abandons_expired_editions(auto_send, monkeypatch):
+    bot = RecordingBot()
+    subscribe(auto_send, [1, 2])
+    auto_send.db.enqueue_edition('tech:old', 'tech', 'vecchie notizie', [1, 2], [])
+    monkeypatch.setattr(auto_send.Config, 'DELIVERY_RESUME_MAX_AGE_HOURS', 0)
+
+    assert asyncio.run(auto_send.resume_deliveries(bot)) == 0
+    assert bot.received == {}
+    assert auto_send.db.get_unfinished_editions() == []
+
+
+def test_pending_news_survive_a_restart(auto_send, tmp_path, monkeypatch):
+    stream = ArticleStream()
+
+    async def collect():
+        subscription = stream.subscribe('auto_send')
+        listener = asyncio.create_task(auto_send.collect_new_articles(subscription))
+        await stream.publish(ArticleEvent('https://example.com/ps5', ['ps5'], news(1, 2)))
+        await stream.publish(ArticleEvent('https://example.com/feed.xml', ['generale_it', 'ps5'], news(2, 3)))
+        stream.close()
+        await listener
+
+    asyncio.run(asyncio.wait_for(collect(), 5))
+
+    # Riavvio: un nuovo processo apre lo stesso database
+    monkeypatch.setattr(auto_send, 'db', Database(str(tmp_path / 'database' / 'test.db')))
+    assert auto_send.db.get_pending_news_counts() == {'ps5': 3, 'generale': 2}
+    assert [item[1] for item in auto_send.take_pending_news('ps5', 5)] == [
+        'https://example.com/1', 'https://example.com/2', 'https://example.com/3']
+    assert auto_send.take_pending_news('ps5', 5) == []
+    assert len(auto_send.take_pending_news('generale', 5)) == 2
+
+
+def test_pending_queue_keeps_the_newest(auto_send):
+    queue(auto_send, news(*range(1, 10)))
+    queue(auto_send, news(1))
+    auto_send.db.queue_pending_news('tech', [('https://example.com/0', 'Notizia 0', 'Example', 'it',
+                                              time.time(), '')], 3)
+
+    assert [item[1] for item in auto_send.take_pending_news('tech', 5)] == [
+        'https://example.com/0', 'https://example.com/1', 'https://example.com/2']
@@ -0,0 +1,262 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from utils.broadcaster import (DELIVERED, DROPPED, INVALID, TELEGRAM_GLOBAL_LIMIT, Broadcaster, TokenBucket,
+                               is_chat_error)
+
+
+def fast_broadcaster(**kwargs):
+    options = dict(global_rate=1000, chat_interval=0.001, group_per_minute=60000, workers=4,
+                   progress_interval=60, base_backoff=0.01, max_backoff=0.05)
+    options.update(kwargs)
+    return Broadcaster(**options)
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+class Recipient:
+    """send(chat_id) finto: solleva gli errori previsti per chat, nell'ordine, poi consegna"""
+
+    def __init__(self, errors=None, latency=0.0):
+        self.latency = latency
+        self.errors = {chat_id: list(chat_errors) for chat_id, chat_errors in (errors or {}).items()}
+        self.attempts = {}
+        self.sent = {}
+
+    async def __call__(self, chat_id):
+        now = time.monotonic()
+        self.attempts[chat_id] = self.attempts.get(chat_id, 0) + 1
+        await asyncio.sleep(self.latency)
+        pending = self.errors.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+        self.sent.setdefault(chat_id, []).append(now)
+
+
+def test_token_bucket_paces_reservations():
+    bucket = TokenBucket(rate=10)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    assert not bucket.is_idle()
+
+
+def test_token_bucket_capacity_allows_burst():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() > 0.9
+
+
+def test_token_bucket_idle_after_refill():
+    bucket = TokenBucket(rate=100)
+    bucket.reserve()
+    time.sleep(0.02)
+    assert bucket.is_idle()
+
+
+def test_every_chat_delivered_once():
+    broadcaster = fast_broadcaster()
+    send = Recipient()
+    results = []
+
+    progress = run(broadcaster.broadcast('news_tech', range(20), send,
+                                         lambda chat_id, outcome, error: results.append((chat_id, outcome))))
+
+    assert progress.delivered == progress.total == 20
+    assert sorted(results) == [(chat_id, DELIVERED) for chat_id in range(20)]
+    assert all(len(times) == 1 for times in send.sent.values())
+    assert progress.finished_at is not None
+    assert broadcaster.active == {}
+
+
+def test_empty_broadcast_returns_immediately():
+    progress = run(fast_broadcaster().broadcast('news_tech', [], Recipient()))
+    assert progress.total == progress.done == 0
+
+
+def test_retry_after_pauses_and_requeues_chat():
+    broadcaster = fast_broadcaster()
+    send = Recipient({3: [RetryAfter(0.2)]})
+
+    started = time.monotonic()
+    progress = run(broadcaster.broadcast('news_tech', range(5), send))
+
+    assert progress.delivered == 5
+    assert progress.retried == 1
+    assert send.attempts[3] == 2
+    assert broadcaster.pauses == 1
+    assert send.sent[3][0] - started >= 0.2
+
+
+def test_overlapping_retry_after_counts_as_one_pause():
+    # Invii già partiti quando arriva il primo RetryAfter: ricevono lo stesso flood control
+    broadcaster = fast_broadcaster(workers=8)
+    send = Recipient({chat_id: [RetryAfter(0.1)] for chat_id in range(8)}, latency=0.05)
+
+    progress = run(broadcaster.broadcast('news_tech', range(8), send))
+
+    assert progress.delivered == 8
+    assert broadcaster.pauses == 1
+
+
+def test_network_errors_dropped_after_max_attempts():
+    broadcaster = fast_broadcaster(max_attempts=3)
+    send = Recipient({1: [TimedOut()] * 10, 2: [TimedOut()]})
+    results = {}
+
+    progress = run(broadcaster.broadcast('news_tech', range(4), send,
+                                         lambda chat_id, outcome, error: results.__setitem__(chat_id, outcome)))
+
+    assert send.attempts[1] == 3
+    assert results[1] == DROPPED
+    assert results[2] == DELIVERED  # riuscito al secondo tentativo
+    assert progress.delivered == 3 and progress.dropped == 1
+    assert progress.retried == 3
+
+
+def test_forbidden_chat_is_invalid_without_retry():
+    send = Recipient({2: [Forbidden('bot was blocked by the user')]})
+    results = {}
+
+    progress = run(fast_broadcaster().broadcast('news_tech', range(3), send,
+                                                lambda chat_id, outcome, error: results.__setitem__(chat_id, outcome)))
+
+    assert results[2] == INVALID
+    assert send.attempts[2] == 1
+    assert progress.invalid == 1 and progress.delivered == 2
+
+
+def test_chat_errors_classified():
+    assert is_chat_error(Forbidden('Forbidden: bot was blocked by the user'))
+    assert is_chat_error(BadRequest('Chat not found'))
+    assert is_chat_error(BadRequest("Forbidden: bot can't initiate conversation with a user"))
+    assert not is_chat_error(BadRequest("Can't parse entities: can't find end of the entity starting at byte offset 120"))
+    assert not is_chat_error(BadRequest('Message is too long'))
+    assert not is_chat_error(TimedOut())
+
+
+def test_chat_not_found_is_invalid():
+    send = Recipient({1: [BadRequest('Chat not found')]})
+    results = {}
+
+    progress = run(fast_broadcaster().broadcast('news_tech', range(3), send,
+                                                lambda chat_id, outcome, error: results.__setitem__(chat_id, outcome)))
+
+    assert results[1] == INVALID
+    assert progress.delivered == 2 and progress.aborted is None
+
+
+def test_message_error_aborts_broadcast_without_invalidating_chats():
+    # Il messaggio non è valido per nessuno: l'invio si ferma invece di disiscrivere tutte le chat
+    broadcaster = fast_broadcaster(global_rate=100, workers=2)
+    error = BadRequest("Can't parse entities: can't find end of the entity starting at byte offset 120")
+    send = Recipient({chat_id: [error] for chat_id in range(50)})
+    results = {}
+
+    progress = run(broadcaster.broadcast('news_tech', range(50), send,
+                                         lambda chat_id, outcome, error: results.__setitem__(chat_id, outcome)))
+
+    assert progress.aborted == str(error)
+    assert INVALID not in results.values()
+    assert set(results.values()) == {DROPPED}
+    assert len(send.attempts) <= 3  # solo gli invii già partiti
+    assert progress.done < progress.total
+    assert broadcaster.active == {}
+
+
+def test_unexpected_error_dropped():
+    send = Recipient({0: [ValueError('boom')]})
+    progress = run(fast_broadcaster().broadcast('news_tech', [0, 1], send))
+    assert progress.dropped == 1 and progress.delivered == 1
+
+
+def test_workers_stop_when_last_chat_resolved_by_delayed_retry():
+    # Più mittenti che chat e l'ultima risolta da un ritentativo ritardato: i mittenti
+    # fermi sulla coda vengono svegliati dalle sentinelle e broadcast termina
+    broadcaster = fast_broadcaster(workers=16, base_backoff=0.05)
+    send = Recipient({0: [TimedOut(), TimedOut()]})
+
+    progress = run(broadcaster.broadcast('news_tech', [0, 1], send))
+
+    assert progress.delivered == 2
+    assert send.attempts[0] == 3
+
+
+def test_global_rate_limits_throughput():
+    broadcaster = fast_broadcaster(global_rate=50, workers=8)
+    send = Recipient()
+
+    started = time.monotonic()
+    run(broadcaster.broadcast('news_tech', range(20), send))
+    elapsed = time.monotonic() - started
+
+    # Capacità 1: 20 invii a 50/s richiedono almeno 19 intervalli da 20 ms
+    assert elapsed >= 19 / 50 * 0.95
+    # Un mittente svegliato in ritardo dall'event loop può avvicinarsi al successivo: ±1 invio per finestra
+    times = sorted(t for chat_times in send.sent.values() for t in chat_times)
+    assert max(sum(1 for t in times if start <= t < start + 0.2) for start in times) <= 0.2 * 50 + 1
+
+
+def test_default_rate_stays_under_telegram_limit():
+    broadcaster = Broadcaster(progress_interval=60)
+    send = Recipient(latency=0.01)
+
+    run(broadcaster.broadcast('news_tech', range(45), send))
+
+    # Capacità 1 e bucket pieno all'avvio: in un secondo passano fino a rate + 1 messaggi
+    times = sorted(t for chat_times in send.sent.values() for t in chat_times)
+    assert max(sum(1 for t in times if start <= t < start + 1.0) for start in times) <= TELEGRAM_GLOBAL_LIMIT
+    assert broadcaster.global_rate < TELEGRAM_GLOBAL_LIMIT
+
+
+def test_chat_interval_spaces_messages_to_the_same_chat():
+    broadcaster = fast_broadcaster(chat_interval=0.2)
+    send = Recipient()
+
+    async def two_editions():
+        await asyncio.gather(broadcaster.broadcast('news_tech', [7], send),
+                             broadcaster.broadcast('news_tech', [7], send))
+
+    run(two_editions())
+
+    first, second = sorted(send.sent[7])
+    assert second - first >= 0.2 * 0.95
+
+
+def test_group_chats_use_per_minute_limit():
+    broadcaster = fast_broadcaster(group_per_minute=600)  # un messaggio ogni 0.1 s per gruppo
+    send = Recipient()
+
+    async def three_editions():
+        await asyncio.gather(*(broadcaster.broadcast('news_tech', [-100], send) for _ in range(3)))
+
+    run(three_editions())
+
+    times = sorted(send.sent[-100])
+    assert times[-1] - times[0] >= 0.2 * 0.95
+
+
+def test_concurrent_broadcasts_with_same_name_all_tracked():
+    broadcaster = fast_broadcaster()
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def send(chat_id):
+            await gate.wait()
+
+        tasks = [asyncio.create_task(broadcaster.broadcast('news_tech', [chat_id], send)) for chat_id in range(3)]
+        await asyncio.sleep(0.05)
+        running = len(broadcaster.stats()['active'])
+        gate.set()
+        await asyncio.gather(*tasks)
+        return running
+
+    assert run(scenario()) == 3
+    assert broadcaster.active == {}
+    assert len(broadcaster.stats()['recent']) == 3
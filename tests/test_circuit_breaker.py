@@ -0,0 +1,81 @@
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+URL = 'https://example.com/feed'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, base_backoff=60)
+    for _ in range(2):
+        breaker.record_failure(URL, 'timeout')
+    assert breaker.state(URL) == CLOSED and breaker.allow(URL)
+
+    breaker.record_failure(URL, 'timeout')
+    assert breaker.state(URL) == OPEN
+    assert not breaker.allow(URL)
+    assert breaker.snapshot()[URL]['last_error'] == 'timeout'
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure(URL, 'timeout')
+    breaker.record_success(URL)
+    breaker.record_failure(URL, 'timeout')
+    assert breaker.state(URL) == CLOSED
+    assert URL in breaker.snapshot()
+
+
+def test_half_open_after_backoff_then_closes_on_success(clock):
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=60)
+    breaker.record_failure(URL, 'HTTP 500')
+
+    clock.now += 59
+    assert not breaker.allow(URL)
+    clock.now += 1
+    assert breaker.allow(URL)
+    assert breaker.state(URL) == HALF_OPEN
+
+    breaker.record_success(URL)
+    assert breaker.state(URL) == CLOSED
+    assert breaker.snapshot() == {}
+
+
+def test_failed_probe_reopens_with_doubled_backoff_up_to_max(clock):
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=60, max_backoff=200)
+    breaker.record_failure(URL, 'HTTP 500')
+
+    backoffs = []
+    for _ in range(3):
+        opened_at = clock.now
+        while not breaker.allow(URL):
+            clock.now += 1
+        backoffs.append(clock.now - opened_at)
+        breaker.record_failure(URL, 'HTTP 500')  # prova fallita in half_open
+
+    assert backoffs == [60, 120, 200]
+    assert breaker.state(URL) == OPEN
+
+
+def test_feeds_are_independent(clock):
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure(URL, 'timeout')
+    assert not breaker.allow(URL)
+    assert breaker.allow('https://other.example.com/feed')
+    assert breaker.state('https://other.example.com/feed') == CLOSED
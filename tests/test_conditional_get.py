@@ -0,0 +1,77 @@
+import asyncio
+
+from benchmarks.feed_server import synthetic_rss
+from database.db import Database
+from tests.feed_helpers import LocalFeed, local_fetcher
+from utils.circuit_breaker import CLOSED
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def test_validators_sent_back_and_304_refreshes_cache(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+
+    async def scenario():
+        feed = LocalFeed(synthetic_rss('feed', 5))
+        await feed.start()
+        try:
+            async with local_fetcher(db_path, feed.url) as fetcher:
+                first = await fetcher.fetch_feed(feed.url, force=True)
+                second = await fetcher.fetch_feed(feed.url, force=True)
+                metrics = fetcher.metrics.snapshot()[feed.url]
+            # Riavvio: i validatori arrivano dal database
+            async with local_fetcher(db_path, feed.url) as fetcher:
+                restored = fetcher.validators.get(feed.url)
+            return feed, first, second, metrics, restored
+        finally:
+            await feed.stop()
+
+    feed, first, second, metrics, restored = run(scenario())
+    assert len(first) == 5
+    assert 'If-None-Match' not in feed.requests[0]
+    assert feed.requests[1]['If-None-Match'] == '"v1"'
+    assert second is first  # 304: stessa copia in cache, nessun parsing
+    assert metrics['not_modified_ratio'] == 0.5
+    assert restored == {'etag': '"v1"', 'last_modified': None}
+    assert Database(db_path).get_feed_validators()[feed.url]['etag'] == '"v1"'
+
+
+def test_304_without_cached_copy_downloads_the_feed_again(tmp_path):
+    async def scenario():
+        feed = LocalFeed(synthetic_rss('feed', 5))
+        await feed.start()
+        try:
+            async with local_fetcher(str(tmp_path / 'test.db'), feed.url) as fetcher:
+                await fetcher.fetch_feed(feed.url, force=True)
+                # La copia esce dalla cache mentre la richiesta condizionale è in corso
+                feed.on_not_modified = lambda: fetcher.cache.pop(feed.url)
+                articles = await fetcher.fetch_feed(feed.url, force=True)
+                return feed, articles, fetcher.breaker.state(feed.url), fetcher.validators.get(feed.url)
+        finally:
+            await feed.stop()
+
+    feed, articles, state, validators = run(scenario())
+    assert len(articles) == 5
+    assert state == CLOSED
+    assert [request.get('If-None-Match') for request in feed.requests] == [None, '"v1"', None]
+    assert validators == {'etag': '"v1"', 'last_modified': None}  # riletti dalla risposta completa
+
+
+def test_no_conditional_headers_without_cached_copy(tmp_path):
+    async def scenario():
+        feed = LocalFeed(synthetic_rss('feed', 3))
+        await feed.start()
+        try:
+            async with local_fetcher(str(tmp_path / 'test.db'), feed.url) as fetcher:
+                await fetcher.fetch_feed(feed.url, force=True)
+                fetcher.cache.clear()
+                articles = await fetcher.fetch_feed(feed.url, force=True)
+                return feed, articles
+        finally:
+            await feed.stop()
+
+    feed, articles = run(scenario())
+    assert len(articles) == 3
+    assert 'If-None-Match' not in feed.requests[1]
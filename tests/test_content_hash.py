@@ -0,0 +1,35 @@
+import asyncio
+
+from benchmarks.feed_server import synthetic_rss
+from tests.feed_helpers import LocalFeed, local_fetcher
+
+
+def test_same_body_skips_parse_and_changed_body_parses(tmp_path):
+    async def scenario():
+        feed = LocalFeed(synthetic_rss('feed', 3), etag=None)  # nessun ETag: ogni richiesta è completa
+        await feed.start()
+        try:
+            async with local_fetcher(str(tmp_path / 'test.db'), feed.url) as fetcher:
+                parsed = []
+                parse = fetcher.parser.parse
+
+                async def counting_parse(content):
+                    parsed.append(content)
+                    return await parse(content)
+
+                fetcher.parser.parse = counting_parse
+                first = await fetcher.fetch_feed(feed.url, force=True)
+                unchanged = await fetcher.fetch_feed(feed.url, force=True)
+                feed.body = synthetic_rss('feed', 4)
+                changed = await fetcher.fetch_feed(feed.url, force=True)
+                summary = fetcher.metrics.summary(feed.url)
+                return feed, parsed, first, unchanged, changed, summary
+        finally:
+            await feed.stop()
+
+    feed, parsed, first, unchanged, changed, summary = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert len(feed.requests) == 3
+    assert len(parsed) == 2  # il secondo corpo, identico, non è stato analizzato
+    assert unchanged is first
+    assert len(changed) == 4
+    assert summary['unchanged_bodies'] == 1
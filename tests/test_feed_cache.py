@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import time
+
+from config import Config
+from utils.feed_cache import Article, FeedCache
+from utils.news_fetcher import NewsFetcher
+
+
+def feed(name, count=2, summary=''):
+    return [
+        Article(f'{name} {n}', f'https://{name}.example.com/{n}', name, 'it', 1000.0 + n, '01/01/2026', summary)
+        for n in range(count)
+    ]
+
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    cache = FeedCache(max_entries=2)
+    cache.put('a', feed('a'))
+    cache.put('b', feed('b'))
+    cache.put('c', feed('c'))
+
+    assert [url for url, _ in cache.items()] == ['b', 'c']
+    assert 'a' not in cache
+    assert cache.evictions == 1
+
+
+def test_get_refreshes_recency_but_peek_does_not():
+    cache = FeedCache(max_entries=2)
+    cache.put('a', feed('a'))
+    cache.put('b', feed('b'))
+
+    cache.get('a')
+    cache.put('c', feed('c'))
+    assert [url for url, _ in cache.items()] == ['a', 'c']  # 'b' era la meno recente
+
+    cache.peek('a')
+    cache.put('d', feed('d'))
+    assert [url for url, _ in cache.items()] == ['c', 'd']
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_byte_accounting_on_replace_and_pop():
+    cache = FeedCache()
+    cache.put('a', feed('a', 2))
+    small = cache.total_bytes
+    cache.put('a', feed('a', 10, summary='x' * 500))
+    large = cache.total_bytes
+
+    assert large > small
+    cache.put('a', feed('a', 2))
+    assert cache.total_bytes == small  # la voce sostituita non resta conteggiata
+
+    cache.pop('a')
+    assert cache.total_bytes == 0 and len(cache) == 0
+
+
+def test_evicts_oldest_beyond_byte_budget_keeping_newest():
+    probe = FeedCache()
+    probe.put('a', feed('a', 5))
+    size = probe.total_bytes
+
+    cache = FeedCache(max_entries=100, max_bytes=int(size * 2.5))
+    for url in ('a', 'b', 'c', 'd'):
+        cache.put(url, feed(url, 5))
+
+    assert [url for url, _ in cache.items()] == ['c', 'd']
+    assert cache.total_bytes <= cache.max_bytes
+    assert cache.evictions == 2
+
+    # Una voce da sola oltre il budget resta comunque in cache
+    cache.put('huge', feed('huge', 50, summary='x' * 1000))
+    assert [url for url, _ in cache.items()] == ['huge']
+
+
+def snapshot_fetcher(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, 'FEED_SNAPSHOT_PATH', str(tmp_path / 'cache' / 'feed_cache.json'))
+    fetcher = NewsFetcher()
+    fetcher.RSS_FEEDS = {'generale_it': ['a', 'b']}
+    return fetcher
+
+
+def test_snapshot_round_trip(monkeypatch, tmp_path):
+    fetcher = snapshot_fetcher(monkeypatch, tmp_path)
+    fetcher.cache.put('a', feed('zelda', 3, summary='testo'), 1500.0, 'hash-a')
+    fetcher.cache.put('b', feed('b', 1), 1600.0)
+    assert asyncio.run(fetcher.save_snapshot())
+
+    restored = snapshot_fetcher(monkeypatch, tmp_path)
+    assert restored.load_snapshot() == 2
+
+    assert restored.cache.to_snapshot() == fetcher.cache.to_snapshot()
+    assert restored.cache.content_hash('a') == 'hash-a'
+    assert [article.summary for article in restored.cache.peek('a')] == ['testo'] * 3
+    assert len(restored.index.search('zelda', 5)) == 3  # indice e cluster ricostruiti dagli articoli caricati
+
+
+def test_corrupt_snapshot_is_ignored(monkeypatch, tmp_path):
+    fetcher = snapshot_fetcher(monkeypatch, tmp_path)
+    os.makedirs(tmp_path / 'cache')
+    (tmp_path / 'cache' / 'feed_cache.json').write_text('{"feeds": {"a": ', encoding='utf-8')
+
+    assert fetcher.load_snapshot() == 0
+    assert len(fetcher.cache) == 0
+
+
+def test_malformed_feed_entries_are_skipped(monkeypatch, tmp_path):
+    fetcher = snapshot_fetcher(monkeypatch, tmp_path)
+    fetcher.cache.put('a', feed('a', 2), 1500.0)
+    snapshot = {'feeds': fetcher.cache.to_snapshot()}
+    snapshot['feeds']['b'] = {'fetched_at': 'ieri', 'articles': []}
+    snapshot['feeds']['c'] = {'articles': [['solo titolo']]}
+    os.makedirs(tmp_path / 'cache')
+    (tmp_path / 'cache' / 'feed_cache.json').write_text(json.dumps(snapshot), encoding='utf-8')
+
+    restored = snapshot_fetcher(monkeypatch, tmp_path)
+    assert restored.load_snapshot() == 1
+    assert [url for url, _ in restored.cache.items()] == ['a']
+
+
+def test_stale_snapshot_keeps_age_and_is_refreshed_before_use(monkeypatch, tmp_path):
+    fetcher = snapshot_fetcher(monkeypatch, tmp_path)
+    saved_at = time.time() - fetcher.max_staleness - 60
+    fetcher.cache.put('a', feed('a', 2), saved_at)
+    asyncio.run(fetcher.save_snapshot())
+
+    restored = snapshot_fetcher(monkeypatch, tmp_path)
+    assert restored.load_snapshot() == 1
+    # L'età originale è conservata: oltre la staleness massima fetch_feed riscarica prima di rispondere
+    assert restored.cache.age('a') > restored.max_staleness
@@ -0,0 +1,96 @@
+import pytest
+
+from utils import feed_scheduler
+from utils.feed_scheduler import FeedPoller
+
+URL = 'https://example.com/feed'
+OTHER = 'https://example.org/feed'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(feed_scheduler, 'time', clock)
+    return clock
+
+
+def test_new_feeds_are_due_immediately(clock):
+    poller = FeedPoller()
+    poller.sync([URL, OTHER])
+
+    assert sorted(poller.due()) == sorted([URL, OTHER])
+    assert poller.interval(URL) == poller.default_interval
+
+
+def test_cadence_is_median_gap_of_recent_articles(clock):
+    poller = FeedPoller(min_interval=60, max_interval=7200)
+    # Intervalli 600, 600, 3000: la mediana ignora il buco isolato
+    poller.observe(URL, [10000, 9400, 8800, 5800, None])
+
+    assert poller.cadence[URL] == 600
+    assert poller.interval(URL) == 300  # due polling per cadenza
+
+
+def test_interval_clamped_to_bounds(clock):
+    poller = FeedPoller(min_interval=120, max_interval=3600)
+    poller.observe(URL, [1000, 990, 980])
+    poller.observe(OTHER, [100000, 50000, 0])
+
+    assert poller.interval(URL) == 120
+    assert poller.interval(OTHER) == 3600
+
+
+def test_observe_without_gaps_keeps_previous_cadence(clock):
+    poller = FeedPoller()
+    poller.observe(URL, [2000, 1000])
+    poller.observe(URL, [5000, 5000, None])
+
+    assert poller.cadence[URL] == 1000
+    poller.observe(OTHER, [])
+    assert OTHER not in poller.cadence
+
+
+def test_reschedule_applies_jitter_and_becomes_due(clock):
+    poller = FeedPoller(default_interval=600, jitter=0.1)
+    poller.sync([URL])
+    poller.reschedule(URL)
+
+    assert 540 <= poller.next_poll[URL] - clock.now <= 660
+    assert poller.due() == []
+    assert 540 <= poller.seconds_until_next() <= 660
+
+    clock.now += 660
+    assert poller.due() == [URL]
+
+
+def test_push_subscription_relaxes_polling_until_expiry(clock):
+    poller = FeedPoller(max_interval=7200)
+    poller.observe(URL, [2000, 1000])
+    poller.set_push(URL, clock.now + 3600)
+
+    assert poller.interval(URL) == 7200
+    clock.now += 3601
+    assert poller.interval(URL) == 500
+
+    poller.set_push(URL, clock.now + 3600)
+    poller.set_push(URL, None)
+    assert poller.interval(URL) == 500
+
+
+def test_sync_forgets_removed_feeds(clock):
+    poller = FeedPoller()
+    poller.sync([URL, OTHER])
+    poller.observe(OTHER, [2000, 1000])
+    poller.set_push(OTHER, clock.now + 60)
+    poller.sync([URL])
+
+    assert list(poller.next_poll) == [URL]
+    assert OTHER not in poller.cadence and OTHER not in poller.push_until
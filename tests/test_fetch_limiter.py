@@ -0,0 +1,138 @@
+import asyncio
+
+from utils.fetch_limiter import PRIORITY_BACKGROUND, PRIORITY_USER, FetchLimiter, FetchTicket, PrioritySemaphore
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+async def queue_waiters(semaphore, tickets, order):
+    """Accoda un waiter per ticket (semaforo già pieno); ognuno annota il proprio nome quando entra"""
+    async def waiter(name, ticket):
+        await semaphore.acquire(ticket)
+        order.append(name)
+
+    tasks = []
+    for name, ticket in tickets:
+        tasks.append(asyncio.create_task(waiter(name, ticket)))
+        await asyncio.sleep(0)
+    return tasks
+
+
+async def drain(semaphore, tasks):
+    for _ in tasks:
+        semaphore.release()
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+
+def test_acquire_is_immediate_below_limit():
+    async def scenario():
+        semaphore = PrioritySemaphore(2)
+        await semaphore.acquire(FetchTicket())
+        await semaphore.acquire(FetchTicket())
+        return semaphore.active, semaphore.waiting
+
+    assert run(scenario()) == (2, 0)
+
+
+def test_waiters_woken_by_priority_then_arrival():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(FetchTicket())
+        order = []
+        tasks = await queue_waiters(semaphore, [('bg1', FetchTicket(PRIORITY_BACKGROUND)),
+                                                ('user1', FetchTicket(PRIORITY_USER)),
+                                                ('bg2', FetchTicket(PRIORITY_BACKGROUND)),
+                                                ('user2', FetchTicket(PRIORITY_USER))], order)
+        assert semaphore.waiting == 4
+        await drain(semaphore, tasks)
+        return order
+
+    assert run(scenario()) == ['user1', 'user2', 'bg1', 'bg2']
+
+
+def test_promote_moves_queued_ticket_ahead():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(FetchTicket())
+        order = []
+        late = FetchTicket(PRIORITY_BACKGROUND)
+        tasks = await queue_waiters(semaphore, [('bg1', FetchTicket(PRIORITY_BACKGROUND)),
+                                                ('bg2', FetchTicket(PRIORITY_BACKGROUND)),
+                                                ('late', late)], order)
+        late.promote(PRIORITY_USER)  # un utente si unisce al download in background
+        late.promote(PRIORITY_BACKGROUND)  # abbassare la priorità non ha effetto
+        await drain(semaphore, tasks)
+        return order, late.priority
+
+    assert run(scenario()) == (['late', 'bg1', 'bg2'], PRIORITY_USER)
+
+
+def test_promote_outside_queue_only_updates_priority():
+    ticket = FetchTicket(PRIORITY_BACKGROUND)
+    ticket.promote(PRIORITY_USER)
+    assert ticket.priority == PRIORITY_USER and ticket.queue is None
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(FetchTicket())
+        order = []
+        tasks = await queue_waiters(semaphore, [('cancelled', FetchTicket(PRIORITY_USER)),
+                                                ('next', FetchTicket(PRIORITY_BACKGROUND))], order)
+        tasks[0].cancel()
+        await asyncio.sleep(0)
+        assert semaphore.waiting == 1
+        semaphore.release()
+        await tasks[1]
+        return order, semaphore.active, semaphore.waiting
+
+    assert run(scenario()) == (['next'], 1, 0)
+
+
+def test_slot_granted_to_cancelled_waiter_passes_to_next():
+    async def scenario():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire(FetchTicket())
+        order = []
+        tasks = await queue_waiters(semaphore, [('cancelled', FetchTicket(PRIORITY_USER)),
+                                                ('next', FetchTicket(PRIORITY_BACKGROUND))], order)
+        # Slot assegnato e cancellazione prima che il waiter riprenda
+        semaphore.release()
+        tasks[0].cancel()
+        await asyncio.gather(tasks[0], return_exceptions=True)
+        await tasks[1]
+        return order, semaphore.active, semaphore.waiting
+
+    assert run(scenario()) == (['next'], 1, 0)
+
+
+def test_limiter_caps_per_host_without_blocking_other_hosts():
+    async def scenario():
+        limiter = FetchLimiter(global_limit=4, per_host_limit=2)
+        gate = asyncio.Event()
+        peak = {'a.example.com': 0, 'b.example.com': 0}
+        running = {'a.example.com': 0, 'b.example.com': 0}
+
+        async def fetch(host):
+            async with limiter.slot(f"https://{host}/feed", FetchTicket()):
+                running[host] += 1
+                peak[host] = max(peak[host], running[host])
+                await gate.wait()
+                running[host] -= 1
+
+        tasks = [asyncio.create_task(fetch('a.example.com')) for _ in range(5)]
+        tasks.append(asyncio.create_task(fetch('b.example.com')))
+        await asyncio.sleep(0.01)
+        stats = limiter.stats()
+        gate.set()
+        await asyncio.gather(*tasks)
+        return peak, stats, limiter.stats()
+
+    peak, during, after = run(scenario())
+    assert peak == {'a.example.com': 2, 'b.example.com': 1}
+    assert during['active'] == 3 and during['waiting'] == 3
+    assert after['active'] == 0 and after['hosts'] == {}
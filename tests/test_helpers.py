@@ -0,0 +1,50 @@
+from config import Config
+from utils.helpers import MAX_MESSAGE_LENGTH, format_news, message_length
+
+
+def sample_news(count=5):
+    return [(f"Notizia {i}: nuovo gioco annunciato", f"https://example.com/{i}", 'IGN Italia') for i in range(count)]
+
+
+def many_alternates(news, count=10):
+    return {item[1]: [(f"Fonte{j}", f"https://fonte{j}.example.com/" + 'x' * 200) for j in range(count)]
+            for item in news}
+
+
+def test_alternates_capped_per_item():
+    news = sample_news(1)
+    text = format_news(news, alternates=many_alternates(news))
+
+    assert text.count('https://fonte') == Config.NEAR_DUP_MAX_ALTERNATES
+    assert f"(+{10 - Config.NEAR_DUP_MAX_ALTERNATES})" in text
+
+
+def test_message_fits_telegram_limit():
+    news = sample_news()
+    text = format_news(news, alternates=many_alternates(news))
+
+    assert message_length(text) <= MAX_MESSAGE_LENGTH
+    assert text.count('Notizia') == 5
+
+
+def test_alternates_dropped_before_news():
+    news = sample_news()
+    alternates = many_alternates(news)
+    # Spazio per i link alternativi della sola prima notizia
+    first_only = format_news(news, alternates={news[0][1]: alternates[news[0][1]]})
+    text = format_news(news, alternates=alternates, max_length=message_length(first_only))
+
+    assert text == first_only
+    assert text.count('Anche su') == 1
+
+
+def test_news_dropped_from_the_end_when_needed():
+    text = format_news(sample_news(), max_length=400)
+
+    assert message_length(text) <= 400
+    assert 'Notizia 0' in text and 'Notizia 4' not in text
+
+
+def test_message_length_counts_utf16_units():
+    assert message_length('abc') == 3
+    assert message_length('📰') == 2
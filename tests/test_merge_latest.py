@@ -0,0 +1,54 @@
+from utils.feed_cache import Article
+from utils.news_fetcher import merge_latest
+
+
+def article(link, published_ts, source='A'):
+    return Article(f'Titolo {link}', f'https://example.com/{link}', source, 'it', published_ts, '')
+
+
+def links(articles):
+    return [a.link.rsplit('/', 1)[1] for a in articles]
+
+
+def test_top_k_across_feeds():
+    feeds = [
+        [article('a1', 900), article('a2', 500), article('a3', 100)],
+        [article('b1', 800), article('b2', 700)],
+        [],
+        [article('c1', 600)],
+    ]
+
+    assert links(merge_latest(feeds, 4)) == ['a1', 'b1', 'b2', 'c1']
+    assert links(merge_latest(feeds, 10)) == ['a1', 'b1', 'b2', 'c1', 'a2', 'a3']
+    assert merge_latest([], 5) == []
+
+
+def test_same_link_in_several_feeds_appears_once():
+    feeds = [
+        [article('x', 900, 'A'), article('a', 500)],
+        [article('x', 900, 'B'), article('b', 400)],
+    ]
+
+    assert links(merge_latest(feeds, 5)) == ['x', 'a', 'b']
+
+
+def test_key_keeps_newest_article_per_group():
+    feeds = [
+        [article('a1', 900), article('a2', 300)],
+        [article('b1', 800), article('b2', 200)],
+    ]
+    story = {'a1': 'zelda', 'b1': 'zelda', 'a2': 'mario', 'b2': 'halo'}
+
+    latest = merge_latest(feeds, 5, key=lambda a: story[a.link.rsplit('/', 1)[1]])
+
+    assert links(latest) == ['a1', 'a2', 'b2']
+
+
+def test_missing_published_ts_sorts_last():
+    feeds = [
+        [article('a1', 900), article('a2', None)],
+        [article('b1', 100)],
+    ]
+
+    assert links(merge_latest(feeds, 5)) == ['a1', 'b1', 'a2']
+    assert links(merge_latest(feeds, 2)) == ['a1', 'b1']
@@ -0,0 +1,69 @@
+import asyncio
+
+from utils.news_fetcher import read_capped
+
+
+class FakeContent:
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def iter_chunked(self, _size):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.content = FakeContent(body, chunk_size)
+
+
+def rss(entries: int) -> bytes:
+    items = ''.join(f"<item><title>{i}</title></item>" for i in range(entries))
+    return f"<rss><channel>{items}</channel></rss>".encode()
+
+
+def read(body: bytes, max_bytes: int = 1 << 20, max_entries: int = 0, chunk_size: int = 7):
+    return asyncio.run(read_capped(FakeResponse(body, chunk_size), max_bytes, max_entries))
+
+
+def test_whole_body_without_caps():
+    body = rss(50)
+    assert read(body) == (body, None)
+
+
+def test_entry_cap_cuts_after_last_complete_entry():
+    content, truncated = read(rss(50), max_entries=3)
+
+    assert truncated == 'entries'
+    assert content.endswith(b'<item><title>2</title></item>')
+    assert content.count(b'</item>') == 3
+
+
+def test_entry_end_split_across_chunks_counted_once():
+    # Chunk di 3 byte: ogni '</item>' è spezzato tra più chunk
+    content, truncated = read(rss(10), max_entries=4, chunk_size=3)
+
+    assert truncated == 'entries'
+    assert content.count(b'</item>') == 4
+
+
+def test_namespaced_atom_entries():
+    body = b"<feed>" + b"<atom:entry>x</atom:entry >" * 5 + b"</feed>"
+    content, truncated = read(body, max_entries=2)
+
+    assert truncated == 'entries'
+    assert content.count(b'</atom:entry') == 2
+
+
+def test_byte_cap_applies_with_and_without_entry_cap():
+    body = rss(200)
+    for max_entries in (0, 500):
+        content, truncated = read(body, max_bytes=100, max_entries=max_entries)
+        assert truncated == 'bytes'
+        assert content == body[:100]
+
+
+def test_fewer_entries_than_cap_is_not_truncated():
+    body = rss(5)
+    assert read(body, max_entries=20) == (body, None)
@@ -0,0 +1,65 @@
+from utils.render_cache import FORMAT_BROADCAST, FORMAT_COMMAND, RenderCache, RenderedEdition
+
+
+def news(*numbers):
+    return [(f"Notizia {n}", f"https://example.com/{n}", 'Example', '16/10/2026', 'it') for n in numbers]
+
+
+class Builder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, items, max_length=None):
+        def build():
+            self.calls += 1
+            text = '\n'.join(item[0] for item in items)
+            return RenderedEdition(text[:max_length] if max_length else text)
+        return build
+
+
+def test_same_articles_reuse_the_render():
+    cache, build = RenderCache(), Builder()
+    first = cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2)))
+    again = cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2)))
+
+    assert again is first
+    assert build.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_new_article_invalidates_the_previous_render():
+    cache, build = RenderCache(), Builder()
+    cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2)))
+    updated = cache.render('tech', news(3, 1), FORMAT_BROADCAST, build(news(3, 1)))
+
+    assert updated.text == 'Notizia 3\nNotizia 1'
+    assert build.calls == 2
+    assert cache.stats()['invalidations'] == 1
+    assert len(cache) == 1  # la versione precedente è stata scartata
+
+    # Un altro formato degli stessi articoli non è toccato
+    cache.render('tech', news(3, 1), FORMAT_COMMAND, build(news(3, 1)))
+    assert len(cache) == 2
+
+
+def test_changed_alternates_invalidate_the_render():
+    cache, build = RenderCache(), Builder()
+    cache.render('tech', news(1), FORMAT_BROADCAST, build(news(1)), alternates={})
+    cache.render('tech', news(1), FORMAT_BROADCAST, build(news(1)),
+                 alternates={'https://example.com/1': [('Altra', 'https://altra.example.com/1')]})
+
+    assert build.calls == 2
+
+
+def test_different_max_length_is_rendered_separately():
+    cache, build = RenderCache(), Builder()
+    full = cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2)), max_length=100)
+    short = cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2), max_length=5), max_length=5)
+
+    assert full.text == 'Notizia 1\nNotizia 2'
+    assert short.text == 'Notiz'
+    assert build.calls == 2
+    # Entrambe le versioni restano valide per il proprio limite
+    assert cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2)), max_length=100) is full
+    assert cache.render('tech', news(1, 2), FORMAT_BROADCAST, build(news(1, 2)), max_length=5) is short
+    assert build.calls == 2
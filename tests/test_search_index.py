@@ -0,0 +1,51 @@
+from utils.feed_cache import Article
+from utils.search_index import SearchIndex
+
+
+def article(title, link='https://example.com/l1', summary=''):
+    return Article(title, link, 'Example', 'it', 1000.0, '2026-10-16 10:00', summary)
+
+
+def test_title_change_keeps_other_feeds():
+    index = SearchIndex()
+    index.update_feed('feedA', [article('Zelda in arrivo')])
+    index.update_feed('feedB', [article('Zelda in arrivo')])
+
+    index.update_feed('feedA', [article('Zelda: data di uscita')])
+    index.update_feed('feedA', [])
+
+    # feedB contiene ancora l'articolo: resta cercabile, con il titolo più recente
+    assert [found.title for found in index.search('zelda')] == ['Zelda: data di uscita']
+    index.update_feed('feedB', [])
+    assert index.search('zelda') == []
+    assert len(index) == 0
+
+
+def test_summary_change_is_reindexed():
+    index = SearchIndex()
+    index.update_feed('feedA', [article('Nintendo', summary='vecchio')])
+    index.update_feed('feedA', [article('Nintendo', summary='annunciato Metroid')])
+
+    assert index.search('vecchio') == []
+    assert [found.summary for found in index.search('metroid')] == ['annunciato Metroid']
+
+
+def test_unchanged_text_replaces_article():
+    index = SearchIndex()
+    index.update_feed('feedA', [article('Nintendo Switch 2')])
+    updated = article('Nintendo Switch 2')
+    updated.published_ts = 2000.0
+    index.update_feed('feedA', [updated])
+
+    assert index.search('switch')[0] is updated
+
+
+def test_article_removed_only_when_no_feed_has_it():
+    index = SearchIndex()
+    index.update_feed('feedA', [article('Xbox Game Pass')])
+    index.update_feed('feedB', [article('Xbox Game Pass')])
+
+    index.remove_feed('feedA')
+    assert len(index.search('xbox')) == 1
+    index.remove_feed('feedB')
+    assert index.search('xbox') == []
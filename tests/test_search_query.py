@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from database.db import Database
+from utils.news_fetcher import NewsFetcher, fts_match_expression, parse_search_query
+
+
+def test_plain_text_has_no_filters():
+    assert parse_search_query('  nintendo   switch ') == ('nintendo switch', {})
+
+
+def test_filters_extracted_from_anywhere():
+    text, filters = parse_search_query('since:2026-01-01 zelda CAT:Switch until:2026-02-01 remake')
+
+    assert text == 'zelda remake'
+    assert filters == {'since': '2026-01-01', 'cat': 'Switch', 'until': '2026-02-01'}
+
+
+def test_filter_syntax_inside_words_is_text():
+    text, filters = parse_search_query('recensione:since:2026-01-01 http://example.com')
+    assert filters == {}
+    assert text == 'recensione:since:2026-01-01 http://example.com'
+
+
+def test_only_filters_leaves_empty_text():
+    assert parse_search_query('cat:pc') == ('', {'cat': 'pc'})
+
+
+def test_fts_expression_uses_stemmed_prefixes():
+    assert fts_match_expression('Giochi della Nintendo') == '"gioc"* OR "nintend"*'
+    assert fts_match_expression('il la di') == ''
+
+
+def test_archive_filters():
+    fetcher = NewsFetcher()
+    filters = fetcher._archive_filters({'since': '2026-01-01', 'until': '2026-01-31', 'cat': 'Switch'})
+
+    assert filters['since'] == datetime(2026, 1, 1).timestamp()
+    assert filters['until'] == datetime(2026, 2, 1).timestamp()  # until incluso
+    assert filters['categories'] == ['switch']
+    assert fetcher._archive_filters({'since': 'ieri'}) == {}
+
+
+def test_archive_search_applies_filters(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    january = datetime(2026, 1, 15).timestamp()
+    march = datetime(2026, 3, 15).timestamp()
+    db.archive_articles([
+        ('https://example.com/1', 'Nuovo gioco Zelda', '', 'A', 'it', ',switch,', january, '15/01/2026'),
+        ('https://example.com/2', 'Zelda remake annunciato', '', 'B', 'it', ',switch,', march, '15/03/2026'),
+        ('https://example.com/3', 'Zelda su PC?', '', 'C', 'en', ',pc,', january, '15/01/2026'),
+    ])
+    fetcher = NewsFetcher()
+    text, filters = parse_search_query('zelda cat:switch until:2026-01-31')
+
+    results = db.search_archive(fts_match_expression(text), 5, **fetcher._archive_filters(filters))
+
+    assert [item[1] for item in results] == ['https://example.com/1']
+
+
+def test_latest_archived_articles_by_category(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    db.archive_articles([
+        ('https://example.com/1', 'Vecchia', '', 'A', 'it', ',generale_it,', 100.0, '01/01/1970'),
+        ('https://example.com/2', 'Recente', '', 'B', 'en', ',generale_en,ps5,', 300.0, '01/01/1970'),
+        ('https://example.com/3', 'Solo PC', '', 'C', 'en', ',pc,', 200.0, '01/01/1970'),
+    ])
+
+    assert [item[1] for item in db.get_articles(['generale_it', 'generale_en'], 5)] == [
+        'https://example.com/2', 'https://example.com/1'
+    ]
+    assert [item[1] for item in db.get_articles(['ps5'], 5)] == ['https://example.com/2']
+    assert db.get_articles([], 5) == []
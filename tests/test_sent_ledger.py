@@ -0,0 +1,21 @@
+from utils.sent_ledger import article_id, group_by_unseen
+
+
+def test_article_id_is_stable_signed_64_bit():
+    first = article_id('https://example.com/1')
+    assert first == article_id('https://example.com/1')
+    assert first != article_id('https://example.com/2')
+    assert -2 ** 63 <= first < 2 ** 63
+
+
+def test_chats_grouped_by_unseen_articles():
+    ids = [10, 20, 30]
+    seen = {1: {10}, 2: {10}, 3: {10, 20, 30}, 4: {99}}
+
+    groups = group_by_unseen([1, 2, 3, 4, 5], ids, seen)
+
+    assert groups == {(1, 2): [1, 2], (0, 1, 2): [4, 5]}
+
+
+def test_no_groups_when_everything_seen():
+    assert group_by_unseen([1, 2], [10], {1: {10}, 2: {10}}) == {}
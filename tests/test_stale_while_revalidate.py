@@ -0,0 +1,29 @@
+import asyncio
+
+from benchmarks.feed_server import synthetic_rss
+from tests.feed_helpers import LocalFeed, local_fetcher
+
+
+def test_stale_copy_served_with_a_single_background_revalidation(tmp_path):
+    async def scenario():
+        feed = LocalFeed(synthetic_rss('old', 3), etag=None, latency=0.2)
+        await feed.start()
+        try:
+            async with local_fetcher(str(tmp_path / 'test.db'), feed.url) as fetcher:
+                first = await fetcher.fetch_feed(feed.url, force=True)
+                fetcher.cache_ttl = 0  # copia scaduta ma entro la staleness massima
+                feed.body = synthetic_rss('new', 4)
+
+                served = [await fetcher.fetch_feed(feed.url) for _ in range(3)]
+                inflight = list(fetcher._inflight.values())
+                await asyncio.gather(*inflight)
+                refreshed = fetcher.cache.peek(feed.url)
+                return feed, first, served, inflight, refreshed
+        finally:
+            await feed.stop()
+
+    feed, first, served, inflight, refreshed = asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert all(copy is first for copy in served)  # risposta immediata con la copia scaduta
+    assert len(inflight) == 1
+    assert len(feed.requests) == 2  # download iniziale + una sola rivalidazione
+    assert len(refreshed) == 4
@@ -0,0 +1,76 @@
+from utils.feed_cache import Article
+from utils.news_fetcher import merge_latest
+from utils.story_clusters import StoryClusters
+
+NEAR_MISSES = [
+    ('Nintendo Switch 2: svelato il prezzo', 'Nintendo Switch 2: svelata la data'),
+    ('GTA 6 trailer 2 pubblicato', 'GTA 5 trailer pubblicato'),
+    ('Xbox Game Pass: i giochi di ottobre 2026', 'Xbox Game Pass: i giochi di novembre 2026'),
+]
+
+
+def article(title, link, source, published_ts=1000.0):
+    return Article(title, f'https://{source.lower()}.example.com/{link}', source, 'it', published_ts, '')
+
+
+def clustered(first, second, same_feed=False):
+    clusters = StoryClusters()
+    if same_feed:
+        clusters.update_feed('feed-a', [first, second])
+    else:
+        clusters.update_feed('feed-a', [first])
+        clusters.update_feed('feed-b', [second])
+    return clusters.cluster_of(first) == clusters.cluster_of(second)
+
+
+def test_same_story_from_different_sources_is_grouped():
+    first = article('Nintendo Switch 2: svelato il prezzo ufficiale', '1', 'Everyeye')
+    second = article('Nintendo Switch 2, svelato il prezzo', '2', 'Ign', 1600.0)
+
+    assert clustered(first, second)
+
+
+def test_near_miss_titles_stay_separate():
+    for first_title, second_title in NEAR_MISSES:
+        first = article(first_title, '1', 'Everyeye')
+        second = article(second_title, '2', 'Ign')
+        assert not clustered(first, second), (first_title, second_title)
+
+
+def test_same_source_never_grouped():
+    first = article('Nintendo Switch 2: svelato il prezzo ufficiale', '1', 'Everyeye')
+    second = article('Nintendo Switch 2, svelato il prezzo', '2', 'Everyeye')
+
+    assert not clustered(first, second)
+    assert not clustered(first, second, same_feed=True)
+
+
+def test_same_feed_never_grouped_even_across_sources():
+    first = article('Nintendo Switch 2: svelato il prezzo ufficiale', '1', 'Everyeye')
+    second = article('Nintendo Switch 2, svelato il prezzo', '2', 'Ign')
+
+    assert not clustered(first, second, same_feed=True)
+
+
+def test_cluster_rejects_a_second_article_from_a_member_source():
+    clusters = StoryClusters()
+    everyeye = article('Nintendo Switch 2: svelato il prezzo ufficiale', '1', 'Everyeye')
+    ign = article('Nintendo Switch 2, svelato il prezzo', '2', 'Ign')
+    everyeye_again = article('Nintendo Switch 2 svelato il prezzo', '3', 'Everyeye')
+    clusters.update_feed('everyeye', [everyeye])
+    clusters.update_feed('ign', [ign])
+    clusters.update_feed('everyeye-news', [everyeye_again])
+
+    assert clusters.cluster_of(everyeye) == clusters.cluster_of(ign)
+    assert clusters.cluster_of(everyeye_again) != clusters.cluster_of(ign)
+    assert [other.source for other in clusters.alternates(ign.link)] == ['Everyeye']
+
+
+def test_near_misses_from_one_feed_all_reach_get_news():
+    clusters = StoryClusters()
+    feed = [article(title, str(n), 'Synthetic', 2000.0 - n)
+            for n, title in enumerate(title for pair in NEAR_MISSES for title in pair)]
+    clusters.update_feed('synthetic', feed)
+
+    assert len(merge_latest([feed], 3, key=clusters.cluster_of)) == 3
+    assert len(clusters) == len(feed)
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import hmac
+import time
+
+from database.db import Database
+from utils import websub
+from utils.websub import DENIED, WebSubManager, WebSubSubscription, read_body_capped
+
+BODY = b"<rss><channel><item><title>nuovo</title></item></channel></rss>"
+
+
+def subscription(secret='segreto'):
+    return WebSubSubscription('https://example.com/feed', 'abc', 'https://hub.example.com', 'https://example.com/feed',
+                              secret)
+
+
+def sign(body, secret='segreto', algorithm='sha256'):
+    return f"{algorithm}=" + hmac.new(secret.encode(), body, getattr(hashlib, algorithm)).hexdigest()
+
+
+def test_valid_signatures_accepted():
+    manager = WebSubManager(None)
+    for algorithm in ('sha1', 'sha256', 'sha384', 'sha512'):
+        assert manager.verify_signature(subscription(), BODY, sign(BODY, algorithm=algorithm))
+
+
+def test_header_case_and_spaces_tolerated():
+    manager = WebSubManager(None)
+    header = sign(BODY)
+    assert manager.verify_signature(subscription(), BODY, ' SHA256 =' + header.split('=', 1)[1].upper() + ' ')
+
+
+def test_wrong_secret_or_body_rejected():
+    manager = WebSubManager(None)
+    assert not manager.verify_signature(subscription(), BODY, sign(BODY, secret='sbagliato'))
+    assert not manager.verify_signature(subscription(), BODY + b' ', sign(BODY))
+
+
+def test_missing_or_malformed_header_rejected():
+    manager = WebSubManager(None)
+    for header in (None, '', 'sha256', 'md5=' + hashlib.md5(BODY).hexdigest(), 'sha256='):
+        assert not manager.verify_signature(subscription(), BODY, header)
+
+
+def test_non_ascii_signature_rejected():
+    manager = WebSubManager(None)
+    valid = sign(BODY)
+    for header in ('sha256=' + 'é' * 64, valid[:-1] + 'ß', 'sha256=ﬀ' + valid[8:]):
+        assert not manager.verify_signature(subscription(), BODY, header)
+
+
+def test_push_body_read_stops_at_the_cap():
+    consumed = []
+
+    async def chunks():
+        for n in range(10):
+            consumed.append(n)
+            yield b'x' * 100
+
+    assert asyncio.run(read_body_capped(chunks(), 2000)) == b'x' * 1000
+    consumed.clear()
+    assert asyncio.run(read_body_capped(chunks(), 250)) is None
+    assert consumed == [0, 1, 2]  # il resto del corpo non viene letto
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+def test_denied_subscription_retried_only_after_backoff(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(websub, 'time', clock)
+    db = Database(str(tmp_path / 'test.db'))
+    manager = WebSubManager('https://bot.example.com', db=db, denied_retry=3600)
+    denied = subscription()
+    manager._register(denied)
+    manager.verify_intent('abc', {'hub.mode': 'denied', 'hub.topic': denied.topic, 'hub.reason': 'no'})
+
+    assert denied.state == DENIED
+    assert not manager.needs_subscription(denied.url, denied.hub)
+    assert manager.needs_subscription(denied.url, 'https://other-hub.example.com')
+
+    # Il momento del rifiuto sopravvive al riavvio
+    restored = WebSubManager('https://bot.example.com', db=db, denied_retry=3600)
+    restored.load(db.get_websub_subscriptions())
+    assert not restored.needs_subscription(denied.url, denied.hub)
+
+    clock.now += 3601
+    assert manager.needs_subscription(denied.url, denied.hub)
+    assert restored.needs_subscription(denied.url, denied.hub)
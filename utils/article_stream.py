@@ -0,0 +1,117 @@
+"""Flusso asincrono dei nuovi articoli, pubblicato da NewsFetcher a ogni refresh"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from utils.feed_cache import Article
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleEvent:
+    """Articoli mai visti prima comparsi in un refresh di un feed"""
+    __slots__ = ('url', 'categories', 'articles', 'created_at')
+
+    def __init__(self, url: str, categories: List[str], articles: List[Article]):
+        self.url = url
+        self.categories = categories
+        self.articles = articles
+        self.created_at = time.time()
+
+    def __repr__(self) -> str:
+        return f"ArticleEvent({self.url!r}, {len(self.articles)} articles)"
+
+
+class Subscription:
+    """Coda limitata di un consumatore; si legge con `async for event in subscription`"""
+
+    def __init__(self, stream: 'ArticleStream', name: str, maxsize: int):
+        self.name = name
+        self._stream = stream
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ArticleEvent:
+        event = await self._queue.get()
+        if event is None:
+            raise StopAsyncIteration
+        self.delivered += 1
+        return event
+
+    async def _put(self, event: Optional[ArticleEvent], timeout: float) -> None:
+        """Backpressure: attende spazio fino a `timeout`, poi scarta l'evento più vecchio"""
+        try:
+            self._queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self._queue.put(event), timeout)
+        except asyncio.TimeoutError:
+            if self._queue.full():
+                self._queue.get_nowait()
+                self.dropped += 1
+                logger.warning(f"Subscriber {self.name} is too slow, dropped the oldest article event")
+            self._queue.put_nowait(event)
+
+    def close(self) -> None:
+        self._stream.unsubscribe(self)
+
+    def stats(self) -> Dict:
+        return {'queued': self._queue.qsize(), 'maxsize': self._queue.maxsize,
+                'delivered': self.delivered, 'dropped': self.dropped}
+
+
+class ArticleStream:
+    """Pub/sub in memoria con più consumatori, ognuno con la propria coda limitata.
+
+    publish attende che ogni consumatore abbia spazio (al massimo `put_timeout`
+    secondi), così un consumatore lento rallenta il fetcher invece di far crescere
+    la memoria; oltre il timeout perde gli eventi più vecchi.
+    """
+
+    def __init__(self, maxsize: int = 100, put_timeout: float = 2.0):
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.published = 0
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(self, name: str, maxsize: Optional[int] = None) -> Subscription:
+        subscription = Subscription(self, name, maxsize or self.maxsize)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        if not subscription.closed:
+            subscription.closed = True
+            # Sveglia il consumatore in attesa: l'iterazione termina
+            try:
+                subscription._queue.put_nowait(None)
+            except asyncio.QueueFull:
+                subscription._queue.get_nowait()
+                subscription._queue.put_nowait(None)
+
+    async def publish(self, event: ArticleEvent) -> None:
+        if not self._subscriptions:
+            return
+        self.published += 1
+        await asyncio.gather(*(subscription._put(event, self.put_timeout)
+                               for subscription in list(self._subscriptions)))
+
+    def close(self) -> None:
+        for subscription in list(self._subscriptions):
+            self.unsubscribe(subscription)
+
+    def stats(self) -> Dict:
+        return {
+            'published': self.published,
+            'subscribers': {subscription.name: subscription.stats() for subscription in self._subscriptions},
+        }
@@ -0,0 +1,296 @@
+"""Invio di un messaggio a molte chat con più mittenti in parallelo, entro i limiti di Telegram"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Esito finale di un invio a una chat
+DELIVERED = 'delivered'
+DROPPED = 'dropped'  # tentativi esauriti o errore inatteso
+INVALID = 'invalid'  # chat bloccata o inesistente (Forbidden, BadRequest sulla chat)
+
+# Messaggi al secondo accettati da Telegram per bot
+TELEGRAM_GLOBAL_LIMIT = 30
+
+# BadRequest che riguardano la chat e non il messaggio (descrizioni di Telegram, in minuscolo).
+# Gli altri (entità Markdown non valide, messaggio troppo lungo...) fallirebbero per ogni destinatario
+_CHAT_ERRORS = ('chat not found', 'user not found', 'peer_id_invalid', 'bot was blocked', 'bot was kicked',
+                'user is deactivated', "bot can't initiate conversation", 'bot is not a member',
+                'have no rights to send', 'not enough rights to send')
+
+
+def is_chat_error(error: Exception) -> bool:
+    """True se l'errore rende non valida la chat (da disiscrivere), non il messaggio"""
+    if isinstance(error, Forbidden):
+        return True
+    return isinstance(error, BadRequest) and any(fragment in str(error).lower() for fragment in _CHAT_ERRORS)
+
+
+class TokenBucket:
+    """Token bucket a prenotazione: ogni acquire prende un token, anche in debito.
+
+    Chi arriva quando il bucket è vuoto prenota il prossimo token libero e
+    attende il tempo necessario, così i mittenti concorrenti passano in ordine di arrivo.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate  # token al secondo
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Prende un token e restituisce i secondi da attendere prima di usarlo"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def is_idle(self) -> bool:
+        """True se il bucket sarebbe di nuovo pieno: può essere scartato"""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+
+class BroadcastProgress:
+    """Avanzamento di un invio: consegnati, ritentati, scartati, chat non valide e velocità"""
+
+    def __init__(self, name: str, total: int):
+        self.name = name
+        self.total = total
+        self.delivered = 0
+        self.retried = 0  # tentativi ripetuti (flood control, timeout, errori di rete)
+        self.dropped = 0  # chat rinunciate: tentativi esauriti o errori inattesi
+        self.invalid = 0  # chat bloccate/inesistenti (Forbidden, BadRequest sulla chat)
+        self.aborted: Optional[str] = None  # errore del messaggio che ha interrotto l'invio
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> int:
+        return self.delivered + self.dropped + self.invalid
+
+    def rate(self) -> float:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict:
+        rate = self.rate()
+        remaining = self.total - self.done
+        return {
+            'name': self.name,
+            'total': self.total,
+            'delivered': self.delivered,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'invalid': self.invalid,
+            'aborted': self.aborted,
+            'rate': round(rate, 1),
+            'eta_seconds': round(remaining / rate) if rate and not self.finished_at else None,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class Broadcaster:
+    """Pool di mittenti concorrenti governati da token bucket condivisi tra tutti gli invii.
+
+    - globale: `global_rate` messaggi al secondo per l'intero bot; il default (25) resta sotto
+      TELEGRAM_GLOBAL_LIMIT perché in un secondo qualsiasi passano fino a rate + 1 messaggi
+    - per chat privata: un messaggio ogni `chat_interval` secondi
+    - per gruppo (chat_id negativo): `group_per_minute` messaggi al minuto
+
+    Un RetryAfter di Telegram sospende tutti i mittenti per il tempo indicato e rimette
+    la chat in coda; timeout ed errori di rete vengono ritentati con backoff esponenziale
+    (al massimo `max_attempts` tentativi per chat). Un BadRequest dovuto al messaggio
+    interrompe l'invio: le chat rimaste non vengono nemmeno tentate.
+    """
+
+    def __init__(self, global_rate: float = 25.0, chat_interval: float = 1.0, group_per_minute: float = 20.0,
+                 workers: int = 16, progress_interval: float = 10.0, max_attempts: int = 5,
+                 base_backoff: float = 1.0, max_backoff: float = 30.0):
+        self.global_rate = global_rate
+        self.chat_interval = chat_interval
+        self.group_per_minute = group_per_minute
+        self.workers = max(1, workers)
+        self.progress_interval = progress_interval
+        self.max_attempts = max(1, max_attempts)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0  # time.monotonic() fino a cui nessun mittente invia
+        self.pauses = 0
+        # Capacità 1: nessuna raffica oltre il limite globale, nemmeno dopo una pausa
+        self._global = TokenBucket(global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self.active: Dict[int, BroadcastProgress] = {}
+        self._broadcast_ids = itertools.count()
+        self.recent: deque = deque(maxlen=10)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = self.group_per_minute / 60 if chat_id < 0 else 1 / self.chat_interval
+            bucket = self._chats[chat_id] = TokenBucket(rate)
+        return bucket
+
+    async def broadcast(self, name: str, chat_ids: Iterable[int], send: Callable[[int], Awaitable],
+                        on_result: Optional[Callable[[int, str, Optional[Exception]], None]] = None
+                        ) -> BroadcastProgress:
+        """Chiama `send(chat_id)` per ogni chat e restituisce l'avanzamento finale.
+
+        `on_result(chat_id, esito, errore)` riceve l'esito finale di ogni chat (DELIVERED,
+        DROPPED o INVALID), ad esempio per disiscrivere le chat non valide. Se l'invio viene
+        interrotto (progress.aborted) le chat non tentate non ricevono alcun esito.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait((chat_id, 1))
+        progress = BroadcastProgress(name, queue.qsize())
+        if not progress.total:
+            return progress
+
+        # Chiave per invio, non per nome: più edizioni della stessa categoria partono insieme
+        key = next(self._broadcast_ids)
+        self.active[key] = progress
+        workers = min(self.workers, progress.total)
+        retries: List[asyncio.TimerHandle] = []
+        reporter = asyncio.create_task(self._report(progress))
+        try:
+            await asyncio.gather(*(self._worker(queue, progress, workers, retries, send, on_result)
+                                   for _ in range(workers)))
+        finally:
+            reporter.cancel()
+            for handle in retries:
+                handle.cancel()
+            progress.finished_at = time.time()
+            self.active.pop(key, None)
+            self.recent.append(progress)
+            self._prune()
+        logger.info(f"Broadcast {name} {'interrotto' if progress.aborted else 'completato'}: "
+                    f"{progress.delivered}/{progress.total} consegnati, "
+                    f"{progress.retried} ritentati, {progress.dropped} scartati, "
+                    f"{progress.invalid} chat non valide ({progress.rate():.1f} msg/s)")
+        return progress
+
+    def pause(self, seconds: float) -> None:
+        """Sospende tutti i mittenti (flood control di Telegram)"""
+        now = time.monotonic()
+        if now >= self.paused_until:
+            # Gli altri invii già partiti ricevono lo stesso RetryAfter: contano come un'unica pausa
+            self.pauses += 1
+            logger.warning(f"Flood control: invii sospesi per {seconds:.0f}s")
+        self.paused_until = max(self.paused_until, now + seconds)
+
+    async def _wait_turn(self, chat_id: int) -> None:
+        """Attende la fine di una pausa e i token della chat e globale"""
+        await self._sleep_while_paused()
+        # Prima il limite della chat, poi quello globale: l'attesa di una chat non spreca token globali
+        await self._chat_bucket(chat_id).acquire()
+        await self._global.acquire()
+        # Una pausa iniziata mentre si attendevano i token vale anche per questo invio
+        await self._sleep_while_paused()
+
+    async def _sleep_while_paused(self) -> None:
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+
+    async def _worker(self, queue: asyncio.Queue, progress: BroadcastProgress, workers: int,
+                      retries: List[asyncio.TimerHandle], send, on_result) -> None:
+        def resolve(chat_id: int, outcome: str, error: Optional[Exception] = None) -> None:
+            setattr(progress, outcome, getattr(progress, outcome) + 1)
+            if on_result:
+                on_result(chat_id, outcome, error)
+
+        def retry(chat_id: int, attempt: int, delay: float = 0.0) -> bool:
+            """Rimette la chat in coda (dopo `delay` secondi); False se i tentativi sono esauriti"""
+            if attempt >= self.max_attempts:
+                return False
+            progress.retried += 1
+            if delay > 0:
+                retries.append(asyncio.get_running_loop().call_later(delay, queue.put_nowait, (chat_id, attempt + 1)))
+            else:
+                queue.put_nowait((chat_id, attempt + 1))
+            return True
+
+        while progress.done < progress.total and not progress.aborted:
+            item = await queue.get()
+            if item is None:
+                return
+            chat_id, attempt = item
+            await self._wait_turn(chat_id)
+            if progress.aborted:
+                break
+            try:
+                await send(chat_id)
+                resolve(chat_id, DELIVERED)
+            except RetryAfter as e:
+                seconds = getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)()
+                self.pause(seconds)
+                if not retry(chat_id, attempt):
+                    logger.error(f"Invio a {chat_id} scartato: flood control dopo {attempt} tentativi")
+                    resolve(chat_id, DROPPED, e)
+            except (BadRequest, Forbidden) as e:
+                # BadRequest è una sottoclasse di NetworkError: va gestita prima
+                if is_chat_error(e):
+                    logger.warning(f"Impossibile inviare a {chat_id}: {e}")
+                    resolve(chat_id, INVALID, e)
+                else:
+                    # Errore del messaggio: fallirebbe per tutti, la chat non è da disiscrivere
+                    if not progress.aborted:
+                        logger.error(f"Broadcast {progress.name} interrotto, messaggio rifiutato da Telegram: {e}")
+                        progress.aborted = str(e)
+                    resolve(chat_id, DROPPED, e)
+            except NetworkError as e:
+                # Timeout compresi (TimedOut)
+                if not retry(chat_id, attempt, self._backoff(attempt)):
+                    logger.error(f"Invio a {chat_id} scartato dopo {attempt} tentativi: {e}")
+                    resolve(chat_id, DROPPED, e)
+            except Exception as e:
+                logger.error(f"Errore invio a {chat_id}: {e}")
+                resolve(chat_id, DROPPED, e)
+
+        # Ultima chat risolta o invio interrotto: sveglia gli altri mittenti in attesa sulla coda
+        for _ in range(workers):
+            queue.put_nowait(None)
+
+    async def _report(self, progress: BroadcastProgress) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            info = progress.as_dict()
+            logger.info(f"Broadcast {progress.name}: {progress.done}/{progress.total} "
+                        f"({info['rate']} msg/s, circa {info['eta_seconds']}s rimanenti)")
+
+    def _prune(self) -> None:
+        """Scarta i bucket delle chat tornati pieni, per non tenerne uno per ogni iscritto"""
+        if not self.active:
+            for chat_id in [chat_id for chat_id, bucket in self._chats.items() if bucket.is_idle()]:
+                del self._chats[chat_id]
+
+    def stats(self) -> Dict:
+        return {
+            'global_rate': self.global_rate,
+            'workers': self.workers,
+            'paused_for': max(0, round(self.paused_until - time.monotonic())),
+            'pauses': self.pauses,
+            'active': [progress.as_dict() for progress in self.active.values()],
+            'recent': [progress.as_dict() for progress in reversed(self.recent)],
+        }
+
@@ -0,0 +1,90 @@
+"""Circuit breaker per feed con backoff esponenziale"""
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class _FeedCircuit:
+    __slots__ = ('state', 'failures', 'trips', 'open_until', 'last_error', 'last_failure')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0  # errori consecutivi
+        self.trips = 0  # aperture consecutive, determina il backoff
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self.last_failure: Optional[float] = None
+
+
+class CircuitBreaker:
+    """Tiene traccia degli errori per URL e sospende i feed che continuano a fallire.
+
+    closed -> open dopo `failure_threshold` errori consecutivi; trascorso il backoff
+    (base_backoff * 2^aperture, al massimo max_backoff) passa a half_open e lascia
+    passare una richiesta di prova: se riesce torna closed, altrimenti si riapre
+    con un backoff doppio.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 60, max_backoff: float = 3600):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._circuits: Dict[str, _FeedCircuit] = {}
+
+    def _circuit(self, url: str) -> _FeedCircuit:
+        circuit = self._circuits.get(url)
+        if circuit is None:
+            circuit = self._circuits[url] = _FeedCircuit()
+        return circuit
+
+    def state(self, url: str) -> str:
+        circuit = self._circuits.get(url)
+        return circuit.state if circuit else CLOSED
+
+    def allow(self, url: str) -> bool:
+        """True se il feed può essere scaricato ora"""
+        circuit = self._circuits.get(url)
+        if circuit is None or circuit.state != OPEN:
+            return True
+        if time.time() >= circuit.open_until:
+            circuit.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self, url: str) -> None:
+        circuit = self._circuits.get(url)
+        if circuit is not None:
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.trips = 0
+            circuit.open_until = 0.0
+
+    def record_failure(self, url: str, error: str) -> None:
+        circuit = self._circuit(url)
+        circuit.failures += 1
+        circuit.last_error = error
+        circuit.last_failure = time.time()
+
+        if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** circuit.trips))
+            circuit.state = OPEN
+            circuit.trips += 1
+            circuit.open_until = time.time() + backoff
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Stato dei feed che hanno registrato almeno un errore"""
+        return {
+            url: {
+                'state': circuit.state,
+                'failures': circuit.failures,
+                'open_until': (datetime.fromtimestamp(circuit.open_until).isoformat(timespec='seconds')
+                               if circuit.state == OPEN else None),
+                'last_error': circuit.last_error,
+            }
+            for url, circuit in self._circuits.items()
+            if circuit.failures or circuit.state != CLOSED
+        }
@@ -0,0 +1,156 @@
+"""Cache LRU dei feed con limite di voci e di memoria"""
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class Article:
+    """Articolo normalizzato: solo i campi usati dal bot, senza HTML né metadati del parser"""
+    __slots__ = ('title', 'link', 'source', 'lang', 'published_ts', 'date_str', 'summary')
+
+    def __init__(self, title: str, link: str, source: str, lang: str,
+                 published_ts: Optional[float], date_str: str, summary: str = ''):
+        self.title = title
+        self.link = link
+        self.source = source
+        self.lang = lang
+        self.published_ts = published_ts
+        self.date_str = date_str
+        self.summary = summary  # testo semplice, già troncato dal parser
+
+    def as_tuple(self) -> Tuple[str, str, str, str, str]:
+        """(title, link, source, date, language), il formato restituito da get_news"""
+        return self.title, self.link, self.source, self.date_str, self.lang
+
+    def approx_size(self) -> int:
+        """Byte occupati dall'oggetto e dai suoi campi (stima)"""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, field)) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Article({self.title!r}, {self.link!r})"
+
+
+class _CachedFeed:
+    __slots__ = ('articles', 'fetched_at', 'size', 'content_hash')
+
+    def __init__(self, articles: List[Article], fetched_at: float, content_hash: Optional[str] = None):
+        self.articles = articles
+        self.fetched_at = fetched_at
+        self.content_hash = content_hash  # hash del corpo da cui sono stati estratti gli articoli
+        self.size = sys.getsizeof(articles) + sum(article.approx_size() for article in articles)
+
+
+class FeedCache:
+    """url -> articoli del feed, con eviction LRU oltre `max_entries` voci o `max_bytes` byte"""
+
+    def __init__(self, max_entries: int = 200, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._feeds: 'OrderedDict[str, _CachedFeed]' = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._feeds
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def get(self, url: str) -> Optional[List[Article]]:
+        feed = self._feeds.get(url)
+        if feed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._feeds.move_to_end(url)
+        return feed.articles
+
+    def peek(self, url: str) -> Optional[List[Article]]:
+        """Come get, ma senza contare hit/miss né aggiornare l'ordine LRU (letture interne)"""
+        feed = self._feeds.get(url)
+        return feed.articles if feed else None
+
+    def age(self, url: str) -> float:
+        """Secondi dall'ultimo aggiornamento (infinito se il feed non è in cache)"""
+        feed = self._feeds.get(url)
+        return time.time() - feed.fetched_at if feed else float('inf')
+
+    def put(self, url: str, articles: List[Article], fetched_at: Optional[float] = None,
+            content_hash: Optional[str] = None) -> None:
+        self.pop(url)
+        feed = _CachedFeed(articles, fetched_at if fetched_at is not None else time.time(), content_hash)
+        self._feeds[url] = feed
+        self.total_bytes += feed.size
+        self._evict()
+
+    def content_hash(self, url: str) -> Optional[str]:
+        """Hash del corpo del feed in cache (None se assente o sconosciuto)"""
+        feed = self._feeds.get(url)
+        return feed.content_hash if feed else None
+
+    def touch(self, url: str, fetched_at: Optional[float] = None) -> None:
+        """Rinnova il timestamp di un feed invariato (es. risposta 304)"""
+        feed = self._feeds.get(url)
+        if feed is not None:
+            feed.fetched_at = fetched_at if fetched_at is not None else time.time()
+            self._feeds.move_to_end(url)
+
+    def pop(self, url: str) -> Optional[List[Article]]:
+        feed = self._feeds.pop(url, None)
+        if feed is None:
+            return None
+        self.total_bytes -= feed.size
+        return feed.articles
+
+    def clear(self) -> None:
+        self._feeds.clear()
+        self.total_bytes = 0
+
+    def items(self) -> Iterator[Tuple[str, List[Article]]]:
+        for url, feed in self._feeds.items():
+            yield url, feed.articles
+
+    def _evict(self) -> None:
+        # Mantiene sempre almeno la voce appena inserita
+        while len(self._feeds) > 1 and (len(self._feeds) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, feed = self._feeds.popitem(last=False)
+            self.total_bytes -= feed.size
+            self.evictions += 1
+
+    def to_snapshot(self) -> Dict:
+        """Contenuto della cache in forma serializzabile in JSON"""
+        return {
+            url: {
+                'fetched_at': feed.fetched_at,
+                'content_hash': feed.content_hash,
+                'articles': [[getattr(article, field) for field in Article.__slots__] for article in feed.articles],
+            }
+            for url, feed in self._feeds.items()
+        }
+
+    def load_snapshot(self, snapshot: Dict) -> int:
+        """Ripopola la cache da to_snapshot(); restituisce il numero di feed caricati"""
+        loaded = 0
+        for url, feed in snapshot.items():
+            try:
+                articles = [Article(*fields) for fields in feed['articles']]
+                self.put(url, articles, float(feed['fetched_at']), feed.get('content_hash'))
+                loaded += 1
+            except (KeyError, TypeError, ValueError):
+                continue
+        return loaded
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._feeds),
+            'articles': sum(len(feed.articles) for feed in self._feeds.values()),
+            'bytes': self.total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
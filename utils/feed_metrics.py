@@ -0,0 +1,158 @@
+"""Metriche per feed: latenza, byte scaricati, tempo di parsing, entry valide ed errori"""
+import bisect
+import time
+from typing import Dict, List, Optional
+
+# Limiti superiori (secondi) dei bucket dell'istogramma di latenza; l'ultimo raccoglie il resto
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, float('inf'))
+
+
+class _FeedStats:
+    __slots__ = ('requests', 'not_modified', 'unchanged', 'errors', 'latency_buckets', 'latency_total', 'latency_max',
+                 'bytes_total', 'bytes_last', 'parse_count', 'parse_total', 'entries_last', 'last_fetch',
+                 'truncations', 'pushes', 'push_bytes')
+
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0  # corpi identici all'ultimo scaricato: parsing evitato
+        self.errors: Dict[str, int] = {}  # motivo -> conteggio
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.bytes_total = 0
+        self.bytes_last = 0
+        self.parse_count = 0
+        self.parse_total = 0.0
+        self.entries_last = 0
+        self.last_fetch: Optional[float] = None
+        self.truncations: Dict[str, int] = {}  # 'bytes' / 'entries' -> conteggio
+        self.pushes = 0  # contenuti ricevuti via WebSub
+        self.push_bytes = 0
+
+
+class FeedMetrics:
+    """Contatori e istogrammi per URL, aggiornati da NewsFetcher a ogni download"""
+
+    def __init__(self):
+        self._feeds: Dict[str, _FeedStats] = {}
+
+    def _stats(self, url: str) -> _FeedStats:
+        stats = self._feeds.get(url)
+        if stats is None:
+            stats = self._feeds[url] = _FeedStats()
+        return stats
+
+    def _observe_latency(self, stats: _FeedStats, latency: float) -> None:
+        stats.requests += 1
+        stats.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        stats.latency_total += latency
+        stats.latency_max = max(stats.latency_max, latency)
+        stats.last_fetch = time.time()
+
+    def record_response(self, url: str, latency: float, size: int) -> None:
+        """Download completato (200): latenza fino all'ultimo byte e dimensione del corpo"""
+        stats = self._stats(url)
+        self._observe_latency(stats, latency)
+        stats.bytes_total += size
+        stats.bytes_last = size
+
+    def record_push(self, url: str, size: int) -> None:
+        """Contenuto ricevuto da un hub WebSub (nessuna richiesta da parte nostra)"""
+        stats = self._stats(url)
+        stats.pushes += 1
+        stats.push_bytes += size
+
+    def record_truncation(self, url: str, reason: str) -> None:
+        """Download interrotto prima della fine: limite di byte o entry sufficienti"""
+        stats = self._stats(url)
+        stats.truncations[reason] = stats.truncations.get(reason, 0) + 1
+
+    def record_not_modified(self, url: str, latency: float) -> None:
+        stats = self._stats(url)
+        self._observe_latency(stats, latency)
+        stats.not_modified += 1
+
+    def record_unchanged(self, url: str) -> None:
+        """Corpo identico all'ultimo (stesso hash): parsing e normalizzazione saltati"""
+        self._stats(url).unchanged += 1
+
+    def record_parse(self, url: str, seconds: float, entries: int) -> None:
+        stats = self._stats(url)
+        stats.parse_count += 1
+        stats.parse_total += seconds
+        stats.entries_last = entries
+
+    def record_error(self, url: str, reason: str, latency: Optional[float] = None) -> None:
+        """Tentativo fallito; senza latenza la richiesta è già stata contata (es. feed non valido)"""
+        stats = self._stats(url)
+        if latency is not None:
+            self._observe_latency(stats, latency)
+        stats.errors[reason] = stats.errors.get(reason, 0) + 1
+
+    @staticmethod
+    def _percentile(stats: _FeedStats, fraction: float) -> Optional[float]:
+        """Percentile stimato dall'istogramma (limite superiore del bucket)"""
+        if not stats.requests:
+            return None
+        target = fraction * stats.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+            seen += count
+            if seen >= target:
+                return bound if bound != float('inf') else stats.latency_max
+        return stats.latency_max
+
+    def summary(self, url: str) -> Dict:
+        stats = self._feeds.get(url) or _FeedStats()
+        errors = sum(stats.errors.values())
+        return {
+            'requests': stats.requests,
+            'latency_avg': round(stats.latency_total / stats.requests, 3) if stats.requests else None,
+            'latency_p50': self._percentile(stats, 0.5),
+            'latency_p95': self._percentile(stats, 0.95),
+            'latency_max': round(stats.latency_max, 3),
+            'latency_histogram': {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets)
+            },
+            'bytes_total': stats.bytes_total,
+            'bytes_last': stats.bytes_last,
+            'parse_avg': round(stats.parse_total / stats.parse_count, 4) if stats.parse_count else None,
+            'parse_total': round(stats.parse_total, 3),
+            'entries_last': stats.entries_last,
+            'not_modified_ratio': round(stats.not_modified / stats.requests, 3) if stats.requests else None,
+            'unchanged_bodies': stats.unchanged,
+            'unchanged_ratio': round(stats.unchanged / stats.requests, 3) if stats.requests else None,
+            'errors': errors,
+            'error_rate': round(errors / stats.requests, 3) if stats.requests else None,
+            'errors_by_reason': dict(stats.errors),
+            'truncations': dict(stats.truncations),
+            'pushes': stats.pushes,
+            'push_bytes': stats.push_bytes,
+            'last_fetch': stats.last_fetch,
+        }
+
+    def totals(self) -> Dict[str, int]:
+        """Somme su tutti i feed: richieste, 304, parsing eseguiti ed evitati, push WebSub, errori"""
+        feeds = self._feeds.values()
+        return {
+            'requests': sum(stats.requests for stats in feeds),
+            'not_modified': sum(stats.not_modified for stats in feeds),
+            'parses': sum(stats.parse_count for stats in feeds),
+            'parses_saved': sum(stats.unchanged for stats in feeds),
+            'pushes': sum(stats.pushes for stats in feeds),
+            'errors': sum(sum(stats.errors.values()) for stats in feeds),
+        }
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {url: self.summary(url) for url in self._feeds}
+
+    def most_expensive(self, limit: Optional[int] = None) -> List[str]:
+        """URL ordinati per costo: tempo di rete e di parsing spesi, poi byte scaricati"""
+        return sorted(
+            self._feeds,
+            key=lambda url: (self._feeds[url].latency_total + self._feeds[url].parse_total,
+                             self._feeds[url].bytes_total),
+            reverse=True
+        )[:limit]
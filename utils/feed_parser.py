@@ -0,0 +1,90 @@
+"""Parsing dei feed RSS fuori dall'event loop"""
+import asyncio
+import html
+import logging
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import feedparser
+
+logger = logging.getLogger(__name__)
+
+PARSE_MODES = ('process', 'thread', 'inline')
+SUMMARY_MAX_CHARS = 300
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def plain_summary(raw: str) -> str:
+    """Summary without HTML tags and entities, truncated to SUMMARY_MAX_CHARS"""
+    text = html.unescape(_TAG_RE.sub(' ', raw or ''))
+    return _SPACE_RE.sub(' ', text).strip()[:SUMMARY_MAX_CHARS]
+
+
+def parse_feed(content: bytes) -> Dict[str, Any]:
+    """Parse raw feed bytes and return only the fields the bot uses.
+
+    Runs inside the worker, so the result must stay small and picklable:
+    entries without title or link are dropped here instead of in the event loop.
+    """
+    feed = feedparser.parse(content)
+    entries = []
+    for entry in feed.entries:
+        if not hasattr(entry, 'title') or not hasattr(entry, 'link'):
+            continue
+        published = entry.get('published_parsed')
+        updated = entry.get('updated_parsed')
+        entries.append({
+            'title': entry.title,
+            'link': entry.link,
+            'published_parsed': tuple(published) if published else None,
+            'updated_parsed': tuple(updated) if updated else None,
+            'summary': plain_summary(entry.get('summary', '')),
+        })
+    # Hub WebSub pubblicizzato dal feed (<atom:link rel="hub">) e URL canonico del topic (rel="self")
+    links = {link.get('rel'): link.get('href') for link in feed.feed.get('links', [])}
+    return {'entries': entries, 'total_entries': len(feed.entries),
+            'hub': links.get('hub'), 'self': links.get('self')}
+
+
+class FeedParser:
+    """Esegue parse_feed su un process pool, un thread pool o direttamente (inline)"""
+
+    def __init__(self, mode: str = 'process', workers: int = 2):
+        if mode not in PARSE_MODES:
+            logger.warning(f"Unknown parse executor '{mode}', falling back to 'process'")
+            mode = 'process'
+        self.mode = mode
+        self.workers = max(1, workers)
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='feed-parse')
+        return self._executor
+
+    async def parse(self, content: bytes) -> Dict[str, Any]:
+        """Parse a feed body without blocking the event loop (unless mode is inline)"""
+        if self.mode == 'inline':
+            return parse_feed(content)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), parse_feed, content)
+        except BrokenProcessPool:
+            # Un worker è morto: ricrea il pool e riprova una volta
+            logger.error("Feed parse process pool broken, recreating it")
+            self.shutdown()
+            return await loop.run_in_executor(self._get_executor(), parse_feed, content)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
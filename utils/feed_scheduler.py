@@ -0,0 +1,89 @@
+"""Pianificazione adattiva del polling dei feed RSS"""
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+class FeedPoller:
+    """Decide quando interrogare ogni feed in base alla sua frequenza di pubblicazione.
+
+    La cadenza di un feed è la mediana degli intervalli tra i suoi articoli più
+    recenti; il feed viene interrogato circa due volte per cadenza, entro i limiti
+    [min_interval, max_interval] e con un jitter per non allineare le richieste.
+    """
+
+    SAMPLE_SIZE = 20  # articoli recenti usati per stimare la cadenza
+
+    def __init__(self, min_interval: float = 120, max_interval: float = 7200,
+                 default_interval: float = 600, jitter: float = 0.1):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.cadence: Dict[str, float] = {}  # url -> secondi medi tra due articoli
+        self.next_poll: Dict[str, float] = {}  # url -> timestamp del prossimo polling
+        self.push_until: Dict[str, float] = {}  # url -> scadenza della sottoscrizione WebSub
+        self.running = False
+
+    def sync(self, urls: Iterable[str]) -> None:
+        """Allinea i feed pianificati a RSS_FEEDS: i nuovi sono subito da interrogare"""
+        urls = set(urls)
+        now = time.time()
+        for url in urls:
+            self.next_poll.setdefault(url, now)
+        for url in list(self.next_poll):
+            if url not in urls:
+                self.next_poll.pop(url, None)
+                self.cadence.pop(url, None)
+                self.push_until.pop(url, None)
+
+    def observe(self, url: str, timestamps: Iterable[Optional[float]]) -> None:
+        """Aggiorna la cadenza di un feed dai timestamp dei suoi articoli"""
+        recent = sorted((ts for ts in timestamps if ts), reverse=True)[:self.SAMPLE_SIZE]
+        gaps = [newer - older for newer, older in zip(recent, recent[1:]) if newer > older]
+        if gaps:
+            self.cadence[url] = statistics.median(gaps)
+
+    def set_push(self, url: str, until: Optional[float]) -> None:
+        """Feed ricevuto via WebSub fino a `until`: il polling resta solo come riserva"""
+        if until:
+            self.push_until[url] = until
+        else:
+            self.push_until.pop(url, None)
+
+    def interval(self, url: str) -> float:
+        """Intervallo di polling (senza jitter) per un feed"""
+        if self.push_until.get(url, 0) > time.time():
+            return self.max_interval
+        cadence = self.cadence.get(url)
+        if cadence is None:
+            return self.default_interval
+        return min(self.max_interval, max(self.min_interval, cadence / 2))
+
+    def reschedule(self, url: str) -> None:
+        interval = self.interval(url)
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        self.next_poll[url] = time.time() + interval
+
+    def due(self) -> List[str]:
+        now = time.time()
+        return [url for url, when in self.next_poll.items() if when <= now]
+
+    def seconds_until_next(self) -> float:
+        if not self.next_poll:
+            return self.default_interval
+        return max(1.0, min(self.next_poll.values()) - time.time())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Stato per feed: prossimo polling, intervallo e cadenza stimata"""
+        return {
+            url: {
+                'next_poll': datetime.fromtimestamp(when).isoformat(timespec='seconds'),
+                'interval_seconds': round(self.interval(url)),
+                'cadence_seconds': round(self.cadence[url]) if url in self.cadence else None,
+                'push': self.push_until.get(url, 0) > time.time(),
+            }
+            for url, when in sorted(self.next_poll.items(), key=lambda item: item[1])
+        }
@@ -0,0 +1,167 @@
+"""Limiti di concorrenza dei download (globale e per host) con priorità"""
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+# Priorità: numeri più bassi passano prima
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 1
+
+
+class FetchTicket:
+    """Richiesta di uno slot; la priorità può essere alzata mentre è in coda"""
+    __slots__ = ('priority', 'future', 'queue')
+
+    def __init__(self, priority: int = PRIORITY_BACKGROUND):
+        self.priority = priority
+        self.future: Optional[asyncio.Future] = None
+        self.queue: Optional['PrioritySemaphore'] = None  # semaforo su cui è in attesa
+
+    def promote(self, priority: int) -> None:
+        """Alza la priorità; se il ticket è in coda viene riaccodato nella nuova posizione"""
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        if self.queue is not None:
+            self.queue._push(self)
+
+
+class PrioritySemaphore:
+    """Semaforo che sveglia i waiter in ordine di priorità, poi di arrivo"""
+
+    def __init__(self, value: int):
+        self._value = max(1, value)
+        self._waiters: List[Tuple[int, int, FetchTicket]] = []
+        self._counter = itertools.count()
+        self.active = 0
+        self.waiting = 0
+
+    async def acquire(self, ticket: FetchTicket) -> None:
+        if self.active < self._value and not self.waiting:
+            self.active += 1
+            return
+        ticket.future = asyncio.get_running_loop().create_future()
+        ticket.queue = self
+        self.waiting += 1
+        self._push(ticket)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            # Slot assegnato a un waiter cancellato prima di riprendere: passa al successivo
+            if ticket.future.done() and not ticket.future.cancelled():
+                self.release()
+            raise
+        finally:
+            if ticket.queue is self:
+                # Cancellato mentre era in coda: la sua voce nel heap è ormai obsoleta
+                self.waiting -= 1
+            ticket.future = None
+            ticket.queue = None
+
+    def release(self) -> None:
+        self.active -= 1
+        self._wake()
+
+    def _push(self, ticket: FetchTicket) -> None:
+        heapq.heappush(self._waiters, (ticket.priority, next(self._counter), ticket))
+
+    def _wake(self) -> None:
+        while self._waiters and self.active < self._value:
+            priority, _, ticket = heapq.heappop(self._waiters)
+            # Voci obsolete: ticket promosso (riaccodato con un'altra priorità) o non più in coda
+            if ticket.queue is not self or priority != ticket.priority or ticket.future.done():
+                continue
+            self.active += 1
+            self.waiting -= 1
+            ticket.queue = None
+            ticket.future.set_result(None)
+
+
+class FetchLimiter:
+    """Limita i download contemporanei in totale e per host.
+
+    Lo slot dell'host viene preso prima di quello globale, così un download in
+    attesa di un host occupato non blocca gli altri host.
+    """
+
+    def __init__(self, global_limit: int = 16, per_host_limit: int = 2):
+        self.global_limit = global_limit
+        self.per_host_limit = per_host_limit
+        self._global = PrioritySemaphore(global_limit)
+        self._hosts: Dict[str, PrioritySemaphore] = {}
+
+    def _host(self, url: str) -> PrioritySemaphore:
+        host = urlparse(url).hostname or ''
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = PrioritySemaphore(self.per_host_limit)
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, url: str, ticket: FetchTicket):
+        host = self._host(url)
+        await host.acquire(ticket)
+        try:
+            await self._global.acquire(ticket)
+            try:
+                yield
+            finally:
+                self._global.release()
+        finally:
+            host.release()
+
+    def stats(self) -> Dict:
+        busy_hosts = {host: {'active': sem.active, 'waiting': sem.waiting}
+                      for host, sem in self._hosts.items() if sem.active or sem.waiting}
+        return {
+            'global_limit': self.global_limit,
+            'per_host_limit': self.per_host_limit,
+            'active': self._global.active,
+            'waiting': self._global.waiting + sum(info['waiting'] for info in busy_hosts.values()),
+            'hosts': busy_hosts,
+        }
+
+
+class ConnectionStats:
+    """Riuso delle connessioni e cache DNS, raccolti tramite aiohttp.TraceConfig"""
+
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_create)
+        trace.on_connection_reuseconn.append(self._on_reuse)
+        trace.on_dns_cache_hit.append(self._on_dns_hit)
+        trace.on_dns_cache_miss.append(self._on_dns_miss)
+        return trace
+
+    async def _on_create(self, session, context, params):
+        self.created += 1
+
+    async def _on_reuse(self, session, context, params):
+        self.reused += 1
+
+    async def _on_dns_hit(self, session, context, params):
+        self.dns_hits += 1
+
+    async def _on_dns_miss(self, session, context, params):
+        self.dns_misses += 1
+
+    def stats(self) -> Dict:
+        total = self.created + self.reused
+        return {
+            'connections_created': self.created,
+            'connections_reused': self.reused,
+            'reuse_ratio': round(self.reused / total, 3) if total else None,
+            'dns_cache_hits': self.dns_hits,
+            'dns_cache_misses': self.dns_misses,
+        }
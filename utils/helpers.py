@@ -1,6 +1,29 @@
 # utils/helpers.py
-def format_news(news_list: list, include_source: bool = True) -> str:
-    """Formatta una lista di notizie per l'invio con emoji e migliore leggibilità"""
+import logging
+
+from telegram.helpers import escape_markdown
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Limite di Telegram per il testo di un messaggio
+MAX_MESSAGE_LENGTH = 4096
+
+
+def message_length(text: str) -> int:
+    """Lunghezza come la conta Telegram (unità UTF-16: le emoji valgono 2)"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def format_news(news_list: list, include_source: bool = True, alternates: dict = None,
+                max_length: int = MAX_MESSAGE_LENGTH) -> str:
+    """Formatta una lista di notizie per l'invio con emoji e migliore leggibilità.
+
+    alternates: link -> [(fonte, link)] delle altre fonti che riportano la stessa notizia
+    (al massimo NEAR_DUP_MAX_ALTERNATES per notizia). Oltre max_length si rinuncia prima
+    ai link alternativi, dalle ultime notizie, e poi alle ultime notizie.
+    """
     formatted = []
     
     # Emoji per diverse categorie di notizie
@@ -15,7 +38,9 @@ def format_news(news_list: list, include_source: bool = True) -> str:
         'Generale': '🎯'
     }
 
-    for idx, (title, url, source) in enumerate(news_list, 1):
+    alternates = alternates or {}
+    for idx, item in enumerate(news_list, 1):
+        title, url, source = item[:3]
         # Determina l'emoji appropriata basata sulla fonte o usa l'emoji default
         emoji = '📢'
         for category, cat_emoji in category_emojis.items():
@@ -25,10 +50,46 @@ def format_news(news_list: list, include_source: bool = True) -> str:
 
         # Formatta la notizia con stile migliorato
         source_text = f"_{source}_" if include_source else ""
-        formatted.append(
+        entry = (
             f"{emoji} *{idx}. {title}*\n"
             f"{source_text}\n"
             f"➡️ [Leggi l'articolo completo]({url})"
         )
-    
-    return "\n\n" + "\n\n".join(formatted) + "\n\n💡 _Usa /dettaglio [numero] per maggiori informazioni_"
\ No newline at end of file
+        # Stessa notizia da altre fonti: una sola voce con i link alternativi
+        others = alternates.get(url)
+        extra = ""
+        if others:
+            extra = "\n🔁 Anche su: " + ", ".join(f"[{other_source}]({other_url})"
+                                                 for other_source, other_url in others[:Config.NEAR_DUP_MAX_ALTERNATES])
+            if len(others) > Config.NEAR_DUP_MAX_ALTERNATES:
+                extra += f" (+{len(others) - Config.NEAR_DUP_MAX_ALTERNATES})"
+        formatted.append((entry, extra))
+
+    def join(parts):
+        return "\n\n" + "\n\n".join(parts) + "\n\n💡 _Usa /dettaglio [numero] per maggiori informazioni_"
+
+    parts = [entry + extra for entry, extra in formatted]
+    for idx in reversed(range(len(parts))):
+        if message_length(join(parts)) <= max_length:
+            break
+        parts[idx] = formatted[idx][0]
+    while len(parts) > 1 and message_length(join(parts)) > max_length:
+        parts.pop()
+    if len(parts) < len(formatted) or message_length(join(parts)) > max_length:
+        logger.warning(f"Messaggio oltre {max_length} caratteri: mostrate {len(parts)}/{len(formatted)} notizie")
+    return join(parts)
+
+
+def format_news_v2(news_list: list) -> str:
+    """Elenco compatto in MarkdownV2: titolo, fonte con link, data e lingua (voci non formattabili saltate)"""
+    entries = []
+    for i, (title, link, source, date, lang) in enumerate(news_list):
+        try:
+            entries.append(
+                f"*{i+1}\\. {escape_markdown(title, version=2)}*\n"
+                f"[{escape_markdown(source, version=2)}]({escape_markdown(link, version=2)}) \\| "
+                f"{escape_markdown(date, version=2)} \\| {escape_markdown(lang.upper(), version=2)}"
+            )
+        except Exception as e:
+            logger.error(f"Error formatting entry {i}: {e}")
+    return "\n\n".join(entries)
@@ -1,15 +1,104 @@
-import feedparser
+import calendar
+import hashlib
+import heapq
+import json
+import os
+import re
+import time
+from collections import OrderedDict
 from urllib.parse import urlparse
-from typing import List, Tuple, Dict, Optional
+from typing import Callable, Hashable, Iterable, List, Set, Tuple, Dict, Optional
 import logging
 import asyncio
 import aiohttp
 from datetime import datetime, timedelta
 import ssl
+from config import Config
+from database.db import Database
+from utils.feed_parser import FeedParser
+from utils.article_stream import ArticleEvent, ArticleStream
+from utils.feed_cache import Article, FeedCache
+from utils.feed_scheduler import FeedPoller
+from utils.circuit_breaker import CircuitBreaker
+from utils.feed_metrics import FeedMetrics
+from utils.fetch_limiter import (ConnectionStats, FetchLimiter, FetchTicket,
+                                 PRIORITY_BACKGROUND, PRIORITY_USER)
+from utils.search_index import SearchIndex, terms
+from utils.story_clusters import StoryClusters
+from utils.websub import WebSubManager
 
 # Configurazione logging
 logger = logging.getLogger(__name__)
 
+# Fine di un'entry RSS/Atom (anche con prefisso di namespace), per contare le entry durante lo streaming
+_ENTRY_END_RE = re.compile(rb'</(?:[\w-]+:)?(?:item|entry)\s*>', re.IGNORECASE)
+_READ_CHUNK_SIZE = 16 * 1024
+
+# Filtri della sintassi di /cerca: since:AAAA-MM-GG until:AAAA-MM-GG cat:categoria
+_SEARCH_FILTER_RE = re.compile(r'(?<!\S)(since|until|cat):(\S+)', re.IGNORECASE)
+
+
+def parse_search_query(search_term: str) -> Tuple[str, Dict[str, str]]:
+    """Split a search string into free text and its since:/until:/cat: filters"""
+    filters = {key.lower(): value for key, value in _SEARCH_FILTER_RE.findall(search_term)}
+    text = _SEARCH_FILTER_RE.sub(' ', search_term)
+    return ' '.join(text.split()), filters
+
+
+def fts_match_expression(text: str) -> str:
+    """FTS5 query matching any search term as a stemmed prefix ('giochi' -> "gioc"*)"""
+    return ' OR '.join(f'"{term}"*' for term in sorted(terms(text)))
+
+
+async def read_capped(response, max_bytes: int, max_entries: int) -> Tuple[bytes, Optional[str]]:
+    """Read a feed body in chunks, stopping at max_bytes or after max_entries complete entries.
+
+    max_entries=0 disables the entry cap. Returns the body (cut after the last complete entry
+    when stopping on entries; feedparser handles the missing closing tags) and the truncation
+    reason: None, 'bytes' or 'entries'.
+    """
+    body = bytearray()
+    entries = 0
+    scan_from = 0
+    async for chunk in response.content.iter_chunked(_READ_CHUNK_SIZE):
+        body += chunk
+        if not max_entries:
+            if len(body) >= max_bytes:
+                return bytes(body[:max_bytes]), 'bytes'
+            continue
+        for match in _ENTRY_END_RE.finditer(body, scan_from):
+            entries += 1
+            scan_from = match.end()
+            if entries >= max_entries:
+                return bytes(body[:match.end()]), 'entries'
+        # Un tag di chiusura può essere spezzato tra due chunk: riparti poco prima della fine,
+        # senza tornare su entry già contate
+        scan_from = max(scan_from, len(body) - 64)
+        if len(body) >= max_bytes:
+            return bytes(body[:max_bytes]), 'bytes'
+    return bytes(body), None
+
+
+def merge_latest(feeds: Iterable[List[Article]], limit: int,
+                 key: Optional[Callable[[Article], Hashable]] = None) -> List[Article]:
+    """K-way merge of per-feed article lists (each newest first) into the `limit` newest unique links.
+
+    Stops as soon as `limit` distinct links have been found instead of sorting everything.
+    With `key` (e.g. a story cluster) only the newest article per key is kept.
+    """
+    key = key or (lambda a: a.link)
+    seen = set()
+    latest = []
+    for article in heapq.merge(*feeds, key=lambda a: a.published_ts or 0.0, reverse=True):
+        article_key = key(article)
+        if article_key in seen:
+            continue
+        seen.add(article_key)
+        latest.append(article)
+        if len(latest) >= limit:
+            break
+    return latest
+
 
 class NewsFetcher:
     def __init__(self):
@@ -94,23 +183,87 @@ class NewsFetcher:
             ]
         }
 
-        self.cache = {}
-        self.last_fetch = {}
+        # Cache LRU degli articoli normalizzati per feed, limitata in voci e byte
+        self.cache = FeedCache(Config.FEED_CACHE_MAX_ENTRIES, Config.FEED_CACHE_MAX_BYTES)
+        self.cache_ttl = Config.FEED_CACHE_TTL_SECONDS
+        self.max_staleness = Config.FEED_MAX_STALENESS_SECONDS
+        self.validators = {}  # url -> {'etag': ..., 'last_modified': ...}
+        self.db = None
+        self.parser = FeedParser(Config.FEED_PARSE_EXECUTOR, Config.FEED_PARSE_WORKERS)
+        self.poller = FeedPoller(
+            min_interval=Config.FEED_MIN_POLL_SECONDS,
+            max_interval=Config.FEED_MAX_POLL_SECONDS,
+            default_interval=Config.FEED_DEFAULT_POLL_SECONDS
+        )
+        self._poller_task: Optional[asyncio.Task] = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=Config.FEED_BREAKER_THRESHOLD,
+            base_backoff=Config.FEED_BREAKER_BASE_BACKOFF,
+            max_backoff=Config.FEED_BREAKER_MAX_BACKOFF
+        )
+        # Latenza, byte, parsing ed errori per feed (/feed_metrics, /feed_stats)
+        self.metrics = FeedMetrics()
+        # Download contemporanei limitati in totale e per host; le richieste degli utenti passano prima
+        self.limiter = FetchLimiter(Config.FEED_MAX_CONCURRENT_FETCHES, Config.FEED_MAX_FETCHES_PER_HOST)
+        self.connections = ConnectionStats()
+        # Indice invertito su titoli e sommari, aggiornato a ogni refresh
+        self.index = SearchIndex()
+        # Cluster delle notizie quasi duplicate tra fonti diverse
+        self.clusters = StoryClusters(
+            threshold=Config.NEAR_DUP_THRESHOLD,
+            window=Config.NEAR_DUP_WINDOW_HOURS * 3600
+        )
+        # Nuovi articoli pubblicati a ogni refresh (invii automatici e altri consumatori)
+        self.stream = ArticleStream(Config.ARTICLE_STREAM_QUEUE_SIZE, Config.ARTICLE_STREAM_PUT_TIMEOUT)
+        # Push WebSub per i feed che pubblicizzano un hub; il polling resta come riserva
+        self.websub = WebSubManager(Config.WEBSUB_CALLBACK_BASE, Config.WEBSUB_LEASE_SECONDS,
+                                    denied_retry=Config.WEBSUB_DENIED_RETRY_SECONDS)
+        self._websub_tasks: Set[asyncio.Task] = set()
+        # (url del feed, link) già pubblicati: un articolo condiviso da più feed è nuovo per ognuno
+        self._seen_links: 'OrderedDict[Tuple[str, str], None]' = OrderedDict()
+        self._baselined: Set[str] = set()  # feed di cui si conosce già il contenuto
         self.session = None
         self._initialized = False
-        self.lock = asyncio.Lock()  # Aggiungi un lock per thread safety
+        # Single-flight: un solo download in corso per URL, condiviso dai chiamanti concorrenti
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._tickets: Dict[str, FetchTicket] = {}
+
+    async def initialize(self, db: Optional[Database] = None, load_snapshot: bool = True):
+        """Initialize aiohttp session.
 
-    async def initialize(self):
-        """Initialize aiohttp session"""
+        db replaces the default database (benchmarks use a throwaway one); load_snapshot=False
+        skips warming the cache from the on-disk snapshot.
+        """
         if not self._initialized:
             ssl_context = ssl.create_default_context()
             ssl_context.check_hostname = False
             ssl_context.verify_mode = ssl.CERT_NONE
 
+            # Pool di connessioni: keep-alive per riusare le connessioni tra un poll e l'altro,
+            # cache DNS e limiti allineati al FetchLimiter
+            connector = aiohttp.TCPConnector(
+                ssl=ssl_context,
+                limit=Config.FEED_MAX_CONCURRENT_FETCHES,
+                limit_per_host=Config.FEED_MAX_FETCHES_PER_HOST,
+                keepalive_timeout=Config.FEED_KEEPALIVE_SECONDS,
+                use_dns_cache=True,
+                ttl_dns_cache=Config.FEED_DNS_CACHE_SECONDS,
+                enable_cleanup_closed=True
+            )
             self.session = aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(ssl=ssl_context),
-                timeout=aiohttp.ClientTimeout(total=20)
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=20),
+                trace_configs=[self.connections.trace_config()]
             )
+            # I validatori sopravvivono ai riavvii grazie al database
+            self.db = db or Database()
+            self.validators = self.db.get_feed_validators()
+            self.websub.db = self.db
+            self.websub.load(self.db.get_websub_subscriptions())
+            for url in self._all_urls():
+                self.poller.set_push(url, self.websub.pushed_until(url))
+            if load_snapshot and not len(self.cache):
+                self.load_snapshot()
             self._initialized = True
             logger.info("Initialized aiohttp session")
             print("[DEBUG] Initialized aiohttp session")
@@ -120,200 +273,539 @@ class NewsFetcher:
         if not self._initialized:
             await self.initialize()
 
-    async def fetch_feed(self, url: str) -> feedparser.FeedParserDict:
-        """Fetch a single RSS feed with caching"""
+    async def fetch_feed(self, url: str, force: bool = False, priority: int = PRIORITY_USER) -> List[Article]:
+        """Fetch a single RSS feed with caching (force bypasses the cache, used by the poller).
+
+        priority decides the order of downloads queued on the fetch limiter.
+        """
         print(f"[DEBUG] Fetching feed: {url}")
 
         # Ensure session is initialized
         await self.ensure_initialized()
 
-        now = datetime.now()
-        # Use cache if available and recent (less than 10 minutes)
-        if url in self.cache and now - self.last_fetch.get(url, datetime.min) < timedelta(minutes=10):
-            print(f"[DEBUG] Using cached version of {url}")
-            return self.cache[url]
-
+        # I refresh forzati del poller non sono richieste: non contano come hit/miss della cache
+        cached = None if force else self.cache.get(url)
+        if cached is not None:
+            age = self.cache.age(url)
+            # Copia fresca; con il poller attivo è il poller a rinnovarla entro la staleness massima
+            if age < self.cache_ttl or (self.poller.running and age < self.max_staleness):
+                print(f"[DEBUG] Using cached version of {url}")
+                return cached
+
+            # Stale-while-revalidate: risposta immediata, aggiornamento in background
+            if age < self.max_staleness:
+                logger.debug(f"Serving stale copy of {url}, revalidating in background")
+                if self.breaker.allow(url):
+                    self._start_download(url, PRIORITY_BACKGROUND)
+                return cached
+
+        # Circuit breaker aperto: niente rete, si serve l'ultima copia valida
+        if not self.breaker.allow(url):
+            logger.debug(f"Circuit open for {url}, serving last good copy")
+            return self._last_good_copy(url)
+
+        # shield: se un chiamante viene cancellato il download condiviso prosegue per gli altri
+        return await asyncio.shield(self._start_download(url, priority))
+
+    def _start_download(self, url: str, priority: int) -> asyncio.Task:
+        """Start a download of url, or join the one already in flight (single-flight)"""
+        task = self._inflight.get(url)
+        if task is None:
+            ticket = FetchTicket(priority)
+            task = asyncio.ensure_future(self._download_feed(url, ticket))
+            self._inflight[url] = task
+            self._tickets[url] = ticket
+            task.add_done_callback(lambda _task: self._download_done(url))
+        else:
+            logger.debug(f"Joining in-flight fetch of {url}")
+            # Un utente che aspetta un refresh in background lo fa passare avanti in coda
+            self._tickets[url].promote(priority)
+        return task
+
+    def _download_done(self, url: str) -> None:
+        self._inflight.pop(url, None)
+        self._tickets.pop(url, None)
+
+    async def _download_feed(self, url: str, ticket: FetchTicket) -> List[Article]:
+        """Download and parse a feed, updating cache, validators, metrics and article store"""
+        now = time.time()
+        started = time.perf_counter()
         try:
-            # Improved error handling and timeout
-            async with self.session.get(url, timeout=10, raise_for_status=True) as response:
-                # Use bytes to avoid UnicodeDecodeError
-                content = await response.read()
-                feed = feedparser.parse(content)
-
-                # Validate feed structure and content
-                if not hasattr(feed, 'entries') or not feed.entries:
-                    logger.warning(f"Feed {url} returned no entries or is invalid")
-                    print(f"[WARNING] Feed {url} returned no entries or is invalid")
-                    return feedparser.FeedParserDict({'entries': []})
-
-                # Validate entries have required fields
-                valid_entries = []
-                for entry in feed.entries:
-                    if hasattr(entry, 'title') and hasattr(entry, 'link'):
-                        valid_entries.append(entry)
-
-                feed.entries = valid_entries
-                self.cache[url] = feed
-                self.last_fetch[url] = now
-                print(f"[DEBUG] Successfully fetched {url}, found {len(feed.entries)} valid entries")
-                return feed
+            # Slot globale e per host: la latenza misurata esclude l'attesa in coda
+            async with self.limiter.slot(url, ticket):
+                started = time.perf_counter()
+                headers = self._conditional_headers(url)
+                while True:
+                    # Improved error handling and timeout
+                    async with self.session.get(url, timeout=10, raise_for_status=True,
+                                                headers=headers) as response:
+                        if response.status == 304 and url in self.cache:
+                            # Feed invariato: rinnova solo il timestamp della cache
+                            self.cache.touch(url, now)
+                            self.breaker.record_success(url)
+                            self.metrics.record_not_modified(url, time.perf_counter() - started)
+                            logger.debug(f"Feed {url} not modified (304), cache refreshed")
+                            return self.cache.peek(url)
+                        if response.status == 304 and headers:
+                            # Copia rimossa dalla cache durante la richiesta: il 304 non è utilizzabile,
+                            # si dimenticano i validatori e si riscarica il feed completo
+                            logger.info(f"Feed {url} not modified but no longer cached, downloading it again")
+                            self._forget_validators(url)
+                            headers = {}
+                            continue
+
+                        # Use bytes to avoid UnicodeDecodeError; in streaming, con un tetto di byte ed entry
+                        content, truncated = await read_capped(response, Config.FEED_MAX_BYTES,
+                                                               Config.FEED_MAX_ENTRIES)
+                    break
+            self.metrics.record_response(url, time.perf_counter() - started, len(content))
+            started = None  # richiesta già contata: gli errori successivi non la ricontano
+            if truncated:
+                self.metrics.record_truncation(url, truncated)
+                if truncated == 'bytes':
+                    logger.warning(f"Feed {url} exceeds {Config.FEED_MAX_BYTES} bytes, truncated")
+
+            # Corpo identico all'ultimo scaricato (feed senza ETag): niente parsing, si rinnova solo la cache
+            content_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+            if content_hash == self.cache.content_hash(url):
+                self.cache.touch(url, now)
+                self.breaker.record_success(url)
+                self._update_validators(url, response.headers)
+                self.metrics.record_unchanged(url)
+                logger.debug(f"Feed {url} unchanged (same content hash), parse skipped")
+                return self.cache.peek(url)
+
+            # Il parsing (e la validazione delle entry) avviene fuori dall'event loop
+            parse_started = time.perf_counter()
+            parsed = await self.parser.parse(content)
+            parse_time = time.perf_counter() - parse_started
+
+            # Validate feed structure and content
+            if not parsed['total_entries']:
+                self.metrics.record_parse(url, parse_time, 0)
+                logger.warning(f"Feed {url} returned no entries or is invalid")
+                print(f"[WARNING] Feed {url} returned no entries or is invalid")
+                return self._fetch_failed(url, 'no entries or invalid feed')
+
+            articles = self._normalize_entries(url, parsed['entries'], now)
+            self.metrics.record_parse(url, parse_time, len(articles))
+            self.breaker.record_success(url)
+            self._update_validators(url, response.headers)
+            new_articles = await self._ingest(url, articles, now, content_hash)
+            self._discover_hub(url, parsed.get('hub'), parsed.get('self'))
+            print(f"[DEBUG] Successfully fetched {url}, found {len(articles)} valid entries "
+                  f"({len(new_articles)} new)")
+            return articles
 
         except aiohttp.ClientResponseError as e:
             logger.error(f"HTTP error fetching {url}: {e.status} {e.message}")
             print(f"[ERROR] HTTP error fetching {url}: {e.status} {e.message}")
-            return feedparser.FeedParserDict({'entries': []})
+            return self._fetch_failed(url, f"HTTP {e.status}", started)
         except aiohttp.ClientError as e:
             logger.error(f"HTTP error fetching {url}: {e}")
             print(f"[ERROR] HTTP error fetching {url}: {e}")
-            return feedparser.FeedParserDict({'entries': []})
+            return self._fetch_failed(url, type(e).__name__, started)
         except asyncio.TimeoutError:
             logger.error(f"Timeout fetching {url}")
             print(f"[ERROR] Timeout fetching {url}")
-            return feedparser.FeedParserDict({'entries': []})
+            return self._fetch_failed(url, 'timeout', started)
         except Exception as e:
             logger.error(f"Error fetching {url}: {e}", exc_info=True)
             print(f"[ERROR] Failed to fetch {url}: {e}")
-            return feedparser.FeedParserDict({'entries': []})
+            return self._fetch_failed(url, type(e).__name__, started)
+
+    async def _ingest(self, url: str, articles: List[Article], now: float,
+                      content_hash: Optional[str] = None) -> List[Article]:
+        """Store a feed's current articles everywhere (cache, index, clusters, database) and
+        publish the new ones; shared by polling and WebSub pushes"""
+        self.cache.put(url, articles, now, content_hash)
+        self.index.update_feed(url, articles)
+        self.clusters.update_feed(url, articles)
+        self.db.archive_articles(self._archive_rows(url, articles))
+        self.poller.observe(url, (article.published_ts for article in articles))
+        new_articles = self._new_articles(url, articles)
+        if new_articles:
+            await self.stream.publish(ArticleEvent(url, self._feed_categories(url), new_articles))
+        return new_articles
+
+    def _fetch_failed(self, url: str, reason: str, started: Optional[float] = None) -> List[Article]:
+        """Record a failed fetch (breaker and metrics) and fall back to the last good copy"""
+        self.breaker.record_failure(url, reason)
+        latency = time.perf_counter() - started if started is not None else None
+        self.metrics.record_error(url, reason, latency)
+        return self._last_good_copy(url)
+
+    def _discover_hub(self, url: str, hub: Optional[str], topic: Optional[str]) -> None:
+        """Subscribe in background to the WebSub hub advertised by a feed"""
+        if self.websub.needs_subscription(url, hub):
+            self._run_websub(self.websub.subscribe(self.session, url, hub, topic))
+
+    def _run_websub(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._websub_tasks.add(task)
+        task.add_done_callback(self._websub_tasks.discard)
+
+    def verify_websub(self, sub_id: str, params: Dict[str, str]) -> Optional[str]:
+        """Hub intent verification (GET on the callback); returns the challenge or None"""
+        challenge = self.websub.verify_intent(sub_id, params)
+        subscription = self.websub.get(sub_id)
+        if subscription is not None:
+            self.poller.set_push(subscription.url, self.websub.pushed_until(subscription.url))
+        return challenge
+
+    async def receive_push(self, sub_id: str, body: bytes, signature: Optional[str]) -> int:
+        """Content distribution from a hub: verify the HMAC, merge the pushed entries into
+        the cached feed and ingest them like a poll. Returns the HTTP status for the hub."""
+        subscription = self.websub.get(sub_id)
+        if subscription is None:
+            return 404
+        if len(body) > Config.FEED_MAX_BYTES:
+            return 413
+        # Firma non valida: si risponde comunque 2xx (come da specifica) ma il contenuto è ignorato
+        if not self.websub.verify_signature(subscription, body, signature):
+            self.websub.rejected += 1
+            logger.warning(f"Rejected WebSub push for {subscription.url}: invalid signature")
+            return 202
+
+        url = subscription.url
+        now = time.time()
+        try:
+            await self.ensure_initialized()
+            parsed = await self.parser.parse(body)
+            pushed = self._normalize_entries(url, parsed['entries'], now)
+            if not pushed:
+                return 202
+            # Il push può contenere solo le entry nuove: si uniscono a quelle già note del feed
+            known = self.cache.peek(url) or []
+            merged = {article.link: article for article in known}
+            merged.update((article.link, article) for article in pushed)
+            articles = sorted(merged.values(), key=lambda article: article.published_ts, reverse=True)
+            # Senza limite di entry il feed mantiene la sua lunghezza: le notizie nuove sostituiscono le più vecchie
+            keep = Config.FEED_MAX_ENTRIES or max(len(known), len(pushed))
+            new_articles = await self._ingest(url, articles[:keep], now)
+            self.websub.pushes += 1
+            self.metrics.record_push(url, len(body))
+            logger.info(f"WebSub push for {url}: {len(pushed)} entries, {len(new_articles)} new")
+        except Exception as e:
+            logger.error(f"Error ingesting WebSub push for {url}: {e}", exc_info=True)
+        return 202
+
+    async def renew_websub(self) -> int:
+        """Renew leases about to expire and retry subscriptions never verified"""
+        await self.ensure_initialized()
+        due = self.websub.renewals_due(Config.WEBSUB_RENEW_MARGIN)
+        results = await asyncio.gather(*(self.websub.subscribe(self.session, url) for url in due))
+        return sum(1 for result in results if result)
+
+    def _new_articles(self, url: str, articles: List[Article]) -> List[Article]:
+        """Articles this feed has never published before; the first load of a feed is only a baseline.
+
+        Seen links are tracked per feed: an article shared by a platform feed and a general
+        feed is new for both, so every broadcast category receives it.
+        """
+        new = [article for article in articles if (url, article.link) not in self._seen_links]
+        for article in articles:
+            self._seen_links[(url, article.link)] = None
+            self._seen_links.move_to_end((url, article.link))
+        while len(self._seen_links) > Config.ARTICLE_STREAM_SEEN_MAX:
+            self._seen_links.popitem(last=False)
+
+        if url not in self._baselined:
+            self._baselined.add(url)
+            return []
+        return new
+
+    def _last_good_copy(self, url: str) -> List[Article]:
+        """Last successfully parsed version of a feed (empty if never fetched)"""
+        return self.cache.peek(url) or []
+
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a cached feed"""
+        # Senza una copia in cache un 304 non sarebbe utilizzabile
+        validators = self.validators.get(url)
+        if not validators or url not in self.cache:
+            return {}
+
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def _update_validators(self, url: str, response_headers) -> None:
+        """Remember the validators sent by the server and persist them if changed"""
+        validators = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+        }
+        if self.validators.get(url, {'etag': None, 'last_modified': None}) == validators:
+            return
+
+        self.validators[url] = validators
+        if self.db:
+            self.db.save_feed_validators(url, validators['etag'], validators['last_modified'])
+
+    def _forget_validators(self, url: str) -> None:
+        """Drop a feed's validators (the next request is unconditional)"""
+        if self.validators.pop(url, None) is not None and self.db:
+            self.db.save_feed_validators(url, None, None)
+
+    def _all_urls(self) -> List[str]:
+        """Every distinct feed URL in RSS_FEEDS"""
+        return list(dict.fromkeys(url for urls in self.RSS_FEEDS.values() for url in urls))
+
+    def _category_urls(self, category: str) -> List[str]:
+        """Feed URLs behind a category ('generale' and unknown categories use both general lists)"""
+        urls = self.RSS_FEEDS.get(category, []) if category != 'generale' else []
+        if not urls:  # Fallback se categoria non trovata
+            urls = self.RSS_FEEDS.get('generale_it', []) + self.RSS_FEEDS.get('generale_en', [])
+        return urls
+
+    def _store_categories(self, category: str) -> List[str]:
+        """Categories to query in the article store for a requested category"""
+        if category != 'generale' and self.RSS_FEEDS.get(category):
+            return [category]
+        return ['generale_it', 'generale_en']
+
+    def _normalize_entries(self, url: str, entries: list, fetched_at: float) -> List[Article]:
+        """Build slim Article records for a freshly parsed feed (once per refresh), newest first"""
+        domain = urlparse(url).netloc.replace('www.', '').split('.')[0].capitalize()
+        lang = 'it' if url in self.RSS_FEEDS.get('generale_it', []) else 'en'
+        # Gli articoli senza data mantengono l'istante in cui sono stati visti la prima volta
+        first_seen = {article.link: article.published_ts for article in self.cache.peek(url) or []}
+
+        articles = []
+        for entry in entries:
+            link = entry.get('link')
+            if not link:
+                continue
+
+            # Gestione data: published, poi updated, infine l'istante del fetch
+            date_str = 'N/A'
+            parsed_date = entry.get('published_parsed') or entry.get('updated_parsed')
+            if parsed_date:
+                published_ts = float(calendar.timegm(parsed_date))
+                date_str = datetime(*parsed_date[:6]).strftime('%Y-%m-%d %H:%M')
+            else:
+                published_ts = first_seen.get(link) or fetched_at
+
+            articles.append(Article(entry.get('title') or 'No title', link, domain, lang,
+                                    published_ts, date_str, entry.get('summary') or ''))
+
+        articles.sort(key=lambda article: article.published_ts, reverse=True)
+        return articles
+
+    def _archive_rows(self, url: str, articles: List[Article]) -> List[Tuple]:
+        """Full-text archive rows: one per article, with the feed categories as ',cat1,cat2,'"""
+        categories = ',' + ','.join(self._feed_categories(url)) + ','
+        return [
+            (article.link, article.title, article.summary, article.source, article.lang,
+             categories, article.published_ts, article.date_str)
+            for article in articles
+        ]
+
+    def _feed_categories(self, url: str) -> List[str]:
+        """RSS_FEEDS categories that contain a feed URL"""
+        return [category for category, urls in self.RSS_FEEDS.items() if url in urls]
+
+    async def _refresh_urls(self, urls: List[str]) -> List[List[Article]]:
+        """Make sure the given feeds are fresh (downloads only the expired ones) and return their articles"""
+        results = await asyncio.gather(*(self.fetch_feed(url) for url in urls), return_exceptions=True)
+        return [result if isinstance(result, list) else [] for result in results]
 
     async def get_news(self, category: str = 'generale', limit: int = 5, keywords: Optional[List[str]] = None):
-        """Versione semplificata e più robusta"""
+        """Ultime notizie di una categoria: merge dei feed in cache, archivio articoli come riserva.
+
+        Le notizie quasi duplicate compaiono una sola volta (la più recente del cluster);
+        le altre fonti sono disponibili con alternate_sources.
+        Returns (title, link, source, date, language)
+        """
         try:
-            async with self.lock:  # Previene race conditions
-                await self.ensure_initialized()
-
-                # Normalizza la categoria
-                category = category.lower()
-
-                # Gestisci categorie speciali
-                if category == 'generale':
-                    urls = self.RSS_FEEDS.get('generale_it', []) + self.RSS_FEEDS.get('generale_en', [])
-                else:
-                    urls = self.RSS_FEEDS.get(category, [])
-                    if not urls:  # Fallback se categoria non trovata
-                        urls = self.RSS_FEEDS.get('generale_it', []) + self.RSS_FEEDS.get('generale_en', [])
-
-                # Fetch dei feed in parallelo
-                tasks = [self.fetch_feed(url) for url in urls]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                # Processa i risultati
-                all_entries = []
-                for result, url in zip(results, urls):
-                    if isinstance(result, Exception):
-                        continue
-
-                    domain = urlparse(url).netloc.replace('www.', '').split('.')[0].capitalize()
-                    lang = 'it' if url in self.RSS_FEEDS.get('generale_it', []) else 'en'
-
-                    for entry in getattr(result, 'entries', [])[:limit * 2]:
-                        try:
-                            title = getattr(entry, 'title', 'No title')
-                            link = getattr(entry, 'link', '')
-                            if not link:
-                                continue
-
-                            # Gestione data
-                            date_str = 'N/A'
-                            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                                date_str = datetime(*entry.published_parsed[:6]).strftime('%Y-%m-%d %H:%M')
-
-                            all_entries.append((title, link, domain, date_str, lang))
-                        except Exception:
-                            continue
+            await self.ensure_initialized()
 
-                # Ordina per data (più recente prima)
-                all_entries.sort(key=lambda x: x[3], reverse=True)
-
-                # Rimuovi duplicati e limita
-                seen = set()
-                unique_entries = []
-                for entry in all_entries:
-                    if entry[1] not in seen:
-                        seen.add(entry[1])
-                        unique_entries.append(entry)
-                        if len(unique_entries) >= limit:
-                            break
+            # Normalizza la categoria
+            category = category.lower()
+
+            # Aggiorna i feed scaduti: la normalizzazione avviene una sola volta per refresh
+            feeds = await self._refresh_urls(self._category_urls(category))
 
-                return unique_entries
+            latest = merge_latest(feeds, limit, key=self.clusters.cluster_of)
+            if latest:
+                return [article.as_tuple() for article in latest]
+
+            # Nessun feed disponibile in memoria: ultima versione nota dall'archivio
+            return self.db.get_articles(self._store_categories(category), limit)
 
         except Exception as e:
             logger.error(f"Error in get_news: {e}")
             return []
 
-    async def search_news(self, search_term: str, limit: int = 5) -> List[Tuple[str, str, str]]:
-        """Search news across all categories"""
+    def alternate_sources(self, news: Iterable[Tuple]) -> Dict[str, List[Tuple[str, str]]]:
+        """link -> [(source, link), ...] of the other sources reporting the same story"""
+        alternates = {}
+        for item in news:
+            others = self.clusters.alternates(item[1])
+            if others:
+                alternates[item[1]] = [(other.source, other.link) for other in others]
+        return alternates
+
+    async def search_news(self, search_term: str, limit: int = 5) -> List[Tuple[str, str, str, str, str]]:
+        """Search news: live inverted index first, then the full-text archive.
+
+        Accepts since:AAAA-MM-GG, until:AAAA-MM-GG and cat:<categoria> filters; with
+        filters the search runs on the archive only.
+        """
         print(f"[DEBUG] Searching for: {search_term}")
 
-        if not search_term.strip():
+        text, filters = parse_search_query(search_term)
+        if not text:
             logger.warning("Empty search term provided")
             return []
 
-        results = []
-        keywords = search_term.lower().split()
+        try:
+            await self.ensure_initialized()
+
+            results = []
+            if not filters:
+                # Indice vuoto (avvio a freddo senza poller): un primo aggiornamento di tutti i feed
+                if not len(self.index):
+                    await self._refresh_urls(self._all_urls())
+                results = [article.as_tuple() for article in self.index.search(text, limit)]
+
+            # Archivio storico per le ricerche filtrate o per completare i risultati
+            match = fts_match_expression(text)
+            if len(results) < limit and match:
+                seen = {item[1] for item in results}
+                archived = self.db.search_archive(match, limit + len(results), **self._archive_filters(filters))
+                for item in archived:
+                    if item[1] not in seen:
+                        seen.add(item[1])
+                        results.append(item)
+                        if len(results) >= limit:
+                            break
 
-        # Cerca in tutte le categorie
-        tasks = []
-        for category in self.RSS_FEEDS.keys():
-            tasks.append(self.get_news(category, limit * 2))
+            return results
 
-        # Esegui tutte le ricerche in parallelo
-        category_results = await asyncio.gather(*tasks, return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Error in search: {e}")
+            return []
 
-        for news_list in category_results:
-            if isinstance(news_list, Exception):
-                logger.error(f"Error in search: {news_list}")
+    def _archive_filters(self, filters: Dict[str, str]) -> Dict:
+        """Convert since:/until:/cat: values into search_archive keyword arguments"""
+        kwargs = {}
+        for key in ('since', 'until'):
+            if key not in filters:
                 continue
-
-            # Filtra solo le notizie che contengono i termini di ricerca
-            filtered = [
-                item for item in news_list
-                if any(kw in item[0].lower() for kw in keywords)
-            ]
-            results.extend(filtered)
-
-        # Rimuovi duplicati e limita i risultati
-        unique_results = []
-        seen = set()
-        for item in results:
-            if item[1] not in seen:  # Controlla l'URL per evitare duplicati
-                seen.add(item[1])
-                unique_results.append(item)
-                if len(unique_results) >= limit:
-                    break
-
-        return unique_results
+            try:
+                day = datetime.strptime(filters[key], '%Y-%m-%d')
+            except ValueError:
+                logger.warning(f"Ignoring invalid {key}: date {filters[key]!r}")
+                continue
+            # until è inclusivo: fino alla fine del giorno indicato
+            kwargs[key] = (day + timedelta(days=1) if key == 'until' else day).timestamp()
+        if 'cat' in filters:
+            kwargs['categories'] = self._store_categories(filters['cat'].lower())
+        return kwargs
 
     async def refresh_feeds(self):
-        """Refresh all feeds periodically"""
+        """Poll every feed on its own adaptive schedule (see FeedPoller)"""
         print("[DEBUG] Starting feed refresh background task")
 
         # Inizializzazione se necessario
         await self.ensure_initialized()
+        self.poller.running = True
 
-        while True:
-            try:
-                logger.info("Refreshing all news feeds...")
-                print("[DEBUG] Refreshing all feeds")
-
-                # Aggiorna i feed di tutte le categorie
-                refresh_tasks = []
-                for category in self.RSS_FEEDS.keys():
-                    refresh_tasks.append(self.get_news(category, limit=1))
+        try:
+            while True:
+                try:
+                    self.poller.sync(self._all_urls())
+                    due = self.poller.due()
+                    if due:
+                        logger.info(f"Polling {len(due)} due feeds")
+                        await asyncio.gather(
+                            *(self.fetch_feed(url, force=True, priority=PRIORITY_BACKGROUND) for url in due),
+                            return_exceptions=True
+                        )
+                        for url in due:
+                            self.poller.reschedule(url)
+
+                    # Dormi fino al prossimo feed in scadenza
+                    await asyncio.sleep(self.poller.seconds_until_next())
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in refresh_feeds: {e}", exc_info=True)
+                    print(f"[ERROR] Feed refresh failed: {e}")
+                    # Attendi un minuto in caso di errore
+                    await asyncio.sleep(60)
+        finally:
+            self.poller.running = False
+
+    def start_polling(self) -> None:
+        """Start the background poller once"""
+        if self._poller_task is None or self._poller_task.done():
+            self._poller_task = asyncio.create_task(self.refresh_feeds())
+
+    def load_snapshot(self) -> int:
+        """Warm the feed cache from the on-disk snapshot written by save_snapshot"""
+        path = Config.FEED_SNAPSHOT_PATH
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            loaded = self.cache.load_snapshot(snapshot.get('feeds', {}))
+            for url, articles in self.cache.items():
+                self.index.update_feed(url, articles)
+                self.clusters.update_feed(url, articles)
+                self._new_articles(url, articles)
+            logger.info(f"Loaded {loaded} feeds from cache snapshot saved at {snapshot.get('saved_at')}")
+            return loaded
+        except Exception as e:
+            logger.error(f"Error loading cache snapshot {path}: {e}")
+            return 0
+
+    async def save_snapshot(self) -> bool:
+        """Write the normalized feed cache to disk (atomic replace)"""
+        path = Config.FEED_SNAPSHOT_PATH
+        snapshot = {
+            'saved_at': datetime.now().isoformat(),
+            'feeds': self.cache.to_snapshot(),
+        }
 
-                # Esegui aggiornamento in parallelo
-                await asyncio.gather(*refresh_tasks, return_exceptions=True)
+        def write():
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
 
-                # Attendi 30 minuti prima del prossimo aggiornamento
-                await asyncio.sleep(1800)
-            except Exception as e:
-                logger.error(f"Error in refresh_feeds: {e}", exc_info=True)
-                print(f"[ERROR] Feed refresh failed: {e}")
-                # Attendi 5 minuti in caso di errore
-                await asyncio.sleep(300)
+        try:
+            await asyncio.to_thread(write)
+            logger.info(f"Saved cache snapshot with {len(snapshot['feeds'])} feeds")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving cache snapshot {path}: {e}")
+            return False
 
     async def close(self):
         """Close the aiohttp session"""
         print("[DEBUG] Closing NewsFetcher session")
+        if self._poller_task and not self._poller_task.done():
+            self._poller_task.cancel()
+            try:
+                await self._poller_task
+            except asyncio.CancelledError:
+                pass
+        self._poller_task = None
+        self.stream.close()
+        for task in list(self._websub_tasks):
+            task.cancel()
+        # Revalidazioni in background ancora in corso
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self.parser.shutdown()
         if self.session and not self.session.closed:
             await self.session.close()
             self._initialized = False
@@ -339,5 +831,5 @@ async def search_news(search_term: str, limit: int = 5):
 async def start_news_fetcher():
     """Initialize the news fetcher and start background tasks"""
     await news_fetcher.initialize()
-    # Optional: start background refresh
-    asyncio.create_task(news_fetcher.refresh_feeds())
\ No newline at end of file
+    # Polling adattivo in background: i comandi leggono sempre dati già caldi
+    news_fetcher.start_polling()
\ No newline at end of file
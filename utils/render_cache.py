@@ -0,0 +1,104 @@
+"""Cache dei messaggi di notizie già formattati (edizioni), condivisa da invii, riepiloghi e comandi"""
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+# Formati di un'edizione: lo stesso insieme di articoli può essere reso in modi diversi
+FORMAT_BROADCAST = 'broadcast'  # invio automatico agli iscritti
+FORMAT_COMMAND = 'command'  # /ps5, /xbox, ...
+FORMAT_LATEST = 'latest'  # /news5
+FORMAT_DIGEST = 'digest'  # blocco di una categoria nel riepilogo
+FORMAT_LIST_V2 = 'list_v2'  # elenco MarkdownV2 di /news10 e del menu /news
+
+
+class RenderedEdition:
+    __slots__ = ('text', 'reply_markup')
+
+    def __init__(self, text: str, reply_markup=None):
+        self.text = text
+        self.reply_markup = reply_markup
+
+
+def article_set_hash(news: Iterable[Tuple], alternates: Optional[Dict[str, List[Tuple[str, str]]]] = None) -> str:
+    """Impronta degli articoli (e delle fonti alternative) che compaiono nel messaggio"""
+    digest = hashlib.blake2b(digest_size=16)
+    for item in news:
+        digest.update("\x1f".join(str(field) for field in item).encode('utf-8'))
+        digest.update(b"\x1e")
+        for source, link in (alternates or {}).get(item[1], ()):
+            digest.update(f"{source}\x1f{link}\x1e".encode('utf-8'))
+        digest.update(b"\x1d")
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """(categoria, impronta degli articoli, lingua, formato, lunghezza massima) -> testo Markdown e reply markup.
+
+    Per ogni (categoria, lingua, formato, lunghezza massima, numero di articoli) resta solo l'ultima versione:
+    quando l'insieme di articoli cambia la versione precedente viene scartata. Oltre `max_entries` voci
+    vengono scartate le meno usate di recente.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._editions: 'OrderedDict[Tuple, RenderedEdition]' = OrderedDict()
+        self._latest: Dict[Tuple, str] = {}  # (categoria, lingua, formato, lunghezza, articoli) -> impronta
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._editions)
+
+    def render(self, category: str, news: List[Tuple], fmt: str,
+               build: Callable[[], RenderedEdition], language: str = 'all',
+               alternates: Optional[Dict[str, List[Tuple[str, str]]]] = None,
+               max_length: Optional[int] = None) -> RenderedEdition:
+        """Edizione già pronta per questi articoli, oppure `build()` una volta sola.
+
+        `max_length` è la lunghezza massima usata da `build()`: con un limite diverso il testo cambia.
+        """
+        fingerprint = article_set_hash(news, alternates)
+        key = (category, fingerprint, language, fmt, max_length)
+        edition = self._editions.get(key)
+        if edition is not None:
+            self.hits += 1
+            self._editions.move_to_end(key)
+            return edition
+
+        self.misses += 1
+        edition = build()
+        slot = (category, language, fmt, max_length, len(news))
+        previous = self._latest.get(slot)
+        if previous is not None and previous != fingerprint:
+            # Articoli cambiati: la versione precedente non verrà più richiesta
+            if self._editions.pop((category, previous, language, fmt, max_length), None) is not None:
+                self.invalidations += 1
+        self._latest[slot] = fingerprint
+        self._editions[key] = edition
+        while len(self._editions) > self.max_entries:
+            self._editions.popitem(last=False)
+        if len(self._latest) > 4 * self.max_entries:
+            # Impronte di versioni ormai uscite dalla cache
+            self._latest = {slot: fingerprint for slot, fingerprint in self._latest.items()
+                            if (slot[0], fingerprint, slot[1], slot[2], slot[3]) in self._editions}
+        return edition
+
+    def clear(self) -> None:
+        self._editions.clear()
+        self._latest.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._editions),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+
+
+# Istanza globale
+render_cache = RenderCache(Config.RENDER_CACHE_MAX_ENTRIES)
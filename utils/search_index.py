@@ -0,0 +1,141 @@
+"""Indice invertito in memoria su titoli e sommari degli articoli"""
+import heapq
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Set
+
+from utils.feed_cache import Article
+
+_WORD_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset({
+    # Italiano
+    'il', 'lo', 'la', 'i', 'gli', 'le', 'un', 'uno', 'una', 'di', 'da', 'in', 'con', 'su', 'per',
+    'tra', 'fra', 'e', 'ed', 'o', 'che', 'del', 'dello', 'della', 'dei', 'degli', 'delle', 'al',
+    'allo', 'alla', 'ai', 'agli', 'alle', 'nel', 'nella', 'nei', 'sul', 'sulla', 'non', 'si', 'come',
+    # English
+    'the', 'a', 'an', 'of', 'to', 'on', 'for', 'and', 'or', 'with', 'is', 'are', 'by', 'at', 'from',
+    'it', 'its', 'this', 'that', 'be', 'as', 'new',
+})
+
+# Suffissi rimossi dallo stemming leggero, dal più lungo al più corto
+_SUFFIXES = ('mente', 'zioni', 'zione', 'ing', 'es', 'ed', 's', 'i', 'e', 'a', 'o')
+
+
+def fold(text: str) -> str:
+    """Minuscolo senza accenti: 'Novità' -> 'novita'"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def stem(token: str) -> str:
+    """Stemming leggero italiano/inglese: accomuna singolare e plurale ('giochi'/'gioco', 'games'/'game')"""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    # giochi -> gioch -> gioc, come gioco -> gioc
+    if token.endswith(('ch', 'gh')) and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def terms(text: str) -> Set[str]:
+    """Termini indicizzabili di un testo (piegato, senza stopword, con stemming).
+
+    Le cifre singole restano: distinguono 'GTA 5' da 'GTA 6' o 'Switch 2'.
+    """
+    return {stem(word) for word in _WORD_RE.findall(fold(text))
+            if word not in STOPWORDS and (len(word) > 1 or word.isdigit())}
+
+
+class _Doc:
+    __slots__ = ('article', 'terms', 'feeds')
+
+    def __init__(self, article: Article, doc_terms: Set[str]):
+        self.article = article
+        self.terms = doc_terms
+        self.feeds: Set[str] = set()
+
+
+class SearchIndex:
+    """Indice invertito termine -> link, aggiornato incrementalmente a ogni refresh di un feed.
+
+    Un articolo presente in più feed è indicizzato una sola volta e rimosso solo
+    quando nessun feed lo contiene più.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._docs: Dict[str, _Doc] = {}  # link -> documento
+        self._feeds: Dict[str, Set[str]] = {}  # url del feed -> link indicizzati
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def update_feed(self, url: str, articles: Iterable[Article]) -> None:
+        """Sostituisce i documenti di un feed con i suoi articoli attuali"""
+        current = {article.link: article for article in articles}
+        previous = self._feeds.get(url, set())
+
+        for link in previous - current.keys():
+            self._detach(link, url)
+
+        for link, article in current.items():
+            doc = self._docs.get(link)
+            if doc is None:
+                doc = self._add(article)
+            elif (doc.article.title, doc.article.summary) != (article.title, article.summary):
+                # Titolo o sommario cambiati: reindicizza, senza perdere gli altri feed che lo contengono
+                feeds = doc.feeds
+                self._remove(link)
+                doc = self._add(article)
+                doc.feeds |= feeds
+            else:
+                doc.article = article
+            doc.feeds.add(url)
+
+        self._feeds[url] = set(current)
+
+    def remove_feed(self, url: str) -> None:
+        for link in self._feeds.pop(url, set()):
+            self._detach(link, url)
+
+    def _add(self, article: Article) -> _Doc:
+        doc = _Doc(article, terms(f"{article.title} {article.summary}"))
+        self._docs[article.link] = doc
+        for term in doc.terms:
+            self._postings.setdefault(term, set()).add(article.link)
+        return doc
+
+    def _detach(self, link: str, url: str) -> None:
+        doc = self._docs.get(link)
+        if doc is None:
+            return
+        doc.feeds.discard(url)
+        if not doc.feeds:
+            self._remove(link)
+
+    def _remove(self, link: str) -> None:
+        doc = self._docs.pop(link, None)
+        if doc is None:
+            return
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(link)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, limit: int = 5) -> List[Article]:
+        """Articoli che contengono almeno un termine della query, per numero di termini e poi per data"""
+        matches: Dict[str, int] = {}
+        for term in terms(query):
+            for link in self._postings.get(term, ()):
+                matches[link] = matches.get(link, 0) + 1
+
+        best = heapq.nlargest(
+            limit, matches.items(),
+            key=lambda item: (item[1], self._docs[item[0]].article.published_ts or 0.0)
+        )
+        return [self._docs[link].article for link, _ in best]
@@ -0,0 +1,29 @@
+"""ID compatti degli articoli consegnati e raggruppamento degli iscritti per articoli non ancora ricevuti"""
+import hashlib
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def article_id(link: str) -> int:
+    """Hash a 64 bit (con segno, come gli INTEGER di SQLite) del link di un articolo"""
+    return int.from_bytes(hashlib.blake2b(link.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def group_by_unseen(chat_ids: Iterable[int], article_ids: List[int],
+                    seen: Dict[int, Set[int]]) -> Dict[Tuple[int, ...], List[int]]:
+    """Raggruppa le chat per insieme di articoli ancora da ricevere.
+
+    Restituisce {indici in article_ids: chat}; le chat che hanno già ricevuto tutto sono escluse.
+    Di solito i gruppi sono pochi: tutti gli iscritti, più chi ha già visto alcune notizie.
+    """
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    all_indices = tuple(range(len(article_ids)))
+    for chat_id in chat_ids:
+        known = seen.get(chat_id)
+        if known:
+            indices = tuple(i for i, aid in enumerate(article_ids) if aid not in known)
+            if not indices:
+                continue
+        else:
+            indices = all_indices
+        groups.setdefault(indices, []).append(chat_id)
+    return groups
@@ -0,0 +1,190 @@
+"""Raggruppamento delle notizie quasi duplicate pubblicate da fonti diverse (MinHash + LSH)"""
+import random
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.feed_cache import Article
+from utils.search_index import terms
+
+# Primo di Mersenne 2^61 - 1 per le permutazioni (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+
+
+class _Story:
+    __slots__ = ('article', 'terms', 'numbers', 'signature', 'cluster', 'feeds')
+
+    def __init__(self, article: Article, story_terms: Set[str], signature: Tuple[int, ...], cluster: int):
+        self.article = article
+        self.terms = story_terms
+        self.numbers = {term for term in story_terms if term.isdigit()}
+        self.signature = signature
+        self.cluster = cluster
+        self.feeds: Set[str] = set()
+
+
+class StoryClusters:
+    """Cluster incrementali di articoli con titoli quasi identici.
+
+    Ogni articolo riceve una firma MinHash dei termini del titolo, calcolata una sola
+    volta; la firma è divisa in `bands` bande e solo gli articoli che condividono
+    almeno una banda vengono confrontati (Jaccard esatto sui termini), quindi
+    l'inserimento costa O(candidati) invece di O(n). Un articolo entra nel cluster
+    del candidato più simile oltre la soglia, pubblicato entro `window` secondi.
+
+    Un cluster raccoglie la stessa notizia da fonti diverse: non accoglie mai due
+    articoli della stessa fonte o dello stesso feed, né titoli con numeri diversi
+    ('GTA 5' / 'GTA 6', 'trailer 2'), che indicano notizie distinte.
+    """
+
+    def __init__(self, threshold: float = 0.75, window: float = 48 * 3600,
+                 bands: int = 8, rows: int = 4, min_terms: int = 3):
+        self.threshold = threshold
+        self.window = window
+        self.bands = bands
+        self.rows = rows
+        self.min_terms = min_terms
+        rng = random.Random(0x5EED)
+        self._permutations = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+                              for _ in range(bands * rows)]
+        self._stories: Dict[str, _Story] = {}  # link -> articolo
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self._clusters: Dict[int, Set[str]] = {}  # id cluster -> link
+        self._feeds: Dict[str, Set[str]] = {}  # url del feed -> link
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def signature(self, story_terms: Iterable[str]) -> Tuple[int, ...]:
+        """Firma MinHash di un insieme di termini"""
+        hashes = [zlib.crc32(term.encode('utf-8')) for term in story_terms]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._permutations)
+
+    def update_feed(self, url: str, articles: Iterable[Article]) -> None:
+        """Sostituisce gli articoli di un feed, aggiornando solo i cluster toccati"""
+        current = {article.link: article for article in articles}
+        previous = self._feeds.get(url, set())
+
+        for link in previous - current.keys():
+            self._detach(link, url)
+
+        for link, article in current.items():
+            story = self._stories.get(link)
+            if story is None:
+                story = self._add(article, {url})
+            elif story.article.title != article.title:
+                # Titolo cambiato: nuova firma e nuovo cluster
+                feeds = story.feeds | {url}
+                self._remove(link)
+                story = self._add(article, feeds)
+            else:
+                story.article = article
+            story.feeds.add(url)
+
+        self._feeds[url] = set(current)
+
+    def remove_feed(self, url: str) -> None:
+        for link in self._feeds.pop(url, set()):
+            self._detach(link, url)
+
+    def cluster_of(self, article: Article):
+        """Chiave del cluster di un articolo (il link stesso se non è raggruppato)"""
+        story = self._stories.get(article.link)
+        return story.cluster if story is not None else article.link
+
+    def alternates(self, link: str) -> List[Article]:
+        """Gli altri articoli dello stesso cluster, una voce per fonte, dal più vecchio"""
+        story = self._stories.get(link)
+        if story is None:
+            return []
+        sources = {story.article.source}
+        others = []
+        members = sorted((self._stories[member].article for member in self._clusters[story.cluster]),
+                         key=lambda member: member.published_ts or 0.0)
+        for member in members:
+            if member.source not in sources:
+                sources.add(member.source)
+                others.append(member)
+        return others
+
+    def stats(self) -> Dict[str, int]:
+        grouped = [members for members in self._clusters.values() if len(members) > 1]
+        return {
+            'articles': len(self._stories),
+            'clusters': len(self._clusters),
+            'grouped_clusters': len(grouped),
+            'grouped_articles': sum(len(members) for members in grouped),
+        }
+
+    def _add(self, article: Article, feeds: Set[str]) -> _Story:
+        story_terms = terms(article.title)
+        signature = self.signature(story_terms) if len(story_terms) >= self.min_terms else ()
+        story = _Story(article, story_terms, signature, -1)
+        story.feeds = set(feeds)
+        cluster = self._match(story)
+        if cluster is None:
+            cluster = self._next_id
+            self._next_id += 1
+
+        story.cluster = cluster
+        self._stories[article.link] = story
+        self._clusters.setdefault(cluster, set()).add(article.link)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(article.link)
+        return story
+
+    def _match(self, story: _Story) -> Optional[int]:
+        """Cluster del candidato LSH più simile, se supera la soglia e può accogliere l'articolo"""
+        candidates = set()
+        for key in self._band_keys(story.signature):
+            candidates |= self._buckets.get(key, set())
+
+        article = story.article
+        best, best_score = None, self.threshold
+        for link in candidates:
+            other = self._stories[link]
+            if abs((other.article.published_ts or 0.0) - (article.published_ts or 0.0)) > self.window:
+                continue
+            if other.numbers != story.numbers:
+                continue
+            score = len(story.terms & other.terms) / len(story.terms | other.terms)
+            if score >= best_score and self._accepts(other.cluster, story):
+                best, best_score = other.cluster, score
+        return best
+
+    def _accepts(self, cluster: int, story: _Story) -> bool:
+        """Il cluster non contiene già articoli della stessa fonte o dello stesso feed"""
+        for link in self._clusters.get(cluster, ()):
+            member = self._stories[link]
+            if member.article.source == story.article.source or member.feeds & story.feeds:
+                return False
+        return True
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        if not signature:
+            return []
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _detach(self, link: str, url: str) -> None:
+        story = self._stories.get(link)
+        if story is None:
+            return
+        story.feeds.discard(url)
+        if not story.feeds:
+            self._remove(link)
+
+    def _remove(self, link: str) -> None:
+        story = self._stories.pop(link, None)
+        if story is None:
+            return
+        for key in self._band_keys(story.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(link)
+                if not bucket:
+                    del self._buckets[key]
+        members = self._clusters.get(story.cluster)
+        if members is not None:
+            members.discard(link)
+            if not members:
+                del self._clusters[story.cluster]
@@ -0,0 +1,219 @@
+"""Sottoscrizioni WebSub (PubSubHubbub): gli hub inviano i nuovi contenuti dei feed via POST"""
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from datetime import datetime
+from typing import AsyncIterable, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'  # richiesta inviata, in attesa della verifica dell'hub
+ACTIVE = 'active'
+DENIED = 'denied'
+
+# Algoritmi ammessi nell'header X-Hub-Signature
+_SIGNATURE_ALGORITHMS = {'sha1': hashlib.sha1, 'sha256': hashlib.sha256,
+                         'sha384': hashlib.sha384, 'sha512': hashlib.sha512}
+
+
+async def read_body_capped(chunks: AsyncIterable[bytes], max_bytes: int) -> Optional[bytes]:
+    """Corpo di un push letto a blocchi; None appena supera max_bytes, senza leggere il resto"""
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > max_bytes:
+            return None
+    return bytes(body)
+
+
+class WebSubSubscription:
+    __slots__ = ('url', 'sub_id', 'hub', 'topic', 'secret', 'state', 'lease_expires', 'denied_at')
+
+    def __init__(self, url: str, sub_id: str, hub: str, topic: str, secret: str,
+                 state: str = PENDING, lease_expires: Optional[float] = None,
+                 denied_at: Optional[float] = None):
+        self.url = url  # URL del feed in RSS_FEEDS
+        self.sub_id = sub_id  # segmento della callback: /websub/<sub_id>
+        self.hub = hub
+        self.topic = topic
+        self.secret = secret
+        self.state = state
+        self.lease_expires = lease_expires
+        self.denied_at = denied_at  # quando l'hub ha rifiutato la sottoscrizione
+
+    def is_active(self, now: Optional[float] = None) -> bool:
+        return self.state == ACTIVE and (self.lease_expires or 0) > (now or time.time())
+
+
+class WebSubManager:
+    """Tiene le sottoscrizioni per feed: richiesta all'hub, verifica dell'intento, firme HMAC.
+
+    Senza `callback_base` (URL pubblico del bot) WebSub resta disattivato e i feed
+    vengono solo interrogati dal poller.
+    """
+
+    def __init__(self, callback_base: Optional[str], lease_seconds: int = 10 * 86400, db=None,
+                 denied_retry: float = 86400):
+        self.callback_base = callback_base.rstrip('/') if callback_base else None
+        self.lease_seconds = lease_seconds
+        self.denied_retry = denied_retry  # secondi prima di riprovare con un hub che ha rifiutato
+        self.db = db
+        self._by_url: Dict[str, WebSubSubscription] = {}
+        self._by_id: Dict[str, WebSubSubscription] = {}
+        self.pushes = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.callback_base)
+
+    def load(self, rows: List[Dict]) -> None:
+        """Ripristina le sottoscrizioni salvate nel database"""
+        for row in rows:
+            # Per le sottoscrizioni rifiutate l'ultimo aggiornamento è il rifiuto stesso
+            denied_at = None
+            if row['state'] == DENIED and row.get('updated_at'):
+                denied_at = datetime.fromisoformat(row['updated_at']).timestamp()
+            self._register(WebSubSubscription(row['url'], row['sub_id'], row['hub'], row['topic'],
+                                              row['secret'], row['state'], row['lease_expires'], denied_at))
+
+    def get(self, sub_id: str) -> Optional[WebSubSubscription]:
+        return self._by_id.get(sub_id)
+
+    def callback_url(self, subscription: WebSubSubscription) -> str:
+        return f"{self.callback_base}/websub/{subscription.sub_id}"
+
+    def needs_subscription(self, url: str, hub: Optional[str]) -> bool:
+        """True se il feed pubblicizza un hub a cui non siamo (più) iscritti.
+
+        Dopo un rifiuto dello stesso hub si riprova solo trascorso `denied_retry`.
+        """
+        if not self.enabled or not hub:
+            return False
+        subscription = self._by_url.get(url)
+        if subscription is None or subscription.hub != hub:
+            return True
+        if subscription.state == DENIED:
+            return time.time() - (subscription.denied_at or 0) >= self.denied_retry
+        return False
+
+    def renewals_due(self, margin: float) -> List[str]:
+        """Feed da (ri)sottoscrivere: lease in scadenza entro `margin` secondi o verifica mai arrivata"""
+        limit = time.time() + margin
+        return [url for url, subscription in self._by_url.items()
+                if subscription.state == PENDING
+                or (subscription.state == ACTIVE and (subscription.lease_expires or 0) < limit)]
+
+    def pushed_until(self, url: str) -> Optional[float]:
+        subscription = self._by_url.get(url)
+        return subscription.lease_expires if subscription and subscription.is_active() else None
+
+    async def subscribe(self, session: aiohttp.ClientSession, url: str, hub: Optional[str] = None,
+                        topic: Optional[str] = None) -> bool:
+        """Chiede all'hub di inviarci il feed; la sottoscrizione diventa attiva dopo la verifica"""
+        current = self._by_url.get(url)
+        hub = hub or (current.hub if current else None)
+        if not self.enabled or not hub:
+            return False
+
+        if current is not None and current.hub == hub:
+            subscription = current
+            subscription.topic = topic or subscription.topic
+        else:
+            subscription = WebSubSubscription(url, secrets.token_urlsafe(12), hub, topic or url,
+                                              secrets.token_hex(20))
+        if not subscription.is_active():
+            subscription.state = PENDING
+        self._register(subscription)
+        self._save(subscription)
+
+        form = {
+            'hub.mode': 'subscribe',
+            'hub.topic': subscription.topic,
+            'hub.callback': self.callback_url(subscription),
+            'hub.secret': subscription.secret,
+            'hub.lease_seconds': str(self.lease_seconds),
+        }
+        try:
+            async with session.post(hub, data=form, timeout=10) as response:
+                if response.status in (202, 204):
+                    logger.info(f"WebSub subscription requested for {url} at {hub}")
+                    return True
+                logger.warning(f"WebSub hub {hub} refused subscription for {url}: HTTP {response.status}")
+        except Exception as e:
+            logger.error(f"WebSub subscription to {hub} for {url} failed: {e}")
+        return False
+
+    def verify_intent(self, sub_id: str, params: Dict[str, str]) -> Optional[str]:
+        """Risposta alla verifica dell'hub (GET sulla callback): la challenge, o None se rifiutata"""
+        subscription = self._by_id.get(sub_id)
+        if subscription is None or params.get('hub.topic') != subscription.topic:
+            return None
+
+        mode = params.get('hub.mode')
+        if mode == 'denied':
+            subscription.state = DENIED
+            subscription.denied_at = time.time()
+            self._save(subscription)
+            logger.warning(f"WebSub hub denied subscription for {subscription.url}: {params.get('hub.reason')}")
+            return ''
+        if mode != 'subscribe' or 'hub.challenge' not in params:
+            # Le disiscrizioni non sono mai richieste dal bot
+            return None
+
+        try:
+            lease = int(params.get('hub.lease_seconds') or self.lease_seconds)
+        except ValueError:
+            lease = self.lease_seconds
+        subscription.state = ACTIVE
+        subscription.lease_expires = time.time() + lease
+        self._save(subscription)
+        logger.info(f"WebSub subscription for {subscription.url} active for {lease}s")
+        return params['hub.challenge']
+
+    def verify_signature(self, subscription: WebSubSubscription, body: bytes, header: Optional[str]) -> bool:
+        """Controlla X-Hub-Signature ('sha256=<hex>') con il segreto della sottoscrizione"""
+        if not header or '=' not in header:
+            return False
+        algorithm, _, signature = header.partition('=')
+        digest = _SIGNATURE_ALGORITHMS.get(algorithm.strip().lower())
+        if digest is None:
+            return False
+        expected = hmac.new(subscription.secret.encode('utf-8'), body, digest).hexdigest()
+        # Confronto tra byte: un header con caratteri non ASCII è solo una firma errata
+        return hmac.compare_digest(expected.encode('ascii'), signature.strip().lower().encode('utf-8'))
+
+    def stats(self) -> Dict:
+        now = time.time()
+        return {
+            'enabled': self.enabled,
+            'pushes': self.pushes,
+            'rejected': self.rejected,
+            'subscriptions': {
+                url: {
+                    'hub': subscription.hub,
+                    'state': subscription.state if subscription.state != ACTIVE or subscription.is_active(now)
+                    else 'expired',
+                    'lease_remaining': round(subscription.lease_expires - now)
+                    if subscription.lease_expires else None,
+                }
+                for url, subscription in self._by_url.items()
+            },
+        }
+
+    def _register(self, subscription: WebSubSubscription) -> None:
+        previous = self._by_url.get(subscription.url)
+        if previous is not None and previous is not subscription:
+            self._by_id.pop(previous.sub_id, None)
+        self._by_url[subscription.url] = subscription
+        self._by_id[subscription.sub_id] = subscription
+
+    def _save(self, subscription: WebSubSubscription) -> None:
+        if self.db:
+            self.db.save_websub_subscription(subscription.url, subscription.sub_id, subscription.hub,
+                                             subscription.topic, subscription.secret, subscription.state,
+                                             subscription.lease_expires)